@@ -0,0 +1,103 @@
+"""
+Payload decode throughput: the JSON payload through every installed JSON
+backend, and the binary SensorData_t payload through struct.unpack_from,
+one frame per message and batched (a JSON array, back-to-back structs).
+
+    python benchmarks/bench_decode.py [-n 200000] [--batch 10]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payload_codec
+from payload_codec import BACKENDS, PayloadDecoder, encode_binary, make_sample
+
+TOPIC = "sensors/bench/data"
+FIELDS = ("frame_no", "device_ts", "gyro_x", "gyro_y", "gyro_z", "temperature", "humidity", "light")
+
+
+def make_frames(count):
+    rng = random.Random(0)
+    frames = []
+    for i in range(count):
+        frames.append({
+            "frmNo": i, "ts": 1751328000 + i // 10,
+            "gyro_x": round(rng.gauss(0, 1), 2), "gyro_y": round(rng.gauss(0, 1), 2),
+            "gyro_z": round(rng.gauss(0, 1), 2), "temperature": round(rng.uniform(30, 40), 2),
+            "humidity": round(rng.uniform(0.3, 0.7), 2), "light": round(rng.uniform(100, 500), 2),
+        })
+    return frames
+
+
+def encode_frame(f):
+    return encode_binary(f["frmNo"], f["ts"], f["temperature"], f["gyro_x"], f["gyro_y"],
+                         f["gyro_z"], f["light"], f["humidity"])
+
+
+def same_sample(sample, expected):
+    for key in FIELDS:
+        a, b = sample[key], expected[key]
+        if (a is None or b is None) and a is not b:
+            return False
+        if a is not None and abs(a - b) >= 1e-3:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--samples", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=10, help="frames per message in the batched cases")
+    args = parser.parse_args()
+
+    frames = make_frames(1000)
+    json_payloads = [json.dumps(f).encode() for f in frames]
+    binary_payloads = [encode_frame(f) for f in frames]
+    batches = [frames[i:i + args.batch] for i in range(0, len(frames), args.batch)]
+    json_batches = [json.dumps(b).encode() for b in batches]
+    binary_batches = [b"".join(encode_frame(f) for f in b) for b in batches]
+
+    cases = []
+    for backend in reversed(BACKENDS):  # stdlib first, it is the baseline
+        if backend != "json" and getattr(payload_codec, backend) is None:
+            print(f"{backend} not installed, skipped")
+            continue
+        decoder = PayloadDecoder("json", backend)
+        cases.append((f"json via {backend}", decoder, json_payloads))
+        cases.append((f"json x{args.batch} via {backend}", decoder, json_batches))
+    cases.append(("binary SensorData_t", PayloadDecoder("binary"), binary_payloads))
+    cases.append((f"binary x{args.batch}", PayloadDecoder("binary"), binary_batches))
+
+    # every path has to produce the same samples, in frame order, before it is timed
+    for name, decoder, payloads in cases:
+        samples = [sample for payload in payloads for sample in decoder.decode(TOPIC, payload)]
+        assert len(samples) == len(frames), name
+        for sample, frame in zip(samples, frames):
+            expected = make_sample(TOPIC, frame["gyro_x"], frame["gyro_y"], frame["gyro_z"], frame["temperature"],
+                                   frame["humidity"], frame["light"], frame["frmNo"], frame["ts"])
+            assert same_sample(sample, expected), name
+
+    loops = max(1, args.samples // len(frames))
+    total = loops * len(frames)
+    baseline = None
+    print(f"{'format':<24}{'bytes':>7}{'ns/sample':>12}{'samples/s':>12}{'speedup':>9}")
+    for name, decoder, payloads in cases:
+        decode = decoder.decode
+
+        def run():
+            for payload in payloads:
+                decode(TOPIC, payload)
+
+        ns = min(timeit.repeat(run, number=loops, repeat=3)) / total * 1e9
+        baseline = baseline or ns
+        size = sum(len(p) for p in payloads) / len(frames)
+        print(f"{name:<24}{size:>7.0f}{ns:>12.0f}{1e9 / ns:>12.0f}{baseline / ns:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cost of one fleet overview update: routing a second's worth of samples
+(one per device), closing the sparkline buckets and repainting the visible
+rows of the table, for growing device counts.
+
+    python benchmarks/bench_fleet.py [--devices 100 500 2000] [--seconds 30]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+from devices import DeviceManager
+from fleet_overview import FleetOverview
+
+
+def run(devices, seconds):
+    rng = random.Random(0)
+    manager = DeviceManager(topic_filter="sensors/+/data")
+    overview = FleetOverview(manager)
+    overview.model._timer.stop()  # ticks are driven by hand below
+    overview.resize(1000, 700)
+    overview.show()
+
+    topics = [f"sensors/sim-{i:04d}/data" for i in range(devices)]
+    dispatch_ms = []
+    tick_ms = []
+    paint_ms = []
+    for _ in range(seconds):
+        samples = [{"topic": topic, "gyro_x": rng.gauss(0, 1), "gyro_y": 0.0, "gyro_z": 0.0,
+                    "temperature": 25 + rng.random(), "humidity": 50.0, "light": 300.0} for topic in topics]
+        started = time.perf_counter()
+        for device, group in manager.dispatch(samples):
+            overview.model.record(device, group)
+        dispatch_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        overview.model.tick()
+        tick_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        overview.view.viewport().grab()
+        paint_ms.append((time.perf_counter() - started) * 1000)
+
+    overview.close()
+    return (sum(dispatch_ms) / seconds, sum(tick_ms) / seconds, sum(paint_ms) / seconds, max(paint_ms),
+            overview.model.memory_used())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--seconds", type=int, default=30, help="simulated one-second updates per run")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    print(f"{'devices':>8}{'dispatch ms':>13}{'tick ms':>10}{'paint ms':>10}{'paint max':>11}{'spark KiB':>11}")
+    for devices in args.devices:
+        dispatch, tick, paint, paint_max, nbytes = run(devices, args.seconds)
+        print(f"{devices:>8}{dispatch:>13.2f}{tick:>10.2f}{paint:>10.2f}{paint_max:>11.2f}{nbytes / 1024:>11.0f}")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
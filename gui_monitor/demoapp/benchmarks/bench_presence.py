@@ -0,0 +1,52 @@
+"""
+Device presence tracking cost: PresenceMonitor.seen() per message, and the
+monitor thread's work to reschedule every device once and then mark them
+all offline, for growing device counts.
+
+    python benchmarks/bench_presence.py [--devices 1000 10000 50000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from device_presence import PresenceMonitor
+
+TIMEOUT = 0.5
+
+
+def run(devices, rounds=10):
+    offline = []
+    monitor = PresenceMonitor(TIMEOUT, lambda device_id, online, count: online or offline.append(device_id))
+    monitor.start()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for device_id in range(devices):
+            monitor.seen(device_id)
+    seen_us = (time.perf_counter() - started) / (rounds * devices) * 1e6
+
+    # every entry comes due once more (rescheduled), then once to go offline
+    started = time.perf_counter()
+    while len(offline) < devices:
+        time.sleep(0.005)
+    settle_ms = (time.perf_counter() - started - TIMEOUT) * 1000
+    monitor.stop()
+    return seen_us, settle_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'devices':>8}{'seen() us':>11}{'offline lag ms':>16}")
+    for devices in args.devices:
+        seen_us, settle_ms = run(devices)
+        print(f"{devices:>8}{seen_us:>11.2f}{settle_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Alert rule engine cost with many rules and devices: time per sample with
+samples arriving in blocks of 1 to --samples per device, stepped through
+the scalar predicates, through the NumPy batch path, and as the engine
+picks between them (batch_min), so the block size where the batch path
+starts to win shows up; and how many rules the field and device index
+leaves to evaluate per sample.
+
+    python benchmarks/bench_rules.py [--rules 2000] [--devices 200] [--samples 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devices import Device, FIELD_VARS
+from rule_engine import RuleEngine
+
+GROUPS = 20  # rules are spread over device groups "dev-<group>-*"
+
+
+def make_rules(engine, count, rng):
+    variables = list(FIELD_VARS)
+    for i in range(count):
+        a, b = rng.sample(variables, 2)
+        text = rng.choice((f"{a} > {rng.uniform(1, 3):.2f}",
+                           f"{a} > {rng.uniform(1, 3):.2f} and {b} < {rng.uniform(0, 1):.2f}",
+                           f"mean({a}, 10s) > {rng.uniform(1, 3):.2f}"))
+        devices = () if i % 10 == 0 else (f"dev-{i % GROUPS:02d}-*",)
+        engine.set_rule(f"rule-{i}", text, devices=devices)
+
+
+def make_samples(device_count, per_device, rng):
+    # gyro at every sample, temperature/humidity and light less often
+    samples = []
+    for d in range(device_count):
+        for i in range(per_device):
+            samples.append((d, {"time_ms": i * 10.0, "gyro_x": rng.gauss(0, 1), "gyro_y": rng.gauss(0, 1),
+                                "gyro_z": rng.gauss(0, 1),
+                                "temperature": rng.gauss(0, 1) if i % 10 == 0 else None,
+                                "humidity": rng.gauss(0, 1) if i % 10 == 0 else None,
+                                "light": rng.gauss(0, 1) if i % 5 == 0 else None}))
+    return samples
+
+
+def run(args, block, batch_min):
+    rng = random.Random(0)
+    engine = RuleEngine(batch_min=batch_min)
+    make_rules(engine, args.rules, rng)
+    devices = [Device(f"dev-{d % GROUPS:02d}-{d}", 16) for d in range(args.devices)]
+    for device in devices:
+        device.stats.configure(engine.window_refs())
+    samples = make_samples(args.devices, args.samples, rng)
+    by_device = [[] for _ in devices]
+    for d, sample in samples:
+        by_device[d].append(sample)
+
+    started = time.perf_counter()
+    for device, device_samples in zip(devices, by_device):
+        for i in range(0, len(device_samples), block):
+            engine.process(device, device_samples[i:i + block])
+    elapsed = time.perf_counter() - started
+    return elapsed / len(samples) * 1e6, engine.evaluations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=2000)
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=200, help="samples per device")
+    args = parser.parse_args()
+
+    default = RuleEngine().batch_min
+    print(f"{args.rules} rules, {args.devices} devices, {args.samples} samples each")
+    print(f"{'block':>6}{'step us':>10}{'batch us':>10}{'engine us':>11}")
+    us, evaluations = run(args, 1, default)
+    print(f"{1:>6}{us:>10.1f}{'':>10}{us:>11.1f}")
+    for block in (2, 5, 10, 20, 50, 100, 200):
+        if block > args.samples:
+            break
+        step, _ = run(args, block, block + 1)
+        batch, _ = run(args, block, 2)
+        engine, _ = run(args, block, default)
+        print(f"{block:>6}{step:>10.1f}{batch:>10.1f}{engine:>11.1f}")
+    print(f"\nengine batch_min: {default} samples")
+    print(f"rules evaluated per sample: {evaluations / (args.devices * args.samples):.1f} of {args.rules}")
+
+
+if __name__ == "__main__":
+    main()
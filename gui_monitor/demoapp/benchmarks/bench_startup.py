@@ -0,0 +1,77 @@
+"""
+Startup latency: time from process start to the window's first paint and
+to the first sample drawn, each run in a fresh interpreter so import costs
+are included. A publisher thread on the in-process broker starts sending
+as soon as the window exists.
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, tempfile, threading, time
+import main
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+from mqtt_transport import InProcessBroker
+
+app = QApplication(sys.argv)
+window = main.MainWindow(interactive=False, log_dir=tempfile.mkdtemp(), mqtt_transport="inprocess")
+window.show()
+
+def publish():
+    broker = InProcessBroker.default()
+    frame = 0
+    while "first_sample" not in window.startup_times:
+        frame += 1
+        broker.publish("sensors/bench/data", json.dumps(
+            {"frmNo": frame, "ts": time.time(), "gyro_x": 0.1, "temperature": 30.0,
+             "humidity": 0.5, "light": 200.0}).encode())
+        time.sleep(0.01)
+
+threading.Thread(target=publish, daemon=True).start()
+
+def poll():
+    if "first_sample" in window.startup_times and "first_paint" in window.startup_times:
+        app.quit()
+QTimer(app, timeout=poll, interval=10).start()
+QTimer.singleShot(30000, app.quit)
+app.exec()
+print("STARTUP " + json.dumps(window.startup_times))
+window.shutdown()
+"""
+
+
+def run_once():
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=HERE, env=env,
+                            capture_output=True, text=True, timeout=120)
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            return json.loads(line[len("STARTUP "):])
+    raise RuntimeError(f"no timings from the child process:\n{result.stdout}\n{result.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    names = [name for name in ("window_built", "first_paint", "mqtt_connected", "first_sample")
+             if all(name in run for run in runs)]
+    print(f"{'milestone':<16}{'median ms':>11}{'min ms':>9}{'max ms':>9}")
+    for name in names:
+        values = [run[name] * 1000 for run in runs]
+        print(f"{name:<16}{statistics.median(values):>11.0f}{min(values):>9.0f}{max(values):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Streaming statistics cost and accuracy: time per sample to update every
+field of a device for growing numbers of windows, and the DDSketch
+quantiles of a window against exact NumPy quantiles of the same samples.
+
+    python benchmarks/bench_stats.py [--samples 50000] [--rate 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from devices import FIELD_VARS
+from stream_stats import DeviceStats
+
+KEYS = tuple(FIELD_VARS.values())
+
+
+def make_samples(count, rate):
+    rng = random.Random(0)
+    return [{"time_ms": i * 1000.0 / rate, "gyro_x": rng.gauss(0, 1), "gyro_y": rng.gauss(0, 1),
+             "gyro_z": rng.lognormvariate(0, 1), "temperature": 25 + rng.random(), "humidity": 50.0,
+             "light": rng.uniform(100, 500)} for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=50000)
+    parser.add_argument("--rate", type=float, default=100.0, help="samples per second of device time")
+    args = parser.parse_args()
+    samples = make_samples(args.samples, args.rate)
+
+    print(f"{'windows':>8}{'us/sample':>11}{'KiB':>8}")
+    for spans in ((10.0,), (1.0, 10.0), (1.0, 10.0, 60.0, 600.0)):
+        stats = DeviceStats(KEYS)
+        stats.configure({(func, key, span) for func in ("mean", "rms", "rate") for key in KEYS for span in spans}
+                        | {("ewma", key, 5.0) for key in KEYS})
+        started = time.perf_counter()
+        stats.update(samples)
+        us = (time.perf_counter() - started) / len(samples) * 1e6
+        print(f"{len(spans):>8}{us:>11.1f}{stats.nbytes() / 1024:>8.0f}")
+
+    span = 10.0
+    stats = DeviceStats(KEYS)
+    stats.configure({("p50", "gyro_z", span)})
+    stats.update(samples)
+    last = samples[-1]["time_ms"] / 1000.0
+    window = np.array([s["gyro_z"] for s in samples if s["time_ms"] / 1000.0 > last - span])
+    print(f"\n{'quantile':>8}{'sketch':>10}{'exact':>10}{'rel err':>9}")
+    for q, func in ((0.5, "p50"), (0.95, "p95"), (0.99, "p99")):
+        approx = stats.value(func, "gyro_z", span)
+        exact = float(np.quantile(window, q))
+        print(f"{q:>8}{approx:>10.4f}{exact:>10.4f}{abs(approx - exact) / exact:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
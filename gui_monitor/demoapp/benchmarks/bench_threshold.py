@@ -0,0 +1,56 @@
+"""
+Per-sample cost of threshold evaluation: eval() of the expression text
+(the old SensorTab.check_threshold path) versus the predicate compiled
+once by threshold_expr.compile_threshold.
+
+    python benchmarks/bench_threshold.py [-n 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from threshold_expr import compile_threshold
+
+EXPRESSIONS = [
+    ("Gyroscope", "X > 1.0 or Y > 1.5 or Z > 2.0", {"X", "Y", "Z"}),
+    ("Temperature & Humidity", "T > 50 and H > 80", {"T", "H"}),
+    ("Light", "L < 50", {"L"}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--samples", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'sensor':<24}{'eval() ns/sample':>18}{'compiled ns/sample':>20}{'speedup':>10}")
+    for sensor, expr, names in EXPRESSIONS:
+        samples = [{name: rng.uniform(-5, 100) for name in names} for _ in range(1000)]
+        predicate = compile_threshold(expr, names)
+
+        # both paths must agree before timing them
+        assert all(bool(eval(expr, {}, dict(s))) == predicate(s) for s in samples)
+
+        loops = max(1, args.samples // len(samples))
+
+        def run_eval():
+            for s in samples:
+                eval(expr, {}, s)
+
+        def run_compiled():
+            for s in samples:
+                predicate(s)
+
+        total = loops * len(samples)
+        eval_ns = min(timeit.repeat(run_eval, number=loops, repeat=3)) / total * 1e9
+        compiled_ns = min(timeit.repeat(run_compiled, number=loops, repeat=3)) / total * 1e9
+        print(f"{sensor:<24}{eval_ns:>18.0f}{compiled_ns:>20.0f}{eval_ns / compiled_ns:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
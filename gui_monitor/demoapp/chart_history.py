@@ -0,0 +1,135 @@
+import time
+
+from PySide6.QtCore import QObject, QEvent, QTimer, Qt, Signal
+
+from decimation import plot_pixels
+from tile_cache import pick_level, tiles_for_range
+
+MIN_SPAN_SECS = 10
+MAX_SPAN_SECS = 90 * 86400
+ZOOM_STEP = 0.8  # span factor per wheel notch
+
+
+class ChartHistory(QObject):
+    """
+    Pan and zoom into logged history on one of the time series plots.
+    Scrolling zooms around the cursor and dragging pans; either one takes
+    the plot out of live mode until go_live() (or a double click). The view
+    is drawn from TileCache tiles at the coarsest resolution that still gives
+    one bucket per pixel, and the tiles next to the view are prefetched so
+    panning rarely waits on the log files.
+    """
+    mode_changed = Signal(bool)  # True while history is shown
+
+    def __init__(self, plot, sensor, fields, cache, device="", parent=None):
+        super().__init__(parent)
+        self.plot = plot
+        self.device = device
+        self.sensor = sensor
+        self.fields = fields
+        self.cache = cache
+        self.start = self.end = None  # visible range in epoch seconds while not live
+        self._drag = None  # (x, start, end) of an ongoing drag
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.refresh)
+        plot.chart_view.viewport().installEventFilter(self)
+
+    @property
+    def live(self):
+        return self.start is None
+
+    def go_live(self):
+        if self.live:
+            return
+        self.start = self.end = None
+        self._drag = None
+        self.plot.set_live(True)
+        self.mode_changed.emit(False)
+
+    def show_range(self, start, end):
+        span = min(max(end - start, MIN_SPAN_SECS), MAX_SPAN_SECS)
+        center = (start + end) / 2
+        was_live = self.live
+        self.start, self.end = center - span / 2, center + span / 2
+        if was_live:
+            self.plot.set_live(False)
+            self.mode_changed.emit(True)
+        self.refresh()
+
+    def eventFilter(self, obj, event):
+        kind = event.type()
+        if kind == QEvent.Wheel:
+            self._zoom(event.position().x(), event.angleDelta().y() / 120)
+            return True
+        if kind == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            start, end = self._current_range()
+            self._drag = (event.position().x(), start, end)
+            return True
+        if kind == QEvent.MouseMove and self._drag is not None:
+            x0, start, end = self._drag
+            shift = (event.position().x() - x0) / self._plot_width() * (end - start)
+            self.show_range(start - shift, end - shift)
+            return True
+        if kind == QEvent.MouseButtonRelease and self._drag is not None:
+            self._drag = None
+            return True
+        if kind == QEvent.MouseButtonDblClick:
+            self.go_live()
+            return True
+        return False
+
+    def on_tile_loaded(self, key):
+        # a tile for this chart arrived; coalesce bursts of loads into one redraw
+        if (not self.live and key[0] == self.device and key[1] == self.sensor
+                and not self._refresh_timer.isActive()):
+            self._refresh_timer.start(50)
+
+    def refresh(self):
+        if self.live:
+            return
+        level = pick_level(self.end - self.start, plot_pixels(self.plot.chart, self.plot.chart_view))
+        indices = tiles_for_range(level, self.start, self.end)
+        neighbours = (indices.start - 1, indices.stop)
+        missing = []
+        points = []
+        for field in self.fields:
+            series_points = []
+            for index in indices:
+                key = (self.device, self.sensor, field, level, index)
+                tile = self.cache.get(key)
+                if tile is None:
+                    missing.append(key)
+                    continue
+                half = level * 500
+                for t, lo, hi in zip(tile.times, tile.mins, tile.maxs):
+                    if self.start - level <= t <= self.end:
+                        series_points.append((t * 1000, lo))
+                        if hi != lo:
+                            series_points.append((t * 1000 + half, hi))
+            points.append(series_points)
+        self.cache.request(missing, urgent=True)
+        self.cache.request([(self.device, self.sensor, field, level, i) for field in self.fields for i in neighbours],
+                           urgent=False)
+        self.plot.show_history(points, self.start * 1000, self.end * 1000)
+
+    def _current_range(self):
+        if self.live:
+            now = time.time()
+            return now - self.plot.window_secs, now
+        return self.start, self.end
+
+    def _plot_width(self):
+        return max(1.0, self.plot.chart.plotArea().width())
+
+    def _zoom(self, x, notches):
+        if not notches:
+            return
+        start, end = self._current_range()
+        area = self.plot.chart.plotArea()
+        anchor_frac = min(1.0, max(0.0, (x - area.left()) / self._plot_width()))
+        anchor = start + anchor_frac * (end - start)
+        span = min(max((end - start) * ZOOM_STEP ** notches, MIN_SPAN_SECS), MAX_SPAN_SECS)
+        new_start = anchor - anchor_frac * span
+        self.show_range(new_start, new_start + span)
+
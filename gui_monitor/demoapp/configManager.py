@@ -5,8 +5,9 @@ from pathlib import Path
 from PySide6.QtWidgets import QMessageBox
 
 class ConfigManager:
-    def __init__(self, window):
+    def __init__(self, window, quiet=False):
         self.window = window
+        self.quiet = quiet  # print instead of showing dialogs (unattended runs)
         self.base_dir = Path(__file__).parent
         self.config_dir = self.base_dir / "config"
         self.log_dir = self.base_dir / "logs"
@@ -23,28 +24,42 @@ class ConfigManager:
                 with open(path, "r") as f:
                     config = json.load(f)
                 # self.apply_config(config)
-                QMessageBox.information(self.window, "Config Loaded", f"Loaded config from {path.name}")
+                self._notify(QMessageBox.information, "Config Loaded", f"Loaded config from {path.name}")
                 return config
             except Exception as e:
-                QMessageBox.warning(self.window, "Load Error", f"Failed to load config: {e}")
+                self._notify(QMessageBox.warning, "Load Error", f"Failed to load config: {e}")
         else:
             filename = os.path.basename(path)
             if filename != "user_config.json":
-                QMessageBox.warning(self.window, "File Not Found", f"Config file {path.name} not found.")
+                self._notify(QMessageBox.warning, "File Not Found", f"Config file {path.name} not found.")
 
     def save_config(self, path: Path):
         try:
             config = self.collect_current_config()
             with open(path, "w") as f:
                 json.dump(config, f, indent=4)
-            QMessageBox.information(self.window, "Config Saved", f"Saved to {path.name}")
+            self._notify(QMessageBox.information, "Config Saved", f"Saved to {path.name}")
         except Exception as e:
-            QMessageBox.warning(self.window, "Save Error", f"Failed to save config: {e}")
+            self._notify(QMessageBox.warning, "Save Error", f"Failed to save config: {e}")
+
+    def _notify(self, dialog, title, text):
+        if self.quiet:
+            print(f"[Config] {title}: {text}")
+        else:
+            dialog(self.window, title, text)
 
     def collect_current_config(self):
         return {
             "sampling_interval": self.window.interval_input.value(),
             "alert_method": self.window.alert_method_combo.currentText(),
+            "ingest": self.window.ingest_config,
+            "render": self.window.render_config,
+            "logging": self.window.logging_config,
+            "history": self.window.history_config,
+            "devices": self.window.devices_config,
+            "mqtt": self.window.mqtt_config,
+            "stats": self.window.stats_config,
+            "rules": self.window.rules_config,
             "tabs": {
                 "Gyroscope": self.window.gyro_tab.get_tab_config(),
                 "Temperature & Humidity": self.window.temp_humid_tab.get_tab_config(),
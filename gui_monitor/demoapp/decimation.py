@@ -0,0 +1,118 @@
+class MinMaxDecimator:
+    """
+    Incremental per-pixel min/max (M4) downsampling of one time series.
+
+    The visible window is split into one bucket per horizontal pixel of the
+    plot area. Each bucket keeps its first, min, max and last point, which is
+    all a line chart can show at that resolution, so spikes survive no matter
+    how many samples land in the bucket. Buckets only have to be recomputed
+    when the window length or the pixel width changes; new samples update the
+    newest bucket in O(1).
+    """
+    def __init__(self, window_ms, pixels):
+        self._buckets = []
+        self.configure(window_ms, pixels)
+
+    def configure(self, window_ms, pixels):
+        self.window_ms = float(window_ms)
+        self.pixels = max(1, int(pixels))
+        self.bucket_ms = max(1.0, self.window_ms / self.pixels)
+        self._buckets = []
+
+    def clear(self):
+        self._buckets = []
+
+    def add(self, t, v):
+        index = int(t // self.bucket_ms)
+        buckets = self._buckets
+        if buckets and buckets[-1][0] == index:
+            b = buckets[-1]
+            if v < b[4]:
+                b[3], b[4] = t, v
+            if v > b[6]:
+                b[5], b[6] = t, v
+            b[7], b[8] = t, v
+            return
+
+        # [index, t_first, v_first, t_min, v_min, t_max, v_max, t_last, v_last]
+        buckets.append([index, t, v, t, v, t, v, t, v])
+        oldest = index - self.pixels
+        if buckets[0][0] <= oldest:
+            drop = 0
+            while drop < len(buckets) and buckets[drop][0] <= oldest:
+                drop += 1
+            del buckets[:drop]
+
+    def extend(self, timestamps, values):
+        for t, v in zip(timestamps, values):
+            self.add(t, v)
+
+    def rebuild(self, window_ms, pixels, timestamps=None, values=None):
+        """
+        Re-bucket for a new window or width. Raw samples are used when given,
+        otherwise the existing buckets are merged down, which is exact for
+        min/max as long as the new buckets are wider than the old ones.
+        """
+        previous = self.points() if timestamps is None else None
+        self.configure(window_ms, pixels)
+        if timestamps is not None:
+            self.extend(timestamps, values)
+        else:
+            for t, v in previous:
+                self.add(t, v)
+
+    def oldest_timestamp(self):
+        """Time of the first point in the oldest bucket, None when empty."""
+        return self._buckets[0][1] if self._buckets else None
+
+    def points(self):
+        out = []
+        for _, tf, vf, tmin, vmin, tmax, vmax, tl, vl in self._buckets:
+            out.append((tf, vf))
+            if tmin <= tmax:
+                middle = ((tmin, vmin), (tmax, vmax))
+            else:
+                middle = ((tmax, vmax), (tmin, vmin))
+            last_t = tf
+            for t, v in middle:
+                if t != last_t and t != tl:
+                    out.append((t, v))
+                    last_t = t
+            if tl != tf:
+                out.append((tl, vl))
+        return out
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def rebuild_decimators(decimators, window_ms, pixels, buffer, from_raw=False):
+    """
+    Re-bucket the decimators of one plot (one per column of `buffer`) for a
+    new window or width. The raw ring buffer is re-read when it reaches back
+    as far as the buckets do and the window grows (merging would lose what
+    lies before the old window) or already covers the new window. The
+    buckets are merged instead when the ring has wrapped past them, as they
+    then hold older data than the buffer, or when narrowing to a window the
+    buffer does not span.
+    """
+    first = buffer.first_timestamp()
+    oldest = decimators[0].oldest_timestamp()
+    if not from_raw and first is not None:
+        wrapped = oldest is not None and first > oldest
+        from_raw = not wrapped and (window_ms > decimators[0].window_ms
+                                    or buffer.last_timestamp() - first >= window_ms)
+    timestamps = buffer.timestamps() if from_raw else None
+    for i, decimator in enumerate(decimators):
+        if from_raw:
+            decimator.rebuild(window_ms, pixels, timestamps, buffer.column(i))
+        else:
+            decimator.rebuild(window_ms, pixels)
+
+
+def plot_pixels(chart, chart_view):
+    """Horizontal pixels available for data, falling back to the view width before the first layout."""
+    width = int(chart.plotArea().width())
+    if width <= 0:
+        width = chart_view.width()
+    return max(50, width)
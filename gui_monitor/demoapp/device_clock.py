@@ -0,0 +1,140 @@
+import time
+from collections import deque
+
+BUCKET_SECS = 10       # one offset minimum kept per bucket of host time
+WINDOW_SECS = 600      # offset history the drift is fitted over
+RESYNC_SECS = 30.0     # a jump this large means the device clock was reset, start over
+MIN_FIT_BUCKETS = 3
+
+
+class DeviceClock:
+    """
+    Maps a device's timestamps onto the host clock.
+
+    Every sample gives one observation of host_arrival - device_time, which
+    is the clock offset plus the (always positive) delivery delay. The
+    smallest observation in each BUCKET_SECS of host time is the one with
+    the least delay; a least-squares line through those minima over the last
+    WINDOW_SECS gives the offset and its drift. No sample is ever placed
+    after its own arrival: an observation below the line pulls it down at
+    once.
+
+    The board stamps whole seconds, so samples sharing a timestamp are
+    spread across that second by frame number, using the frame rate seen
+    between timestamp changes. At that resolution drift below the frame
+    spacing cannot be measured and is simply absorbed by pulling the line
+    down; timestamps with a fractional part get the full drift fit.
+    """
+    __slots__ = ("offset", "drift", "_ref", "_buckets", "_last_ms", "_second", "_second_frame",
+                 "_anchor", "_frame_rate", "resyncs")
+
+    def __init__(self):
+        self.offset = None  # seconds to add to device time at host time _ref
+        self.drift = 0.0    # change of the offset per second of host time
+        self._ref = 0.0
+        self._buckets = deque()  # [bucket index, min offset, host time of the min]
+        self._last_ms = None
+        self._second = None        # whole device second currently being spread
+        self._second_frame = None  # first frame number seen in it
+        self._anchor = None        # (device second, frame number) the frame rate is measured from
+        self._frame_rate = None    # frames per device second
+        self.resyncs = 0
+
+    def to_host_ms(self, device_ts, frame_no, received_at):
+        """
+        Host epoch milliseconds for a sample; its arrival time when the device
+        sent no timestamp or the sub-second position is not known yet.
+        """
+        fraction = None if device_ts is None else self._fraction(device_ts, frame_no)
+        if fraction is None:
+            t = received_at
+        else:
+            device_time = device_ts + fraction
+            self._observe(received_at - device_time, received_at)
+            t = min(device_time + self.offset_at(received_at), received_at)
+
+        t_ms = t * 1000.0
+        # buffers and decimation need time order, late frames are drawn at the newest time
+        if self._last_ms is not None and t_ms < self._last_ms:
+            t_ms = self._last_ms
+        self._last_ms = t_ms
+        return t_ms
+
+    def offset_at(self, host_time):
+        return self.offset + self.drift * (host_time - self._ref)
+
+    def _fraction(self, device_ts, frame_no):
+        """Position of a frame within its whole device second, None while the frame rate is unknown."""
+        if frame_no is None or device_ts != int(device_ts):
+            return 0.0
+        if device_ts == self._second:
+            if not self._frame_rate:
+                return None
+            return min(max(frame_no - self._second_frame, 0) / self._frame_rate, 0.999)
+
+        boundary = self._second is not None and device_ts > self._second
+        self._second = device_ts
+        self._second_frame = frame_no
+        if not boundary:
+            self._anchor = None
+            return None
+        # the rate is measured between second boundaries over 5-60 s, a single
+        # second holds a varying whole number of frames
+        anchor = self._anchor
+        if anchor is not None and frame_no > anchor[1]:
+            span = device_ts - anchor[0]
+            if span >= 5 or self._frame_rate is None:
+                self._frame_rate = (frame_no - anchor[1]) / span
+            if span >= 60:
+                self._anchor = (device_ts, frame_no)
+        else:
+            self._anchor = (device_ts, frame_no)
+        return 0.0 if self._frame_rate else None
+
+    def _observe(self, offset, host_time):
+        if self.offset is not None and abs(offset - self.offset_at(host_time)) > RESYNC_SECS:
+            self.resyncs += 1
+            # the drift belonged to the old clock too, the new one starts from a plain offset
+            self.offset = None
+            self.drift = 0.0
+            self._buckets.clear()
+            self._last_ms = None
+
+        index = int(host_time // BUCKET_SECS)
+        buckets = self._buckets
+        if buckets and buckets[-1][0] == index:
+            if offset < buckets[-1][1]:
+                buckets[-1][1] = offset
+                buckets[-1][2] = host_time
+        else:
+            buckets.append([index, offset, host_time])
+            while buckets[0][0] <= index - WINDOW_SECS // BUCKET_SECS:
+                buckets.popleft()
+            self._fit()
+
+        if self.offset is None:
+            self.offset = offset
+            self._ref = host_time
+        elif offset < self.offset_at(host_time):
+            self.offset = offset
+            self._ref = host_time
+
+    def _fit(self):
+        # only closed buckets: the newest one has barely started collecting its minimum
+        closed = list(self._buckets)[:-1]
+        if len(closed) < MIN_FIT_BUCKETS:
+            return
+        n = len(closed)
+        mean_t = sum(b[2] for b in closed) / n
+        mean_o = sum(b[1] for b in closed) / n
+        var = sum((b[2] - mean_t) ** 2 for b in closed)
+        if var <= 0:
+            return
+        self.drift = sum((b[2] - mean_t) * (b[1] - mean_o) for b in closed) / var
+        self._ref = mean_t
+        # the line through the minima, lowered so no bucket minimum lies below it
+        self.offset = mean_o + min(b[1] - (mean_o + self.drift * (b[2] - mean_t)) for b in closed)
+
+    def summary(self):
+        return {"offset_ms": None if self.offset is None else round(self.offset_at(time.time()) * 1000, 1),
+                "drift_ppm": round(self.drift * 1e6, 1), "resyncs": self.resyncs}
@@ -0,0 +1,111 @@
+import heapq
+import threading
+import time
+
+
+class PresenceMonitor:
+    """
+    Online/offline tracking for every device seen on the broker, on one
+    thread for all of them.
+
+    seen() is called for each message and only stamps the device's last-seen
+    time; a device gets a single heap entry at a time, due when it would go
+    quiet. When an entry comes due the thread either moves it to the new
+    deadline (the device reported meanwhile) or declares the device offline,
+    so the work is O(log n) per device per timeout period instead of per
+    message, and nothing runs while no deadline is due.
+
+    on_change(device_id, online, online_count) is called only on transitions:
+    online from the thread calling seen(), offline from the monitor thread.
+    """
+    def __init__(self, timeout=5.0, on_change=None):
+        self.timeout = timeout
+        self.on_change = on_change
+        self._last_seen = {}  # device id -> monotonic time of its last message
+        self._online = set()
+        self._heap = []       # (deadline, device id), at most one entry per device
+        self._scheduled = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="DevicePresence", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    def seen(self, device_id, now=None):
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            self._last_seen[device_id] = now
+            if device_id in self._online:
+                return
+            self._online.add(device_id)
+            count = len(self._online)
+            if device_id not in self._scheduled:
+                self._scheduled.add(device_id)
+                heapq.heappush(self._heap, (now + self.timeout, device_id))
+                if self._heap[0][1] == device_id:
+                    self._cond.notify()  # earlier than what the thread is sleeping towards
+        if self.on_change:
+            self.on_change(device_id, True, count)
+
+    def is_online(self, device_id):
+        return device_id in self._online
+
+    def last_seen(self, device_id):
+        """Seconds since the device's last message, None if it was never seen."""
+        seen = self._last_seen.get(device_id)
+        return None if seen is None else time.monotonic() - seen
+
+    def forget(self, device_id):
+        with self._cond:
+            self._last_seen.pop(device_id, None)
+            self._online.discard(device_id)  # its heap entry is skipped when it comes due
+
+    def summary(self):
+        with self._cond:
+            return {"tracked": len(self._last_seen), "online": len(self._online), "scheduled": len(self._heap)}
+
+    def _run(self):
+        while True:
+            went_offline = []
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                heap = self._heap
+                while heap and heap[0][0] <= now:
+                    _, device_id = heapq.heappop(heap)
+                    if device_id not in self._online:
+                        self._scheduled.discard(device_id)  # forgotten
+                        continue
+                    deadline = self._last_seen[device_id] + self.timeout
+                    if deadline > now:
+                        heapq.heappush(heap, (deadline, device_id))
+                    else:
+                        self._scheduled.discard(device_id)
+                        self._online.discard(device_id)
+                        went_offline.append((device_id, len(self._online)))
+            if self.on_change:
+                for device_id, count in went_offline:
+                    self.on_change(device_id, False, count)
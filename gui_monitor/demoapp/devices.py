@@ -0,0 +1,212 @@
+import time
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, Signal
+
+from device_clock import DeviceClock
+from mqtt_transport import topic_device_id
+from ring_buffer import RingBuffer
+from stream_stats import DeviceStats
+
+# sample keys per sensor, in ring buffer column order
+SENSOR_KEYS = {
+    "Gyroscope": ("gyro_x", "gyro_y", "gyro_z"),
+    "Temperature & Humidity": ("temperature", "humidity"),
+    "Light": ("light",),
+}
+
+# threshold expression variable -> sample key
+FIELD_VARS = {"X": "gyro_x", "Y": "gyro_y", "Z": "gyro_z", "T": "temperature", "H": "humidity", "L": "light"}
+
+
+FRAME_MODULO = 1 << 32  # frameNo is a uint32 on the board
+RESET_DISTANCE = 1000    # a jump further than this is a device restart, not loss or reordering
+MISSING_MEMORY = 4096    # missing frame numbers remembered for late arrivals
+FRAME_COUNTERS = ("received", "lost", "out_of_order", "duplicates", "stalls", "resets")
+
+
+class FrameTracker:
+    """
+    Follows a device's frame numbers and timestamps to tell apart why data
+    is missing:
+
+      lost          frame numbers skipped: the board sent them but they never
+                    arrived (network or broker loss); late arrivals are taken
+                    back off this count
+      out_of_order  frames that arrived after a later frame
+      duplicates    frames seen twice
+      stalls        consecutive frame numbers with a device clock gap longer
+                    than stall_secs: the board itself stopped producing
+      resets        frame numbers restarting, e.g. after a reboot
+    """
+    __slots__ = ("stall_secs", "expected", "last_ts") + FRAME_COUNTERS + ("_missing",)
+
+    def __init__(self, stall_secs=2.0):
+        self.stall_secs = stall_secs
+        self.expected = None  # next frame number
+        self.last_ts = None
+        self.received = 0
+        self.lost = 0
+        self.out_of_order = 0
+        self.duplicates = 0
+        self.stalls = 0
+        self.resets = 0
+        self._missing = OrderedDict()
+
+    def observe(self, frame_no, device_ts=None):
+        self.received += 1
+        if self.expected is None:
+            self._advance(frame_no, device_ts)
+            return
+
+        ahead = (frame_no - self.expected) % FRAME_MODULO
+        if ahead == 0:
+            if (device_ts is not None and self.last_ts is not None
+                    and device_ts - self.last_ts > self.stall_secs):
+                self.stalls += 1
+            self._advance(frame_no, device_ts)
+        elif ahead < RESET_DISTANCE:
+            for missing in range(self.expected, self.expected + ahead):
+                self._missing[missing % FRAME_MODULO] = None
+            while len(self._missing) > MISSING_MEMORY:
+                self._missing.popitem(last=False)
+            self.lost += ahead
+            self._advance(frame_no, device_ts)
+        elif frame_no in self._missing:
+            del self._missing[frame_no]
+            self.lost -= 1
+            self.out_of_order += 1
+        elif FRAME_MODULO - ahead <= RESET_DISTANCE and not self._clock_moved_on(device_ts):
+            self.duplicates += 1
+        else:
+            # far from where we were, or behind with a later clock: the counter restarted
+            self.resets += 1
+            self._missing.clear()
+            self._advance(frame_no, device_ts)
+
+    def _clock_moved_on(self, device_ts):
+        return device_ts is not None and self.last_ts is not None and device_ts > self.last_ts
+
+    def _advance(self, frame_no, device_ts):
+        self.expected = (frame_no + 1) % FRAME_MODULO
+        if device_ts is not None:
+            self.last_ts = device_ts
+
+    def summary(self):
+        return {name: getattr(self, name) for name in FRAME_COUNTERS}
+
+
+class Device:
+    """
+    Everything kept for one board: a ring buffer per sensor (shared with its
+    plots while the device is open), the latest sample, frame sequence
+    tracking, the clock offset estimate, streaming statistics per field and
+    the names of the alert rules currently active on it (kept by RuleEngine).
+    """
+    def __init__(self, device_id, buffer_points, stall_secs=2.0, stats_options=None):
+        self.device_id = device_id
+        self.frames = FrameTracker(stall_secs)
+        self.clock = DeviceClock()
+        self.buffers = {sensor: RingBuffer(buffer_points, columns=len(keys)) for sensor, keys in SENSOR_KEYS.items()}
+        self.stats = DeviceStats(FIELD_VARS.values(), **(stats_options or {}))
+        self.last_sample = None
+        self.last_seen = time.monotonic()
+        self.samples = 0
+        self.alerts = set()
+
+    def alert_active(self):
+        return bool(self.alerts)
+
+    def nbytes(self):
+        return sum(buffer.nbytes() for buffer in self.buffers.values()) + self.stats.nbytes()
+
+
+class DeviceManager(QObject):
+    """
+    Routes decoded samples to per-device state by the device ID in their
+    topic. Devices are created on their first sample and dropped again after
+    `idle_timeout` seconds without data, so memory follows the number of
+    active boards rather than every board ever seen.
+    """
+    device_added = Signal(str)
+    device_removed = Signal(str)
+
+    def __init__(self, topic_filter=None, buffer_points=36000, idle_timeout=600, stall_secs=2.0, parent=None):
+        super().__init__(parent)
+        self.topic_filter = topic_filter
+        self.buffer_points = buffer_points
+        self.idle_timeout = idle_timeout
+        self.stall_secs = stall_secs
+        self.stats_options = {}  # DeviceStats settings for devices created from now on
+        self.devices = {}
+        self._topic_ids = {}  # topic -> device ID
+        self.evicted = 0
+
+    def device_id(self, topic):
+        device_id = self._topic_ids.get(topic)
+        if device_id is None:
+            device_id = topic_device_id(self.topic_filter, topic)
+            if len(self._topic_ids) > 10000:
+                self._topic_ids.clear()
+            self._topic_ids[topic] = device_id
+        return device_id
+
+    def dispatch(self, samples):
+        """Group a batch by device, in arrival order. Returns [(device, samples), ...]."""
+        groups = {}
+        now = time.monotonic()
+        wall = time.time()
+        for sample in samples:
+            device_id = self.device_id(sample["topic"])
+            group = groups.get(device_id)
+            if group is None:
+                group = groups[device_id] = []
+            group.append(sample)
+
+        result = []
+        for device_id, group in groups.items():
+            device = self.devices.get(device_id)
+            if device is None:
+                device = self.devices[device_id] = Device(device_id, self.buffer_points, self.stall_secs,
+                                                          self.stats_options)
+                self.device_added.emit(device_id)
+            observe = device.frames.observe
+            to_host_ms = device.clock.to_host_ms
+            for sample in group:
+                frame_no = sample.get("frame_no")
+                device_ts = sample.get("device_ts")
+                if frame_no is not None:
+                    observe(frame_no, device_ts)
+                # plotted and logged time: the device clock mapped onto ours, not when the GUI got to it
+                sample["time_ms"] = to_host_ms(device_ts, frame_no, sample.get("received_at", wall))
+            device.last_seen = now
+            device.last_sample = group[-1]
+            device.samples += len(group)
+            result.append((device, group))
+        return result
+
+    def get(self, device_id):
+        return self.devices.get(device_id)
+
+    def evict_idle(self, keep=()):
+        """Forget devices idle for longer than idle_timeout, except the IDs in `keep`."""
+        if not self.idle_timeout:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [d for d, device in self.devices.items() if device.last_seen < cutoff and d not in keep]
+        for device_id in idle:
+            del self.devices[device_id]
+            self.evicted += 1
+            self.device_removed.emit(device_id)
+        return idle
+
+    def memory_used(self):
+        return sum(device.nbytes() for device in self.devices.values())
+
+    def frame_totals(self):
+        """FrameTracker counters summed over the active devices."""
+        totals = dict.fromkeys(FRAME_COUNTERS, 0)
+        for device in self.devices.values():
+            for key, value in device.frames.summary().items():
+                totals[key] += value
+        return totals
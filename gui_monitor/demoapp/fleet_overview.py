@@ -0,0 +1,303 @@
+import math
+import time
+from array import array
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QPointF, Qt, QTimer, Signal
+from PySide6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PySide6.QtWidgets import (
+    QComboBox, QHBoxLayout, QHeaderView, QLabel, QStyle, QStyledItemDelegate, QTableView, QVBoxLayout, QWidget
+)
+
+from devices import SENSOR_KEYS
+
+# sample key -> label, in the order offered by the field selector
+FIELDS = {
+    "temperature": "Temperature (°C)",
+    "humidity": "Humidity (%)",
+    "light": "Light",
+    "gyro_x": "Gyro X",
+    "gyro_y": "Gyro Y",
+    "gyro_z": "Gyro Z",
+}
+SAMPLE_KEYS = tuple(key for keys in SENSOR_KEYS.values() for key in keys)
+
+COLUMNS = ("Device", "Last", "Rate (/s)", "Lost / stalls", "Last seen", "Alert", "Trend")
+COL_DEVICE, COL_LAST, COL_RATE, COL_GAPS, COL_SEEN, COL_ALERT, COL_TREND = range(len(COLUMNS))
+
+SPARK_POINTS = 120  # one point per tick, two minutes at the default 1 s tick
+SparkRole = Qt.UserRole + 1
+
+ALERT_BRUSH = QColor("#f8d7da")
+_ROLES = frozenset((Qt.DisplayRole, SparkRole, Qt.BackgroundRole, Qt.TextAlignmentRole, Qt.ToolTipRole))
+
+
+class SparkBuffer:
+    """
+    Downsampled trend of one device: the per-tick mean of every sample key,
+    kept in a fixed float32 ring. Ticks without data store NaN so gaps show
+    as gaps.
+    """
+    __slots__ = ("points", "size", "head", "_sums", "_counts")
+
+    def __init__(self, points=SPARK_POINTS):
+        self.points = {key: array("f", [math.nan]) * points for key in SAMPLE_KEYS}
+        self.size = points
+        self.head = 0
+        self._sums = dict.fromkeys(SAMPLE_KEYS, 0.0)
+        self._counts = dict.fromkeys(SAMPLE_KEYS, 0)
+
+    def add(self, sample):
+        sums = self._sums
+        counts = self._counts
+        for key in SAMPLE_KEYS:
+            value = sample.get(key)
+            if value is not None:
+                sums[key] += value
+                counts[key] += 1
+
+    def close_bucket(self):
+        head = self.head
+        for key, ring in self.points.items():
+            count = self._counts[key]
+            ring[head] = self._sums[key] / count if count else math.nan
+            self._sums[key] = 0.0
+            self._counts[key] = 0
+        self.head = (head + 1) % self.size
+
+    def values(self, key):
+        """Oldest first."""
+        ring = self.points[key]
+        return ring[self.head:] + ring[:self.head]
+
+    def nbytes(self):
+        return sum(ring.itemsize * len(ring) for ring in self.points.values())
+
+
+class FleetModel(QAbstractTableModel):
+    """
+    One row per device known to the DeviceManager. Samples only update the
+    per-device accumulators; the view is told about changes once per tick,
+    and as a single dataChanged range, so the cost of a tick does not depend
+    on how many messages arrived and only the visible rows are repainted.
+    """
+    def __init__(self, devices, tick_ms=1000, parent=None):
+        super().__init__(parent)
+        self.devices = devices
+        self.field = "temperature"
+        self._ids = []      # row -> device ID
+        self._rows = {}     # device ID -> row
+        self._sparks = {}   # device ID -> SparkBuffer
+        self._rates = {}    # device ID -> samples per second over the last tick
+        self._counted = {}  # device ID -> Device.samples at the last tick
+        self._last_tick = time.monotonic()
+        self.ticks = 0
+        self.tick_cost = 0.0  # seconds spent in the last tick
+
+        devices.device_added.connect(self._on_device_added)
+        devices.device_removed.connect(self._on_device_removed)
+        for device_id in devices.devices:
+            self._on_device_added(device_id)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.tick)
+        self._timer.start(tick_ms)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or role != Qt.DisplayRole:
+            return None
+        if section == COL_LAST:
+            return FIELDS[self.field]
+        return COLUMNS[section]
+
+    def data(self, index, role=Qt.DisplayRole):
+        # the view asks for a dozen roles per cell on every paint, answer the unused ones first
+        if role not in _ROLES or not index.isValid():
+            return None
+        device_id = self._ids[index.row()]
+        device = self.devices.get(device_id)
+        if device is None:
+            return None
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == COL_DEVICE:
+                return device_id
+            if column == COL_LAST:
+                value = device.last_sample.get(self.field) if device.last_sample else None
+                return "" if value is None else f"{value:.2f}"
+            if column == COL_RATE:
+                return f"{self._rates.get(device_id, 0.0):.1f}"
+            if column == COL_GAPS:
+                return f"{device.frames.lost} / {device.frames.stalls}"
+            if column == COL_SEEN:
+                return f"{time.monotonic() - device.last_seen:.0f} s ago"
+            if column == COL_ALERT:
+                return "ALERT" if device.alert_active() else "ok"
+        elif role == SparkRole and column == COL_TREND:
+            return self._sparks[device_id].values(self.field)
+        elif role == Qt.BackgroundRole and column == COL_ALERT and device.alert_active():
+            return ALERT_BRUSH
+        elif role == Qt.ToolTipRole and column == COL_DEVICE:
+            clock = device.clock.summary()
+            return (f"Clock offset: {clock['offset_ms']} ms, drift: {clock['drift_ppm']} ppm, "
+                    f"resyncs: {clock['resyncs']}")
+        elif role == Qt.ToolTipRole and column == COL_GAPS:
+            return ", ".join(f"{name.replace('_', ' ')}: {value}" for name, value in device.frames.summary().items())
+        elif role == Qt.TextAlignmentRole and column in (COL_LAST, COL_RATE, COL_GAPS, COL_SEEN):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def device_at(self, row):
+        return self._ids[row]
+
+    def set_field(self, key):
+        self.field = key
+        self.headerDataChanged.emit(Qt.Horizontal, COL_LAST, COL_LAST)
+        self._emit_all()
+
+    def record(self, device, samples):
+        """Feed a batch of one device's samples into its sparkline bucket."""
+        spark = self._sparks.get(device.device_id)
+        if spark is None:
+            return
+        for sample in samples:
+            spark.add(sample)
+
+    def tick(self):
+        started = time.perf_counter()
+        now = time.monotonic()
+        elapsed = max(now - self._last_tick, 1e-6)
+        self._last_tick = now
+        for device_id, spark in self._sparks.items():
+            spark.close_bucket()
+            device = self.devices.get(device_id)
+            if device is not None:
+                self._rates[device_id] = (device.samples - self._counted.get(device_id, 0)) / elapsed
+                self._counted[device_id] = device.samples
+        self._emit_all()
+        self.ticks += 1
+        self.tick_cost = time.perf_counter() - started
+
+    def _emit_all(self):
+        if self._ids:
+            self.dataChanged.emit(self.index(0, COL_LAST), self.index(len(self._ids) - 1, COL_TREND))
+
+    def _on_device_added(self, device_id):
+        if device_id in self._rows:
+            return
+        row = len(self._ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._ids.append(device_id)
+        self._rows[device_id] = row
+        self._sparks[device_id] = SparkBuffer()
+        self.endInsertRows()
+
+    def _on_device_removed(self, device_id):
+        row = self._rows.get(device_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._ids[row]
+        self._rows = {d: i for i, d in enumerate(self._ids)}
+        for state in (self._sparks, self._rates, self._counted):
+            state.pop(device_id, None)
+        self.endRemoveRows()
+
+    def memory_used(self):
+        return sum(spark.nbytes() for spark in self._sparks.values())
+
+
+class SparklineDelegate(QStyledItemDelegate):
+    """Paints the SparkRole values of a cell as a polyline, broken at NaN gaps."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pen = QPen(QColor("#1f77b4"), 1)
+        self._pen.setCosmetic(True)
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        values = index.data(SparkRole)
+        if not values:
+            return
+        finite = [v for v in values if not math.isnan(v)]
+        if not finite:
+            return
+        low = min(finite)
+        high = max(finite)
+        span = (high - low) or 1.0
+        rect = option.rect.adjusted(3, 3, -3, -3)
+        x_step = rect.width() / max(1, len(values) - 1)
+        bottom = rect.bottom()
+        height = rect.height()
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(self._pen)
+        segment = QPolygonF()
+        for i, v in enumerate(values):
+            if math.isnan(v):
+                if segment.size() > 1:
+                    painter.drawPolyline(segment)
+                segment = QPolygonF()
+                continue
+            segment.append(QPointF(rect.left() + i * x_step, bottom - (v - low) / span * height))
+        if segment.size() > 1:
+            painter.drawPolyline(segment)
+        painter.restore()
+
+
+class FleetOverview(QWidget):
+    """
+    Table of every reporting device with its latest value, message rate,
+    alert state and a sparkline of the selected field. Double-click a row
+    to open that device in the sensor tabs.
+    """
+    device_activated = Signal(str)
+
+    def __init__(self, devices, parent=None):
+        super().__init__(parent)
+        self.model = FleetModel(devices, parent=self)
+
+        self.field_combo = QComboBox()
+        for key, label in FIELDS.items():
+            self.field_combo.addItem(label, key)
+        self.field_combo.setToolTip("Field shown in the Last and Trend columns")
+        self.field_combo.currentIndexChanged.connect(
+            lambda i: self.model.set_field(self.field_combo.itemData(i)))
+
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setItemDelegateForColumn(COL_TREND, SparklineDelegate(self.view))
+        self.view.setSelectionBehavior(QTableView.SelectRows)
+        self.view.setSelectionMode(QTableView.SingleSelection)
+        self.view.setAlternatingRowColors(True)
+        self.view.setWordWrap(False)
+        # fixed row heights keep the view from measuring every row
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(22)
+        self.view.verticalHeader().hide()
+        header = self.view.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(COL_TREND, QHeaderView.Stretch)
+        self.view.setColumnWidth(COL_DEVICE, 160)
+        self.view.doubleClicked.connect(self._on_double_clicked)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Field:"))
+        top.addWidget(self.field_combo)
+        top.addStretch()
+
+        layout = QVBoxLayout()
+        layout.addLayout(top)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+    def _on_double_clicked(self, index):
+        self.device_activated.emit(self.model.device_at(index.row()))
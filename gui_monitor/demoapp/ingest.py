@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import deque
+
+from PySide6.QtCore import QThread, Signal
+
+from payload_codec import PayloadDecoder
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class IngestQueue:
+    """
+    Bounded queue between the MQTT callback thread and the ingest worker.
+    put() only stores the raw (topic, payload) pair, so the CRT event loop
+    never waits on parsing or on the GUI.
+    """
+    def __init__(self, max_size=2000, overflow_policy=DROP_OLDEST, block_timeout=1.0):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.max_size = max(1, int(max_size))
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        # counters
+        self.received = 0
+        self.dropped = 0
+        self.high_watermark = 0
+
+    def put(self, topic, payload):
+        with self._lock:
+            if self._closed:
+                return False
+            self.received += 1
+            if len(self._items) >= self.max_size:
+                if self.overflow_policy == DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.overflow_policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._items) >= self.max_size and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._not_full.wait(remaining)
+                    if len(self._items) >= self.max_size or self._closed:
+                        # producer gave up waiting, the sample is lost
+                        self.dropped += 1
+                        return False
+            self._items.append((topic, payload, time.time()))
+            if len(self._items) > self.high_watermark:
+                self.high_watermark = len(self._items)
+            self._not_empty.notify()
+            return True
+
+    def get_batch(self, max_items, timeout):
+        """Wait up to `timeout` seconds for items and return at most `max_items` of them."""
+        with self._lock:
+            if not self._items and not self._closed:
+                self._not_empty.wait(timeout)
+            count = min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(count)]
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def depth(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": len(self._items),
+                "max_size": self.max_size,
+                "received": self.received,
+                "dropped": self.dropped,
+                "high_watermark": self.high_watermark,
+                "policy": self.overflow_policy,
+            }
+
+
+class IngestWorker(QThread):
+    """
+    Drains the IngestQueue, decodes payloads and hands decoded samples to
+    the GUI thread in batches through the batch_ready signal.
+    """
+    batch_ready = Signal(list)
+
+    def __init__(self, ingest_queue, max_batch=200, poll_interval=0.05, decoder=None, parent=None):
+        super().__init__(parent)
+        self.queue = ingest_queue
+        self.decoder = decoder if decoder is not None else PayloadDecoder()
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.messages = 0
+        self.decoded = 0  # samples, a batched message counts once per frame
+        self.decode_errors = 0
+
+    def run(self):
+        while not self.queue.closed or self.queue.depth():
+            items = self.queue.get_batch(self.max_batch, self.poll_interval)
+            if not items:
+                continue
+
+            samples = []
+            decode = self.decoder.decode
+            for topic, payload, received_at in items:
+                try:
+                    decoded = decode(topic, payload)
+                except Exception as e:
+                    self.decode_errors += 1
+                    print(f"[❌] MQTT parse error: {e}")
+                    continue
+                # a batched payload unpacks into several samples in one go
+                for sample in decoded:
+                    sample["received_at"] = received_at
+                samples.extend(decoded)
+
+            self.messages += len(items)
+            self.decoded += len(samples)
+            if samples:
+                self.batch_ready.emit(samples)
+
+    def stop(self, wait_ms=2000):
+        self.queue.close()
+        self.wait(wait_ms)
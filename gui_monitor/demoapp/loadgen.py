@@ -0,0 +1,230 @@
+"""
+Synthetic device load for the monitor, without the board or AWS IoT.
+
+    python loadgen.py --devices 1 10 100 --rate 10 --duration 20 --headless
+    python loadgen.py --broker local --devices 50 --no-gui     # mosquitto on localhost
+
+Each simulated device publishes the STM32 JSON payload (frmNo, ts, gyro_x,
+gyro_y, gyro_z, temperature, humidity, light), or the packed SensorData_t
+struct with --payload binary, on sensors/<device>/data at `--rate` samples
+per second, `--batch` samples per message. Unless --no-gui is given, a MainWindow is started on the same
+broker (in-process by default) for every device count and the
+ingest-to-render latency is measured: from the moment the MQTT callback
+queued a message to the end of the first render frame that drew it.
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+from mqtt_transport import InProcessBroker, local_connection
+from payload_codec import encode_binary
+
+
+class SimulatedDevice:
+    def __init__(self, device_id, seed=None, binary=False):
+        self.device_id = device_id
+        self.binary = binary
+        self.topic = f"sensors/{device_id}/data"
+        self.frame_no = 0
+        self._rng = random.Random(seed)
+        self._phase = self._rng.uniform(0, 2 * math.pi)
+
+    def frame(self, now):
+        self.frame_no += 1
+        rng = self._rng
+        wobble = math.sin(now + self._phase)
+        # same units as the board sends: temperature +10 offset, humidity as a fraction
+        return {
+            "frmNo": self.frame_no,
+            "ts": int(now),
+            "gyro_x": round(wobble + rng.gauss(0, 0.05), 4),
+            "gyro_y": round(rng.gauss(0, 0.2), 4),
+            "gyro_z": round(-wobble + rng.gauss(0, 0.05), 4),
+            "temperature": round(35 + 2 * wobble + rng.gauss(0, 0.1), 2),
+            "humidity": round(0.5 + 0.05 * wobble, 4),
+            "light": round(250 + 100 * wobble + rng.gauss(0, 5), 1),
+        }
+
+    def payload(self, now, batch=1, period=0.0):
+        """`batch` frames sampled `period` seconds apart and ending at `now`, in one message."""
+        frames = [self.frame(now - (batch - 1 - k) * period) for k in range(batch)]
+        if self.binary:
+            return b"".join(encode_binary(f["frmNo"], f["ts"], f["temperature"], f["gyro_x"], f["gyro_y"],
+                                          f["gyro_z"], f["light"], f["humidity"]) for f in frames)
+        return json.dumps(frames if batch > 1 else frames[0]).encode()
+
+
+class LoadGenerator(threading.Thread):
+    """
+    Samples every device at `rate` per second and publishes them `batch`
+    frames per message, staggered so the load is spread evenly.
+    """
+    def __init__(self, publish, devices, rate=10.0, duration=10.0, binary=False, batch=1):
+        super().__init__(name="LoadGenerator", daemon=True)
+        self.publish = publish
+        self.devices = [SimulatedDevice(f"sim-{i:04d}", seed=i, binary=binary) for i in range(devices)]
+        self.batch = max(1, batch)
+        self.period = 1.0 / rate
+        self.interval = self.batch / rate
+        self.duration = duration
+        self.sent = 0
+        self.late = 0  # publishes more than one interval behind schedule
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        start = time.perf_counter()
+        end = start + self.duration
+        step = self.interval / max(1, len(self.devices))
+        schedule = [(start + i * step, i) for i in range(len(self.devices))]
+        heapq.heapify(schedule)
+        while schedule and not self._stop_event.is_set():
+            due, i = schedule[0]
+            if due >= end:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+            if delay < -self.interval:
+                self.late += 1
+            device = self.devices[i]
+            self.publish(device.topic, device.payload(time.time(), self.batch, self.period))
+            self.sent += 1
+            heapq.heapreplace(schedule, (due + self.interval, i))
+
+
+class LatencyProbe:
+    """Ingest-to-render latency of every sample, taken at the end of the frame that drew it."""
+    def __init__(self, window, max_samples=500000):
+        self.latencies = deque(maxlen=max_samples)
+        self._pending = []
+        window.ingest_worker.batch_ready.connect(self._on_batch)
+        window.render_scheduler.frame_done.connect(self._on_frame)
+
+    def _on_batch(self, samples):
+        self._pending.extend(s["received_at"] for s in samples)
+
+    def _on_frame(self, flushed):
+        if flushed and self._pending:
+            now = time.time()
+            self.latencies.extend(now - t for t in self._pending)
+            self._pending = []
+
+    def summary(self):
+        values = sorted(self.latencies)
+        if not values:
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+
+        def pct(p):
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 2)
+        return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+                "max_ms": round(values[-1] * 1000, 2)}
+
+
+def make_publisher(broker):
+    if broker == "inprocess":
+        target = InProcessBroker.default()
+        return lambda topic, payload: target.publish(topic, payload)
+
+    from awscrt import mqtt
+    connection = local_connection(os.getenv("MQTT_HOST", "localhost"), int(os.getenv("MQTT_PORT", "1883")),
+                                  f"loadgen-{os.getpid()}")
+    connection.connect().result(timeout=10)
+    return lambda topic, payload: connection.publish(topic, payload, mqtt.QoS.AT_MOST_ONCE)
+
+
+def run_with_gui(app, broker, devices, rate, duration, log_dir, binary=False, batch=1):
+    from PySide6.QtCore import QTimer
+    from main import MainWindow
+
+    window = MainWindow(interactive=False, log_dir=log_dir, mqtt_transport=broker)
+    window.show()
+    # the monitor connects in the background, publishing earlier would go unheard
+    window.mqtt_connected.wait(timeout=30)
+    probe = LatencyProbe(window)
+    generator = LoadGenerator(make_publisher(broker), devices, rate, duration, binary, batch)
+    frames_before = window.render_scheduler.frames
+
+    generator.start()
+    # give the queue a moment to drain after the last publish
+    QTimer.singleShot(int(duration * 1000) + 500, app.quit)
+    started = time.perf_counter()
+    app.exec()
+    elapsed = time.perf_counter() - started
+    generator.stop()
+
+    stats = window.ingest_queue.stats()
+    report = {
+        "devices": devices,
+        "target_msg_s": devices * rate / max(1, batch),
+        "sent": generator.sent,
+        "samples": window.ingest_worker.decoded,
+        "late": generator.late,
+        "dropped": stats["dropped"],
+        "queue_peak": stats["high_watermark"],
+        "render_fps": round((window.render_scheduler.frames - frames_before) / elapsed, 1),
+    }
+    report.update(probe.summary())
+    window.shutdown()
+    window.deleteLater()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 100],
+                        help="device counts to run, one after another (default: 1 10 100)")
+    parser.add_argument("--rate", type=float, default=10.0, help="samples per second per device (default: 10)")
+    parser.add_argument("--batch", type=int, default=1, help="samples per message (default: 1)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run (default: 10)")
+    parser.add_argument("--broker", choices=("inprocess", "local"), default="inprocess",
+                        help="in-process broker stand-in, or MQTT_HOST:MQTT_PORT (default: inprocess)")
+    parser.add_argument("--payload", choices=("json", "binary"), default="json",
+                        help="JSON objects, or the packed SensorData_t struct (default: json)")
+    parser.add_argument("--no-gui", action="store_true",
+                        help="only publish, e.g. for a monitor started separately with MQTT_TRANSPORT=local")
+    parser.add_argument("--log-dir", default="loadgen_logs", help="where the monitor logs the generated samples")
+    parser.add_argument("--headless", action="store_true", help="run the monitor on the offscreen Qt platform")
+    parser.add_argument("--json", action="store_true", help="print one JSON report per run")
+    args = parser.parse_args()
+
+    if args.no_gui:
+        if args.broker == "inprocess":
+            parser.error("--no-gui needs --broker local, nothing else can see an in-process broker")
+        for devices in args.devices:
+            generator = LoadGenerator(make_publisher(args.broker), devices, args.rate, args.duration,
+                                      args.payload == "binary", args.batch)
+            generator.start()
+            generator.join()
+            print(f"{devices} devices: sent {generator.sent} messages, {generator.late} late")
+        return
+
+    if args.headless:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PySide6.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+
+    columns = ("devices", "target_msg_s", "sent", "samples", "dropped", "queue_peak",
+               "p50_ms", "p95_ms", "p99_ms", "max_ms", "render_fps")
+    if not args.json:
+        print("".join(f"{c:>13}" for c in columns))
+    for devices in args.devices:
+        report = run_with_gui(app, args.broker, devices, args.rate, args.duration, args.log_dir,
+                              args.payload == "binary", args.batch)
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print("".join(f"{str(report[c]):>13}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Historical queries over the sensor logs.
+
+    store = LogStore("logs")
+    store.query("Gyroscope", "X", start, end)                # [(t, value), ...]
+    store.query("Gyroscope", "X", start, end, buckets=600)   # [(t, min, max, mean, count), ...]
+    store.query("Gyroscope", "X", start, end, device="board-1")
+
+Times are epoch seconds. Every segment gets a sparse time index in a
+sidecar file (<segment>.idx) holding the byte offset of the first row of
+each `index_interval` seconds, plus the segment's time range. A query skips
+segments outside the range and seeks straight to the nearest indexed offset
+in the others. Rows need not be in time order (device clock mapping, late
+and replayed frames): the index also records how far a row ever lagged
+behind the newest row before it, and a scan only stops once it is past
+the end of the range by more than that. Segments are append-only, so an index is extended from where
+it stopped instead of being rebuilt; compressed segments are indexed on
+their decompressed stream.
+
+The same pass keeps per-series min/max/sum/count rollups at the
+ROLLUP_LEVELS bucket widths in a second sidecar (<segment>.agg), so
+coarse history (query_rollup) never re-reads raw rows.
+"""
+import bisect
+import gzip
+import io
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import sensor_log_format
+from log_rotation import list_segments, INDEX_SUFFIX, ROLLUP_SUFFIX
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+INDEX_VERSION = 3
+# bucket widths (seconds) aggregated while indexing, for the coarse history levels
+ROLLUP_LEVELS = (60, 3600)
+# rollups of this many segments are kept in memory
+ROLLUP_CACHE = 8
+
+
+def _open_stream(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path, "rb")
+
+
+def _skip_to(stream, offset):
+    """Move a (possibly compressed, forward-only) stream to `offset`."""
+    try:
+        stream.seek(offset)
+    except (OSError, ValueError):
+        remaining = offset
+        while remaining > 0:
+            chunk = stream.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+
+class _CsvReader:
+    """Yields (offset, next_offset, epoch_seconds, sensor, field, value, device) from a CSV segment stream."""
+    def __init__(self):
+        self._stamp_cache = {}
+
+    def parse_time(self, stamp):
+        t = self._stamp_cache.get(stamp)
+        if t is None:
+            t = time.mktime(time.strptime(stamp, sensor_log_format.CSV_TIME_FORMAT))
+            if len(self._stamp_cache) > 4096:
+                self._stamp_cache.clear()
+            self._stamp_cache[stamp] = t
+        return t
+
+    def rows(self, stream, offset):
+        for line in stream:
+            if not line.endswith(b"\n"):
+                # row still being written
+                return
+            start = offset
+            offset += len(line)
+            parts = line.decode("utf-8", "replace").rstrip("\r\n").split(",")
+            if len(parts) not in (4, 5) or parts[0] == "timestamp":
+                continue
+            try:
+                yield (start, offset, self.parse_time(parts[0]), parts[1], parts[2], float(parts[3]),
+                       parts[4] if len(parts) == 5 else "")
+            except ValueError:
+                continue
+
+
+class _BinaryReader:
+    """Yields (offset, next_offset, epoch_seconds, sensor, field, value, device) from a .slog segment stream."""
+    def __init__(self, path):
+        self.path = path
+        self.devices = sensor_log_format.load_devices(path)
+
+    def device(self, slot):
+        if slot and slot not in self.devices:
+            # the writer adds devices to the sidecar while the segment is open
+            self.devices = sensor_log_format.load_devices(self.path)
+        return self.devices.get(slot, "")
+
+    def rows(self, stream, offset):
+        slot_size = sensor_log_format.SLOT_SIZE
+        # only whole slots are addressable
+        offset -= offset % slot_size
+        slot = offset // slot_size
+        while True:
+            chunk = stream.read(slot_size * 1024)
+            if not chunk:
+                return
+            usable = len(chunk) - len(chunk) % slot_size
+            for i in range(0, usable, slot_size):
+                if slot % sensor_log_format.BLOCK_SLOTS:
+                    ts, sensor_id, count, *values = sensor_log_format.RECORD.unpack_from(chunk, i)
+                    name, fields = sensor_log_format.SENSORS[sensor_id]
+                    count, device_slot = sensor_log_format.split_count(count)
+                    device = self.device(device_slot)
+                    t = ts / 1e9
+                    offset = slot * slot_size
+                    for field, value in zip(fields[:count], values):
+                        if not math.isnan(value):
+                            yield offset, offset + slot_size, t, name, field, value, device
+                slot += 1
+            if usable < len(chunk):
+                return
+
+
+def _reader_for(path):
+    return _BinaryReader(path) if ".slog" in os.path.basename(path) else _CsvReader()
+
+
+def iter_segment_rows(path):
+    """Yield (epoch_seconds, sensor, field, value, device) for every row of one segment, in file order."""
+    reader = _reader_for(path)
+    with _open_stream(path) as stream:
+        for _, _, t, sensor, field, value, device in reader.rows(stream, 0):
+            yield t, sensor, field, value, device
+
+
+class LogStore:
+    def __init__(self, log_dir="logs", index_interval=60):
+        if not os.path.isabs(log_dir):
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            log_dir = os.path.join(base_dir, log_dir)
+        self.log_dir = log_dir
+        self.index_interval = index_interval
+        self._indexes = {}  # path -> loaded sidecar
+        self._rollups = OrderedDict()  # path -> {level: {(device, sensor, field): {bucket: [min, max, sum, count]}}}
+
+    # ---- index maintenance ----
+
+    def _load_index(self, path):
+        index = self._indexes.get(path)
+        if index is None:
+            try:
+                with open(path + INDEX_SUFFIX, "r") as f:
+                    index = json.load(f)
+                if index.get("version") != INDEX_VERSION or index.get("interval") != self.index_interval:
+                    index = None
+            except (OSError, ValueError):
+                index = None
+        return index if index is not None else self._new_index()
+
+    def _new_index(self):
+        return {"version": INDEX_VERSION, "interval": self.index_interval, "indexed_bytes": 0,
+                "complete": False, "t_min": None, "t_max": None, "max_lag": 0.0, "entries": []}
+
+    def _save_index(self, path, index):
+        # per thread: the compressor and the history loader may index the same segment
+        tmp = f"{path}{INDEX_SUFFIX}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp, path + INDEX_SUFFIX)
+        except OSError as e:
+            print(f"[Log Error] Failed to write index for {path}: {e}")
+
+    def _load_rollup(self, path, indexed_bytes):
+        """The segment's rollups if they cover exactly `indexed_bytes` of it, else None."""
+        rollup = self._rollups.get(path)
+        if rollup is None:
+            try:
+                with open(path + ROLLUP_SUFFIX, "r") as f:
+                    saved = json.load(f)
+                if saved.get("version") != INDEX_VERSION or saved.get("indexed_bytes") != indexed_bytes:
+                    return None
+                rollup = {int(level): {(device, sensor, field): {int(b): v for b, v in buckets.items()}
+                                       for device, sensor, field, buckets in series}
+                          for level, series in saved["levels"].items()}
+            except (OSError, ValueError, KeyError):
+                return None
+        self._rollups[path] = rollup
+        self._rollups.move_to_end(path)
+        while len(self._rollups) > ROLLUP_CACHE:
+            self._rollups.popitem(last=False)
+        return rollup
+
+    def _save_rollup(self, path, rollup, indexed_bytes):
+        saved = {"version": INDEX_VERSION, "indexed_bytes": indexed_bytes,
+                 "levels": {str(level): [[*series, buckets] for series, buckets in by_series.items()]
+                            for level, by_series in rollup.items()}}
+        # per thread: the compressor and the history loader may index the same segment
+        tmp = f"{path}{ROLLUP_SUFFIX}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(saved, f, separators=(",", ":"))
+            os.replace(tmp, path + ROLLUP_SUFFIX)
+        except OSError as e:
+            print(f"[Log Error] Failed to write rollup for {path}: {e}")
+
+    def index(self, path):
+        """
+        Return the sparse time index of a segment, extending it and the
+        segment's rollups over anything appended since.
+        """
+        index = self._load_index(path)
+        compressed = path.endswith((".gz", ".zst"))
+        up_to_date = index["complete"] if compressed else os.path.getsize(path) <= index["indexed_bytes"]
+        if up_to_date and (not index["indexed_bytes"] or path in self._rollups
+                           or os.path.exists(path + ROLLUP_SUFFIX)):
+            self._indexes[path] = index
+            return index
+
+        rollup = self._load_rollup(path, index["indexed_bytes"]) if index["indexed_bytes"] else None
+        if rollup is None:
+            # no rollups for what is indexed (older sidecars): start both over
+            index = self._new_index()
+            rollup = self._rollups[path] = {level: {} for level in ROLLUP_LEVELS}
+        entries = index["entries"]
+        next_mark = entries[-1][0] + self.index_interval if entries else None
+        resume = index["indexed_bytes"]
+        end = resume
+        with _open_stream(path) as stream:
+            _skip_to(stream, resume)
+            for offset, end, t, sensor, field, value, device in _reader_for(path).rows(stream, resume):
+                for level, by_series in rollup.items():
+                    buckets = by_series.get((device, sensor, field))
+                    if buckets is None:
+                        buckets = by_series[(device, sensor, field)] = {}
+                    bucket = int(t - t % level)
+                    agg = buckets.get(bucket)
+                    if agg is None:
+                        buckets[bucket] = [value, value, value, 1]
+                    else:
+                        if value < agg[0]:
+                            agg[0] = value
+                        if value > agg[1]:
+                            agg[1] = value
+                        agg[2] += value
+                        agg[3] += 1
+                if next_mark is None or t >= next_mark:
+                    bucket = t - t % self.index_interval
+                    entries.append([bucket, offset])
+                    next_mark = bucket + self.index_interval
+                if index["t_min"] is None or t < index["t_min"]:
+                    index["t_min"] = t
+                if index["t_max"] is None or t > index["t_max"]:
+                    index["t_max"] = t
+                elif index["t_max"] - t > index["max_lag"]:
+                    # row out of time order: how far behind the newest row so far
+                    index["max_lag"] = index["t_max"] - t
+        index["complete"] = compressed
+        self._indexes[path] = index
+        if end != resume or compressed:
+            index["indexed_bytes"] = end
+            self._save_rollup(path, rollup, end)
+            self._save_index(path, index)
+        return index
+
+    # ---- queries ----
+
+    def _candidate_segments(self, start, end):
+        # file names carry the local day; allow a day of slack on both sides
+        first_day = (datetime.fromtimestamp(start) - timedelta(days=1)).strftime("%Y-%m-%d")
+        last_day = (datetime.fromtimestamp(end) + timedelta(days=1)).strftime("%Y-%m-%d")
+        for day, _, _, _, path in list_segments(self.log_dir):
+            if first_day <= day <= last_day:
+                yield path
+
+    def iter_rows(self, sensor, field, start, end, device=None):
+        """
+        Yield (t, value) for one sensor field in [start, end], in file order.
+        With `device`, only that device's rows and untagged rows (logged
+        before multi-device support) are returned.
+
+        A row before an index entry is older than the entry's time, so the
+        scan may start at the entry for `start`. It ends at the first entry
+        later than end + max_lag: no row after that can be in range, even
+        out of order. Rows past `end` before that point are skipped, not
+        taken as the end of the range.
+        """
+        for path in self._candidate_segments(start, end):
+            try:
+                index = self.index(path)
+            except (OSError, EOFError, RuntimeError) as e:
+                print(f"[Log Error] Skipping {path}: {e}")
+                continue
+            if index["t_min"] is None or index["t_max"] < start or index["t_min"] > end:
+                continue
+
+            entries = index["entries"]
+            pos = bisect.bisect_right(entries, [start, float("inf")]) - 1
+            offset = entries[pos][1] if pos >= 0 else 0
+            stop = bisect.bisect_right(entries, [end + index["max_lag"], float("inf")])
+            stop_offset = entries[stop][1] if stop < len(entries) else None
+            reader = _reader_for(path)
+            with _open_stream(path) as stream:
+                _skip_to(stream, offset)
+                for row_offset, _, t, row_sensor, row_field, value, row_device in reader.rows(stream, offset):
+                    if stop_offset is not None and row_offset >= stop_offset:
+                        break
+                    if (start <= t <= end and row_sensor == sensor and row_field == field
+                            and (device is None or not row_device or row_device == device)):
+                        yield t, value
+
+    def query(self, sensor, field, start, end, buckets=None, device=None):
+        """
+        Rows of one sensor field between `start` and `end` (epoch seconds).
+        With `buckets`, the range is split into that many equal buckets and
+        (bucket_start, min, max, mean, count) is returned for each non-empty one.
+        """
+        if end < start:
+            start, end = end, start
+        if not buckets:
+            return list(self.iter_rows(sensor, field, start, end, device))
+
+        width = (end - start) / buckets or 1.0
+        stats = {}
+        for t, value in self.iter_rows(sensor, field, start, end, device):
+            slot = min(int((t - start) / width), buckets - 1)
+            s = stats.get(slot)
+            if s is None:
+                stats[slot] = [value, value, value, 1]
+            else:
+                if value < s[0]:
+                    s[0] = value
+                if value > s[1]:
+                    s[1] = value
+                s[2] += value
+                s[3] += 1
+        return [(start + slot * width, s[0], s[1], s[2] / s[3], s[3]) for slot, s in sorted(stats.items())]
+
+    def query_rollup(self, sensor, field, start, end, level, device=None):
+        """
+        (bucket_start, min, max, mean, count) of one sensor field per `level`
+        seconds (one of ROLLUP_LEVELS) for the buckets starting in [start, end),
+        read from the segments' rollups rather than their rows. Device filtering is as in
+        iter_rows.
+        """
+        if end < start:
+            start, end = end, start
+        merged = {}
+        for path in self._candidate_segments(start, end):
+            try:
+                index = self.index(path)
+                rollup = self._load_rollup(path, index["indexed_bytes"])
+            except (OSError, EOFError, RuntimeError) as e:
+                print(f"[Log Error] Skipping {path}: {e}")
+                continue
+            if rollup is None or index["t_min"] is None or index["t_max"] < start or index["t_min"] > end:
+                continue
+            for (row_device, row_sensor, row_field), buckets in rollup[level].items():
+                if (row_sensor != sensor or row_field != field
+                        or (device is not None and row_device and row_device != device)):
+                    continue
+                for bucket, agg in buckets.items():
+                    if not start <= bucket < end:
+                        continue
+                    m = merged.get(bucket)
+                    if m is None:
+                        merged[bucket] = list(agg)
+                    else:
+                        if agg[0] < m[0]:
+                            m[0] = agg[0]
+                        if agg[1] > m[1]:
+                            m[1] = agg[1]
+                        m[2] += agg[2]
+                        m[3] += agg[3]
+        return [(bucket, m[0], m[1], m[2] / m[3], m[3]) for bucket, m in sorted(merged.items())]
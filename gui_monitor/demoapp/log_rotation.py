@@ -0,0 +1,153 @@
+import os
+import re
+import gzip
+import queue
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+from sensor_log_format import DEVICES_SUFFIX
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# log_2025-07-01.csv, log_2025-07-01.2.slog, log_2025-07-01.1.csv.gz, ...
+SEGMENT_RE = re.compile(r"^log_(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.(csv|slog)(\.gz|\.zst)?$")
+
+COMPRESSIONS = (None, "gzip", "zstd")
+
+# sidecar time index and per-level rollups written by log_query
+INDEX_SUFFIX = ".idx"
+ROLLUP_SUFFIX = ".agg"
+# files that belong to a segment and follow it through compression and pruning
+SIDECAR_SUFFIXES = (INDEX_SUFFIX, ROLLUP_SUFFIX, DEVICES_SUFFIX)
+
+
+def segment_name(day, index, ext):
+    if index == 0:
+        return f"log_{day}.{ext}"
+    return f"log_{day}.{index}.{ext}"
+
+
+def list_segments(log_dir):
+    """Return (day, index, ext, suffix, path) for every log segment, oldest first."""
+    segments = []
+    try:
+        names = os.listdir(log_dir)
+    except FileNotFoundError:
+        return segments
+    for name in names:
+        m = SEGMENT_RE.match(name)
+        if m:
+            day, index, ext, suffix = m.groups()
+            segments.append((day, int(index or 0), ext, suffix or "", os.path.join(log_dir, name)))
+    segments.sort(key=lambda s: (s[0], s[1]))
+    return segments
+
+
+def day_bounds_ns(timestamp_ns):
+    """Local calendar day of a timestamp and the epoch ns of the following midnight."""
+    moment = datetime.fromtimestamp(timestamp_ns / 1e9)
+    midnight = datetime(moment.year, moment.month, moment.day) + timedelta(days=1)
+    return moment.strftime("%Y-%m-%d"), int(midnight.timestamp() * 1e9)
+
+
+class LogCompressor(threading.Thread):
+    """
+    Compresses closed log segments and applies the retention policy on its
+    own thread, so rotating a large file never blocks the log writer.
+    """
+    def __init__(self, log_dir, compression="gzip", retention_days=30, max_total_bytes=0):
+        super().__init__(name="SensorLogCompressor", daemon=True)
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            print("[Log Warning] zstandard is not installed, falling back to gzip")
+            compression = "gzip"
+        self.log_dir = log_dir
+        self.compression = compression
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self._queue = queue.Queue()
+        self.active_path = None  # segment the writer has open, never pruned
+        self.compressed = 0
+        self.pruned = 0
+
+    def submit(self, path):
+        self._queue.put(path)
+
+    def stop(self, timeout=30.0):
+        self._queue.put(None)
+        self.join(timeout)
+
+    def run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                break
+            try:
+                self._index(path)
+                if self.compression:
+                    self._compress(path)
+                self.prune()
+            except Exception as e:
+                print(f"[Log Error] Failed to compress {path}: {e}")
+
+    def _index(self, path):
+        # the segment is closed: build its time index and rollups now, while it is still
+        # uncompressed, instead of on the first history query
+        from log_query import LogStore
+        if os.path.exists(path):
+            LogStore(self.log_dir).index(path)
+
+    def _compress(self, path):
+        if not os.path.exists(path):
+            return
+        if self.compression == "zstd":
+            target = path + ".zst"
+            with open(path, "rb") as src, open(target + ".tmp", "wb") as dst:
+                zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+        else:
+            target = path + ".gz"
+            with open(path, "rb") as src, gzip.open(target + ".tmp", "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        # only replace the raw segment once the compressed copy is complete
+        os.replace(target + ".tmp", target)
+        os.remove(path)
+        # the time index (log_query) refers to decompressed offsets, so it stays valid
+        for sidecar in SIDECAR_SUFFIXES:
+            if os.path.exists(path + sidecar):
+                os.replace(path + sidecar, target + sidecar)
+        self.compressed += 1
+
+    def prune(self):
+        segments = [s for s in list_segments(self.log_dir) if s[4] != self.active_path]
+        if self.retention_days:
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+            for day, _, _, _, path in segments:
+                if day < cutoff:
+                    self._remove(path)
+            segments = [s for s in segments if os.path.exists(s[4])]
+
+        if self.max_total_bytes:
+            sizes = [(s[4], os.path.getsize(s[4])) for s in segments]
+            total = sum(size for _, size in sizes)
+            if self.active_path and os.path.exists(self.active_path):
+                total += os.path.getsize(self.active_path)
+            for path, size in sizes:
+                if total <= self.max_total_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            for sidecar in SIDECAR_SUFFIXES:
+                if os.path.exists(path + sidecar):
+                    os.remove(path + sidecar)
+            self.pruned += 1
+        except OSError as e:
+            print(f"[Log Error] Failed to remove {path}: {e}")
@@ -1,42 +1,291 @@
 import os
 import csv
+import time
+import queue
+import threading
 from datetime import datetime
 
+import sensor_log_format
+from log_rotation import LogCompressor, list_segments, segment_name, day_bounds_ns
+
+LOG_FORMATS = ("csv", "binary")
+
+_FLUSH = object()
+_STOP = object()
+
+
 class SensorLogger:
-    def __init__(self, log_dir="logs", batch_size=20):
+    """
+    Sensor log writer. log_sample() only timestamps the sample and puts it
+    on a bounded queue; a dedicated writer thread keeps the file open,
+    encodes samples, and writes them out when `batch_size` samples are
+    pending or the oldest one has waited `max_latency` seconds, whichever
+    comes first. The file is fsync'ed every `fsync_interval` seconds
+    (0 disables it).
+
+    Segments rotate at local midnight and whenever one grows past
+    `rotate_bytes`. Closed segments are compressed and old ones pruned by a
+    LogCompressor thread, so rotation costs the writer one close/open.
+    """
+    def __init__(self, log_dir="logs", batch_size=20, log_format="csv",
+                 max_latency=1.0, fsync_interval=10.0, queue_size=50000,
+                 rotate_bytes=256 * 1024 * 1024, compression="gzip",
+                 retention_days=30, max_total_bytes=0):
         if not os.path.isabs(log_dir):
             base_dir = os.path.dirname(os.path.abspath(__file__))
             log_dir = os.path.join(base_dir, log_dir)
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {log_format}")
         self.log_dir = log_dir
         self.batch_size = batch_size
-        self.log_buffer = []
-        self.log_file_path = self._init_daily_log()
+        self.log_format = log_format
+        self.max_latency = max_latency
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.extension = "slog" if log_format == "binary" else "csv"
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.log_file_path = None
+        self._segment_end_ns = 0
+        self._segment_bytes = 0
+        self._retired = set()  # segments handed to the compressor, never reopened
+        self._device_slots = {}  # device ID -> slot in the open binary segment
+        self.rotations = 0
+
+        self.compressor = LogCompressor(log_dir, compression=compression,
+                                        retention_days=retention_days, max_total_bytes=max_total_bytes)
+        self.compressor.start()
+        self._compress_leftovers()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+
+        # metrics, written by the writer thread only
+        self.bytes_written = 0
+        self.samples_written = 0
+        self.samples_dropped = 0
+        self.flush_count = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
 
-    def _init_daily_log(self):
+        self._writer = threading.Thread(target=self._run, name="SensorLogWriter", daemon=True)
+        self._writer.start()
+
+    def _compress_leftovers(self):
+        # raw segments from earlier days, e.g. left behind by a crash before rotation
         today = datetime.now().strftime("%Y-%m-%d")
-        os.makedirs(self.log_dir, exist_ok=True)
-        path = os.path.join(self.log_dir, f"log_{today}.csv")
+        for day, _, ext, suffix, path in list_segments(self.log_dir):
+            if day < today and not suffix and ext == self.extension:
+                self._retired.add(path)
+                self.compressor.submit(path)
 
-        if not os.path.exists(path):
-            with open(path, "w", newline="", encoding="utf-8") as f:
-                f.write("timestamp,sensor,field,value\n")
-        return path
+    def log(self, sensor_name, field, value, device="", timestamp_ms=None):
+        self.log_sample(sensor_name, {field: value}, device, timestamp_ms)
 
-    def log(self, sensor_name, field, value):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.log_buffer.append((timestamp, sensor_name, field, value))
+    def log_sample(self, sensor_name, values, device="", timestamp_ms=None):
+        """
+        Log all fields of one sample, e.g. log_sample("Gyroscope", {"X": x, "Y": y, "Z": z}, "board-1").
+        The sample is stamped with timestamp_ms (epoch milliseconds) when given, else with the current time.
+        """
+        if self._closed:
+            return
+        ts = time.time_ns() if timestamp_ms is None else int(timestamp_ms * 1_000_000)
+        try:
+            self._queue.put_nowait((ts, sensor_name, values, device))
+        except queue.Full:
+            self.samples_dropped += 1
 
-        if len(self.log_buffer) >= self.batch_size:
-            self.flush()
+    def flush(self, timeout=5.0):
+        """Block until everything logged so far has been written to the file."""
+        if self._closed or not self._writer.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
 
-    def flush(self):
-        if not self.log_buffer:
+    def close(self, timeout=10.0):
+        """Drain the queue, write the remaining samples and stop the writer thread."""
+        if self._closed:
             return
+        self._closed = True
+        # a writer that died has already closed its file; never block on its full queue
+        if self._writer.is_alive():
+            try:
+                self._queue.put((_STOP, None), timeout=timeout)
+            except queue.Full:
+                print(f"[Log Error] Log writer is not draining, {self._queue.qsize()} queued samples are lost")
+            self._writer.join(timeout)
+        self.compressor.stop(timeout)
+
+    def metrics(self):
+        return {
+            "bytes_written": self.bytes_written,
+            "samples_written": self.samples_written,
+            "samples_dropped": self.samples_dropped,
+            "backlog": self._queue.qsize(),
+            "flushes": self.flush_count,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+            "avg_flush_ms": self._total_flush_ms / self.flush_count if self.flush_count else 0.0,
+            "segment": self.log_file_path,
+            "rotations": self.rotations,
+            "compressed": self.compressor.compressed,
+        }
 
+    # ---- writer thread ----
+
+    def _open_segment(self, timestamp_ns):
+        """Open the segment for the day of `timestamp_ns`, continuing the latest one if it has room."""
+        day, self._segment_end_ns = day_bounds_ns(timestamp_ns)
+        index = 0
+        for seg_day, seg_index, ext, suffix, path in list_segments(self.log_dir):
+            if seg_day != day or ext != self.extension:
+                continue
+            if suffix or path in self._retired or self._size_of(path) >= self.rotate_bytes:
+                index = max(index, seg_index + 1)
+            else:
+                index = max(index, seg_index)
+
+        path = os.path.join(self.log_dir, segment_name(day, index, self.extension))
+        if self.log_format == "binary":
+            # headers are written by sensor_log_format as blocks fill up
+            f = open(path, "ab+")
+        else:
+            f = open(path, "a", newline="", encoding="utf-8")
+            if f.tell() == 0:
+                f.write(sensor_log_format.CSV_HEADER)
+        f.seek(0, os.SEEK_END)
+        self._segment_bytes = f.tell()
+        self._device_slots = {device: slot for slot, device in sensor_log_format.load_devices(path).items()}
+        self.log_file_path = path
+        self.compressor.active_path = path
+        return f
+
+    def _rotate(self, f, timestamp_ns):
+        old_path = self.log_file_path
+        f.close()
+        f = self._open_segment(timestamp_ns)
+        if old_path != self.log_file_path:
+            self.rotations += 1
+            self._retired.add(old_path)
+            self.compressor.submit(old_path)
+        return f
+
+    @staticmethod
+    def _size_of(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _run(self):
+        f = None
+        pending = []
+        oldest = None
+        last_fsync = time.monotonic()
+        try:
+            f = self._open_segment(time.time_ns())
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(0.0, oldest + self.max_latency - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                waiter = None
+                stop = False
+                if item is not None:
+                    if item[0] is _FLUSH:
+                        waiter = item[1]
+                    elif item[0] is _STOP:
+                        stop = True
+                    else:
+                        if not pending:
+                            oldest = time.monotonic()
+                        pending.append(item)
+                        if len(pending) < self.batch_size:
+                            continue
+
+                if pending:
+                    f = self._write_rotating(f, pending)
+                    pending = []
+                if self.fsync_interval and (stop or time.monotonic() - last_fsync >= self.fsync_interval):
+                    os.fsync(f.fileno())
+                    last_fsync = time.monotonic()
+                if waiter is not None:
+                    waiter.set()
+                if stop:
+                    break
+        except Exception as e:
+            print(f"[Log Error] Log writer stopped: {e}")
+        finally:
+            if f is not None:
+                f.close()
+
+    def _write_rotating(self, f, samples):
+        # split the batch at midnight, roll over to a new segment when the size limit is hit
+        start = 0
+        for i, (ts, _, _, _) in enumerate(samples):
+            if ts >= self._segment_end_ns:
+                if i > start:
+                    self._write(f, samples[start:i])
+                f = self._rotate(f, ts)
+                start = i
+        self._write(f, samples[start:])
+        if self._segment_bytes >= self.rotate_bytes:
+            f = self._rotate(f, samples[-1][0])
+        return f
+
+    def _write(self, f, samples):
+        started = time.perf_counter()
         try:
-            with open(self.log_file_path, "a", newline="", encoding="utf-8") as f:
-                for row in self.log_buffer:
-                    f.write(",".join(map(str, row)) + "\n")
-            self.log_buffer.clear()
+            if self.log_format == "binary":
+                slots = self._slots_for(samples)
+                records = [sensor_log_format.pack_record(ts, sensor, values, slots.get(device, 0))
+                           for ts, sensor, values, device in samples]
+                written = sensor_log_format.append_records(f, records)
+            else:
+                lines = []
+                last_second = None
+                stamp = ""
+                for ts, sensor, values, device in samples:
+                    second = ts // 1_000_000_000
+                    if second != last_second:
+                        stamp = datetime.fromtimestamp(second).strftime(sensor_log_format.CSV_TIME_FORMAT)
+                        last_second = second
+                    for field, value in values.items():
+                        lines.append(f"{stamp},{sensor},{field},{value},{device}\n")
+                data = "".join(lines)
+                f.write(data)
+                written = len(data.encode("utf-8"))
+            f.flush()
         except Exception as e:
             print(f"[Log Error] Failed to flush log: {e}")
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.bytes_written += written
+        self._segment_bytes += written
+        self.samples_written += len(samples)
+        self.flush_count += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def _slots_for(self, samples):
+        """Device slots of a binary batch; new devices are added to the sidecar before their records."""
+        slots = self._device_slots
+        added = False
+        for _, _, _, device in samples:
+            if device and device not in slots and len(slots) < sensor_log_format.MAX_DEVICE_SLOT:
+                slots[device] = len(slots) + 1
+                added = True
+        if added:
+            sensor_log_format.save_devices(self.log_file_path, {slot: device for device, slot in slots.items()})
+        return slots
+
@@ -1,6 +1,12 @@
+import time
+
+# taken before the imports below so startup timings include them
+PROCESS_START = time.perf_counter()
+
 import os
 import sys
 import json
+import threading
 
 from dotenv import load_dotenv
 
@@ -9,20 +15,57 @@ from PySide6.QtWidgets import (
     QTabWidget, QSpinBox, QMenuBar, QMenu, QMessageBox, QStatusBar,
     QFileDialog, QSizePolicy, QComboBox
 )
-from PySide6.QtCore import Qt, QTimer, Slot, QUrl
+from PySide6.QtCore import Qt, QTimer, Slot, Signal, QUrl
 from PySide6.QtGui import QAction
-from PySide6.QtMultimedia import QSoundEffect
 from pathlib import Path
 
-from mqtt_client import MQTTClient
+# QtMultimedia is imported on the first sound alert, awscrt when the MQTT thread connects
+from mqtt_client import MQTTClient, LOCAL_TOPIC
 from configManager import ConfigManager
 from logger import SensorLogger
 from sensorTab import SensorTab
+from ingest import IngestQueue, IngestWorker
+from payload_codec import PayloadDecoder
+from render_scheduler import RenderScheduler
+from log_query import LogStore
+from tile_cache import TileCache
+from devices import DeviceManager, FIELD_VARS
+from fleet_overview import FleetOverview
+from ui_state import UiState, device_state, mqtt_state
+from rule_engine import RuleEngine
+from threshold_expr import ThresholdError
+
+ALERT_LINES = 20  # rule triggers listed in one alert box, the rest are counted
 
             
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # status updates arrive from the MQTT threads, deliver them on the GUI thread
+    mqtt_status_changed = Signal(str)
+    device_status_changed = Signal(str)
+    device_presence_changed = Signal(str, bool, int)
+    # history tiles are loaded on a background thread
+    history_tile_loaded = Signal(object)
+
+    def __init__(self, connect_mqtt=True, interactive=True, log_dir="logs", mqtt_transport=None):
+        """
+        connect_mqtt=False leaves the window without a broker connection (replay.py
+        feeds it instead), mqtt_transport picks the MQTTClient transport
+        ("aws", "local" or "inprocess"); interactive=False replaces dialogs with console output
+        so the window can run unattended, e.g. on the offscreen platform.
+        """
         super().__init__()
+        self.interactive = interactive
+        self.mqtt_client = None
+        self.mqtt_transport = mqtt_transport
+        self.mqtt_connected = threading.Event()
+        self._mqtt_lock = threading.Lock()  # orders a late connect against shutdown()
+        self._mqtt_connect_done = False
+        # seconds since process start at which the window became usable, see _mark_startup
+        self.startup_times = {}
+        self.mqtt_status_changed.connect(self.update_mqtt_status)
+        self.device_status_changed.connect(self.update_device_status)
+        self.device_presence_changed.connect(self.update_device_presence)
+        self.devices_online = 0
         
         # setup sampling period
         self.interval_input = QSpinBox()
@@ -48,6 +91,24 @@ class MainWindow(QMainWindow):
 
         self._create_menu()
 
+        # charts redraw once per frame instead of once per sample
+        self.render_scheduler = RenderScheduler(fps=30, parent=self)
+        # labels fed by the data path are refreshed a few times a second, only when they change
+        self.ui = UiState(max_hz=4, parent=self)
+        # pan/zoom history in the charts is served from the logs through a tile cache
+        self.tile_cache = TileCache(LogStore(log_dir=log_dir), on_loaded=self.history_tile_loaded.emit)
+
+        # samples are routed per device; the tabs show whichever device is open
+        self.devices = DeviceManager(topic_filter=LOCAL_TOPIC, parent=self)
+        self.devices.device_added.connect(self._on_device_added)
+        self.devices.device_removed.connect(self._on_device_removed)
+        self.current_device = None
+        # every alert rule, the sensor tab thresholds included, evaluated per device
+        self.rules = RuleEngine(on_trigger=self._on_rule_triggered, on_clear=self._on_rule_cleared)
+        self.rules_config = []
+        self._pending_alerts = []  # triggers of the batch being processed, shown once it is done
+        self._alert_box = None
+
         self.gyro_tab = SensorTab("Gyroscope", ["X Axis", "Y Axis", "Z Axis"], main_window=self)
         self.temp_humid_tab = SensorTab("Temperature & Humidity", ["Temperature (°C)", "Humidity (%)"], main_window=self)
         self.light_tab = SensorTab("Light", ["Light Intensity"], main_window=self)
@@ -56,6 +117,21 @@ class MainWindow(QMainWindow):
         tabs.addTab(self.gyro_tab, "Gyroscope")
         tabs.addTab(self.temp_humid_tab, "Temperature & Humidity")
         tabs.addTab(self.light_tab, "Light")
+
+        # every device at a glance; double-click opens one in the sensor tabs
+        self.fleet = FleetOverview(self.devices)
+        self.fleet.device_activated.connect(self.device_combo_select)
+        self.fleet.device_activated.connect(lambda _: tabs.setCurrentWidget(self.gyro_tab))
+        tabs.addTab(self.fleet, "Fleet")
+
+        device_layout = QHBoxLayout()
+        self.device_combo = QComboBox()
+        self.device_combo.setToolTip("Device shown in the charts; devices appear when they first report")
+        self.device_combo.setMinimumWidth(200)
+        self.device_combo.currentTextChanged.connect(self.open_device)
+        device_layout.addWidget(QLabel("Device:"))
+        device_layout.addWidget(self.device_combo)
+        device_layout.addStretch()
                                 
         # button span（Start / Stop / Interval）
         control_layout = QHBoxLayout()
@@ -108,6 +184,7 @@ class MainWindow(QMainWindow):
         
         # main display layout
         main_layout = QVBoxLayout()
+        main_layout.addLayout(device_layout)
         main_layout.addWidget(tabs)
         main_layout.addLayout(control_layout)        
 
@@ -121,39 +198,99 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.mqtt_status_label = QLabel("MQTT Status: Connecting...")
         self.device_status_label = QLabel("Device Status: Unknown")
+        self.ingest_status_label = QLabel("Queue: 0 | Dropped: 0")
         self.status_bar.addWidget(self.mqtt_status_label)
+        self.status_bar.addPermanentWidget(self.ingest_status_label)
         self.status_bar.addPermanentWidget(self.device_status_label)
+        self._bind_labels()
 
         # refresh status timer
         self.keep_alive_timer = QTimer(self)
         self.keep_alive_timer.timeout.connect(self._refresh_status_bar)
         self.keep_alive_timer.start(3000)  # every 3s
 
-        self.mqtt_status_text = "MQTT Status: Connecting..."
-        self.device_status_text = "Device Status: Unknown"
+        # forget devices that stopped reporting
+        self.device_evict_timer = QTimer(self)
+        self.device_evict_timer.timeout.connect(self._evict_idle_devices)
+        self.device_evict_timer.start(30000)
+
         
         self.drawing_paused = False
         
-        self.config_mgr = ConfigManager(self) # configManager initialization
+        self.config_mgr = ConfigManager(self, quiet=not interactive) # configManager initialization
         config = self.config_mgr.load_config(self.config_mgr.user_config_path)
         if not config:  # no config files
             config = self.config_mgr.load_config(self.config_mgr.default_config_path)
         self.apply_config(config)
         
-        self.logger = SensorLogger(log_dir="logs", batch_size=20)
-                    
-        self._init_mqtt()
+        self.logger = SensorLogger(log_dir=log_dir,
+                                   batch_size=self.logging_config.get("batch_size", 200),
+                                   log_format=self.logging_config.get("format", "csv"),
+                                   max_latency=self.logging_config.get("max_latency", 1.0),
+                                   fsync_interval=self.logging_config.get("fsync_interval", 10.0),
+                                   rotate_bytes=int(self.logging_config.get("rotate_mb", 256) * 1024 * 1024),
+                                   compression=self.logging_config.get("compression", "gzip"),
+                                   retention_days=self.logging_config.get("retention_days", 30))
+
+        self._init_ingest()
+        if connect_mqtt:
+            self._init_mqtt()
+        self._mark_startup("window_built")
     
     def apply_config(self,config):
         tabs_config = config.get("tabs", {})
+        self.ingest_config = config.get("ingest", {})
+        self.render_config = config.get("render", {})
+        self.logging_config = config.get("logging", {})
+        self.history_config = config.get("history", {})
+        self.devices_config = config.get("devices", {})
+        self.mqtt_config = config.get("mqtt", {})
+        self.devices.buffer_points = self.devices_config.get("buffer_points", 36000)
+        self.devices.idle_timeout = self.devices_config.get("idle_timeout", 600)
+        self.devices.stall_secs = self.devices_config.get("stall_secs", 2.0)
+        self.stats_config = config.get("stats", {})
+        self.devices.stats_options = {"relative_accuracy": self.stats_config.get("relative_accuracy", 0.01),
+                                      "max_samples": self.stats_config.get("max_window_samples", 100000)}
+        # statistics shown under the value labels, for every field
+        window = float(self.stats_config.get("window", 10))
+        ewma = float(self.stats_config.get("ewma", 5))
+        self.stats_window = window
+        self.stats_ewma = ewma
+        self.display_refs = frozenset(
+            [(func, key, window) for func in ("mean", "stddev", "min", "max", "p50", "p95", "p99", "sps")
+             for key in FIELD_VARS.values()] + [("ewma", key, ewma) for key in FIELD_VARS.values()])
+        self.render_scheduler.set_fps(self.render_config.get("fps", 30))
+        self.ui.set_rate(self.render_config.get("label_hz", 4))
+        self.tile_cache.max_bytes = int(self.history_config.get("cache_mb", 64) * 1024 * 1024)
         self.interval_input.setValue(config.get("sampling_interval", 1))
         self.alert_method_combo.setCurrentText(config.get("alert_method", "Sound"))
 
+        self._apply_rules_config(config.get("rules", []))
+
         self.gyro_tab.apply_tab_config(tabs_config.get("Gyroscope", {}))
         self.temp_humid_tab.apply_tab_config(tabs_config.get("Temperature & Humidity", {}))
         self.light_tab.apply_tab_config(tabs_config.get("Light", {}))
         
 
+    def _apply_rules_config(self, rules_config):
+        """
+        Load the rules of the "rules" config list, replacing those loaded before:
+        {"name": ..., "expr": "Z > 2 and T > 40", "devices": ["board-*"], "enabled": true,
+        "breach_required": 3, "recovery_required": 3}. The expression may use every
+        field (X, Y, Z, T, H, L); devices defaults to all of them.
+        """
+        for rule in self.rules_config:
+            self.rules.remove_rule(rule.get("name"))
+        self.rules_config = rules_config
+        for rule in rules_config:
+            try:
+                self.rules.set_rule(rule["name"], rule["expr"], devices=rule.get("devices", ()),
+                                    enabled=rule.get("enabled", True),
+                                    breach_required=rule.get("breach_required", 3),
+                                    recovery_required=rule.get("recovery_required", 3))
+            except (KeyError, ThresholdError) as e:
+                print(f"[Config] Skipping rule {rule.get('name', '?')}: {e}")
+
     def load_default_config(self):
         self.config_mgr.load_config(self.config_mgr.default_config_path)        
     
@@ -250,85 +387,230 @@ class MainWindow(QMainWindow):
         self.apply_config(config)
         QMessageBox.information(self, "Reset Complete", "Reset to factory defaults completed.")
     
+    def _bind_labels(self):
+        ui = self.ui
+        ui.bind_status("mqtt_status", self.mqtt_status_label, mqtt_state)
+        ui.bind_status("device_status", self.device_status_label, device_state)
+        ui.bind("ingest", self.ingest_status_label, lambda s: f"Queue: {s['depth']} | Dropped: {s['dropped']}")
+        ui.set("mqtt_status", "MQTT Status: Connecting...")
+        ui.set("device_status", "Device Status: Unknown")
+
+        # value labels show the newest sample of the open device, None until it has one
+        def fmt(name, key, spec, unit=""):
+            def text(sample):
+                value = None if sample is None else sample[key]
+                return f"{name}: --" if value is None else f"{name}: {value:{spec}}{unit}"
+            return text
+
+        labels = self.gyro_tab.labels
+        ui.bind("sample", labels["X Axis"], fmt("X Axis", "gyro_x", ".3f"))
+        ui.bind("sample", labels["Y Axis"], fmt("Y Axis", "gyro_y", ".3f"))
+        ui.bind("sample", labels["Z Axis"], fmt("Z Axis", "gyro_z", ".3f"))
+        labels = self.temp_humid_tab.labels
+        ui.bind("sample", labels["Temperature (°C)"], fmt("Temperature (°C)", "temperature", ".2f"))
+        ui.bind("sample", labels["Humidity (%)"], fmt("Humidity (%)", "humidity", ".2f"))
+        ui.bind("sample", self.light_tab.labels["Light Intensity"], fmt("Light Intensity", "light", ".0f", " lux"))
+
+        # streaming statistics of the open device, see stream_stats
+        def num(value, spec=".3g"):
+            return "--" if value != value else f"{value:{spec}}"
+
+        def stats_text(key):
+            def text(device):
+                if device is None:
+                    return ""
+                value = device.stats.value
+                window = self.stats_window
+                return (f"{window:g} s: mean {num(value('mean', key, window))} "
+                        f"± {num(value('stddev', key, window), '.2g')}, "
+                        f"min {num(value('min', key, window))} / max {num(value('max', key, window))}\n"
+                        f"p50 {num(value('p50', key, window))}  p95 {num(value('p95', key, window))}  "
+                        f"p99 {num(value('p99', key, window))}  "
+                        f"EWMA {num(value('ewma', key, self.stats_ewma))}  "
+                        f"{num(value('sps', key, window), '.1f')}/s")
+            return text
+
+        for tab in (self.gyro_tab, self.temp_humid_tab, self.light_tab):
+            for key, label in tab.stats_labels.items():
+                ui.bind("stats", label, stats_text(key))
+
     def update_mqtt_status(self, status_text):
-        self.mqtt_status_text = status_text
         if "Connected" in status_text:
-            self.mqtt_status_label.setStyleSheet("color: white; background-color: #32CD32; padding: 3px;")
-            self.mqtt_status_label.setText("✅ " + status_text)
-        elif "Connecting" in status_text:
-            self.mqtt_status_label.setStyleSheet("color: black; background-color: #FFD700; padding: 3px;")
-            self.mqtt_status_label.setText("⏳ " + status_text)
-        else:
-            self.mqtt_status_label.setStyleSheet("color: white; background-color: #FF6347; padding: 3px;")
-            self.mqtt_status_label.setText("❌ " + status_text)
-            
+            self._mark_startup("mqtt_connected")
+        self.ui.set("mqtt_status", status_text)
+
     def update_device_status(self, status_text):
-        self.device_status_text = status_text
-        if "Online" in status_text:
-            self.device_status_label.setStyleSheet("color: white; background-color: #32CD32; padding: 3px;")
-            self.device_status_label.setText("✅ " + status_text)
-        elif "Offline" in status_text:
-            self.device_status_label.setStyleSheet("color: white; background-color: #FF6347; padding: 3px;")
-            self.device_status_label.setText("❌ " + status_text)            
-        else:
-            self.device_status_label.setStyleSheet("color: black; background-color: #FFD700; padding: 3px;")
-            self.device_status_label.setText("⏳ " + status_text)
+        self.ui.set("device_status", status_text)
+
+    def update_device_presence(self, device_id, online, online_count):
+        self.devices_online = online_count
+        self.device_status_label.setToolTip(
+            f"{online_count} device(s) online, {device_id} {'came online' if online else 'went quiet'} last")
 
     def _refresh_status_bar(self):
-        self.mqtt_status_label.setText(self.mqtt_status_text)
-        self.device_status_label.setText(self.device_status_text)                        
+        if self.mqtt_client is not None:
+            rc = self.mqtt_client.reconnector.stats()
+            last = "-" if rc["last_recovery"] is None else f"{rc['last_recovery']:.1f} s"
+            self.mqtt_status_label.setToolTip(
+                f"Connection: {rc['state']}, outages: {rc['outages']}, reconnects: {rc['reconnects']}, "
+                f"failed attempts: {rc['failures']}, breaker trips: {rc['breaker_trips']}\n"
+                f"Downtime: {rc['downtime']:.1f} s, time to recover: last {last}, worst {rc['max_recovery']:.1f} s\n"
+                f"Held during reconnect: {rc['buffered']}, waiting: {rc['buffer_depth']}, "
+                f"dropped: {rc['buffer_dropped']}")
+        stats = self.ingest_queue.stats()
+        log_stats = self.logger.metrics()
+        frames = self.devices.frame_totals()
+        self.ui.set("ingest", stats)
+        self.ingest_status_label.setToolTip(
+            f"Policy: {stats['policy']}, capacity: {stats['max_size']}, "
+            f"peak depth: {stats['high_watermark']}, received: {stats['received']}, "
+            f"messages: {self.ingest_worker.messages}, samples: {self.ingest_worker.decoded}, "
+            f"decode errors: {self.ingest_worker.decode_errors}\n"
+            f"Log backlog: {log_stats['backlog']}, written: {log_stats['bytes_written']} bytes, "
+            f"last flush: {log_stats['last_flush_ms']:.1f} ms, dropped: {log_stats['samples_dropped']}\n"
+            f"History cache: {self.tile_cache.memory_used() / 1024:.0f} KiB, "
+            f"hits: {self.tile_cache.hits}, misses: {self.tile_cache.misses}\n"
+            f"Devices: {len(self.devices.devices)} active, {self.devices.evicted} evicted, "
+            f"buffers: {self.devices.memory_used() / (1024 * 1024):.1f} MiB\n"
+            f"Frames lost in transit: {frames['lost']}, out of order: {frames['out_of_order']}, "
+            f"duplicates: {frames['duplicates']}, device stalls: {frames['stalls']}, resets: {frames['resets']}\n"
+            f"Startup: {self._startup_summary()}")
+
+    def _mark_startup(self, name):
+        """Record the first time `name` happened; print the summary once the first sample is in."""
+        if name in self.startup_times:
+            return
+        self.startup_times[name] = time.perf_counter() - PROCESS_START
+        if name == "first_sample":
+            print(f"[Startup] {self._startup_summary()}")
+
+    def _startup_summary(self):
+        return ", ".join(f"{name} {secs * 1000:.0f} ms" for name, secs in self.startup_times.items()) or "-"
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        self._mark_startup("first_paint")
+
+    def _init_ingest(self):
+        cfg = self.ingest_config
+        self.ingest_queue = IngestQueue(
+            max_size=cfg.get("max_queue", 2000),
+            overflow_policy=cfg.get("overflow_policy", "drop_oldest"),
+            block_timeout=cfg.get("block_timeout", 1.0))
+        decoder = PayloadDecoder(payload_format=cfg.get("payload_format", "auto"), backend=cfg.get("json_backend"))
+        print(f"[Ingest] Decoding {decoder.payload_format} payloads, JSON via {decoder.backend}")
+        self.ingest_worker = IngestWorker(self.ingest_queue, max_batch=cfg.get("max_batch", 200), decoder=decoder)
+        self.ingest_worker.batch_ready.connect(self._on_sample_batch)
+        self.ingest_worker.start()
 
     def _init_mqtt(self):
+        # the TLS handshake and subscribe take seconds, keep them off the GUI thread
+        self.update_mqtt_status("MQTT Status: Connecting...")
+        threading.Thread(target=self._connect_mqtt, name="MQTTConnect", daemon=True).start()
+
+    def _connect_mqtt(self):
+        """Runs on the MQTTConnect thread; only signals may reach the widgets from here."""
         try:
-            self.mqtt_client = MQTTClient(
-                on_message_callback = self._on_mqtt_message,                                          
-                status_callback=self.update_mqtt_status,
-                device_status_callback=self.update_device_status)
-            
-            self.mqtt_client.connect_and_subscribe()
-            self.update_mqtt_status("MQTT Status: Connected")
+            client = MQTTClient(
+                on_message_callback=self._on_mqtt_message,
+                status_callback=self.mqtt_status_changed.emit,
+                device_status_callback=self.device_status_changed.emit,
+                device_presence_callback=self.device_presence_changed.emit,
+                device_timeout=self.devices_config.get("offline_secs", 5.0),
+                transport=self.mqtt_transport,
+                reconnect=self.mqtt_config.get("reconnect"))
+            if client.topic:
+                self.devices.topic_filter = client.topic
+            self.mqtt_client = client
+
+            client.connect_and_subscribe()
+            with self._mqtt_lock:
+                self._mqtt_connect_done = True
+                if getattr(self, "_shut_down", False):
+                    # the window was closed while connecting
+                    client.disconnect()
+                    return
+                self.mqtt_connected.set()
+            self.mqtt_status_changed.emit("MQTT Status: Connected")
         except Exception as e:
             print(f"[❌] MQTT Init Error: {e}")
-            self.update_mqtt_status("MQTT Status: Failed")
+            self.mqtt_status_changed.emit("MQTT Status: Failed")
+            with self._mqtt_lock:
+                self._mqtt_connect_done = True
+                if self.mqtt_client is not None and not getattr(self, "_shut_down", False):
+                    # the broker may just not be reachable yet, keep trying with backoff
+                    self.mqtt_client.connection_failed(e)
 
     # def _on_mqtt_message(self, topic, payload, **kwargs):
     #     print(f"[MQTT] Message Received on {topic}: {payload}")
     #     # TODO: Parse and update the corresponding tab UI
     
     def _on_mqtt_message(self, topic, payload, **kwargs):
-        try:
-            data = json.loads(payload.decode())
-
-            # update Gyroscope
-            gx = float(data.get("gyro_x", 0))
-            gy = float(data.get("gyro_y", 0))
-            gz = float(data.get("gyro_z", 0))
-            self.gyro_tab.labels["X Axis"].setText(f"X Axis: {gx:.3f}")
-            self.gyro_tab.labels["Y Axis"].setText(f"Y Axis: {gy:.3f}")
-            self.gyro_tab.labels["Z Axis"].setText(f"Z Axis: {gz:.3f}")
-            self.gyro_tab.update_gyro_chart(gx, gy, gz)
-
-            # update temp and humid
-            temp = data.get("temperature")
-            temp -= 10;
-            humid = data.get("humidity")
-            humid = humid * 100.0;
+        # runs on the CRT event loop thread: only enqueue, never parse or touch widgets here
+        self.ingest_queue.put(topic, payload)
+
+    @Slot(list)
+    def _on_sample_batch(self, samples):
+        self._mark_startup("first_sample")
+        for device, device_samples in self.devices.dispatch(samples):
+            self._process_device_samples(device, device_samples)
+            self.fleet.model.record(device, device_samples)
+            if device is self.current_device:
+                # labels only show the latest value, set them once per batch
+                self._update_value_labels(device_samples[-1])
+                self.ui.set("stats", device)
+
+    def _process_device_samples(self, device, samples):
+        refs = self.rules.window_refs()
+        device.stats.configure(self.display_refs.union(refs) if refs else self.display_refs)
+        # statistics and alert rules for the whole block, before the charts and log
+        self.rules.process(device, samples)
+        for sample in samples:
+            t_ms = sample["time_ms"]
+            self.gyro_tab.update_gyro_chart(sample["gyro_x"], sample["gyro_y"], sample["gyro_z"],
+                                            device=device, timestamp_ms=t_ms)
+
+            temp = sample["temperature"]
+            humid = sample["humidity"]
             if temp is not None and humid is not None:
-                self.temp_humid_tab.labels["Temperature (°C)"].setText(f"Temperature (°C): {temp:.2f}")
-                self.temp_humid_tab.labels["Humidity (%)"].setText(f"Humidity (%): {humid:.2f}")
-                self.temp_humid_tab.update_temp_humid_chart(float(temp), float(humid))
-                
-                # if temp > self.temp_threshold:
-                #     self.trigger_alert(f"Temperature too high: {temp:.2f}°C")
-                        
-            light = data.get("light")
+                self.temp_humid_tab.update_temp_humid_chart(temp, humid, device=device, timestamp_ms=t_ms)
+
+            light = sample["light"]
             if light is not None:
-                self.light_tab.labels["Light Intensity"].setText(f"Light Intensity: {int(light)} lux")
-                self.light_tab.update_light_chart(float(light))
+                self.light_tab.update_light_chart(light, device=device, timestamp_ms=t_ms)
+
+    def _on_device_added(self, device_id):
+        # the first device to report is opened automatically
+        self.device_combo.addItem(device_id)
+
+    def _on_device_removed(self, device_id):
+        self.rules.forget_device(device_id)
+        index = self.device_combo.findText(device_id)
+        if index >= 0:
+            self.device_combo.removeItem(index)
+
+    def device_combo_select(self, device_id):
+        self.device_combo.setCurrentText(device_id)
+
+    def _evict_idle_devices(self):
+        keep = {self.current_device.device_id} if self.current_device is not None else set()
+        self.devices.evict_idle(keep=keep)
+
+    def open_device(self, device_id):
+        device = self.devices.get(device_id)
+        if device is None or device is self.current_device:
+            return
+        self.current_device = device
+        for tab in (self.gyro_tab, self.temp_humid_tab, self.light_tab):
+            tab.open_device(device)
+        # also replaces a value of the previous device that was not shown yet
+        self._update_value_labels(device.last_sample)
+        self.ui.set("stats", device)
+
+    def _update_value_labels(self, sample):
+        # only recorded here, UiState formats and applies it on its next refresh
+        self.ui.set("sample", sample)
 
-        except Exception as e:
-            print(f"[❌] MQTT parse error: {e}")
-            
     def start_data_collection(self):
         # send MQTT control message
         self.publish_control_command("START")
@@ -345,9 +627,18 @@ class MainWindow(QMainWindow):
     def publish_control_command(self, action):
         payload = json.dumps({"action": action})
         mqtt_topic = "device/control"
-        self.mqtt_connection.publish(topic=mqtt_topic, payload=payload, qos=1)
+        if self.mqtt_client is None:
+            print(f"[MQTT] Not connected, {action} not sent")
+            return
+        try:
+            self.mqtt_client.publish(mqtt_topic, payload)
+        except Exception as e:
+            print(f"[❌] MQTT Publish Error: {e}")
         
     def trigger_alert(self, message):
+        if not self.interactive:
+            print(f"[ALERT] {message}")
+            return
         method = self.alert_method_combo.currentText()
 
         if "Sound" in method:
@@ -356,13 +647,47 @@ class MainWindow(QMainWindow):
         if "Email" in method:
             self.trigger_email_alert(message)
 
-        QMessageBox.warning(self, "Alert", message)  # Always display alert box
-    
+        # Always display alert box; one non-modal box is reused, so alerts never stack up or
+        # run a nested event loop that would feed more samples in while a batch is processed
+        box = self._alert_box
+        if box is None:
+            box = self._alert_box = QMessageBox(QMessageBox.Icon.Warning, "Alert", "",
+                                                QMessageBox.StandardButton.Ok, self)
+            box.setWindowModality(Qt.WindowModality.NonModal)
+        box.setText(message)
+        box.show()
+        box.raise_()
+
+    def _on_rule_triggered(self, rule, device_id):
+        # runs inside RuleEngine.process; a fleet-wide rule can trigger on hundreds of devices in
+        # one batch, so the triggers are collected and reported in one alert after it
+        if not self._pending_alerts:
+            QTimer.singleShot(0, self._show_pending_alerts)
+        self._pending_alerts.append(f"{device_id} {rule.name} exceeds threshold!")
+
+    def _show_pending_alerts(self):
+        messages, self._pending_alerts = self._pending_alerts, []
+        if not messages:
+            return
+        text = "\n".join(messages[:ALERT_LINES])
+        if len(messages) > ALERT_LINES:
+            text += f"\n... and {len(messages) - ALERT_LINES} more"
+        self.trigger_alert(text)
+
+    def _on_rule_cleared(self, rule, device_id):
+        self.clear_alert()
+        print(f"{device_id} {rule.name} recovered. Alert cleared.")
+
     def clear_alert(self):
-        if self.alert_sound.isPlaying():
-            self.alert_sound.stop()
+        # another board or rule may still be in alert
+        if self.rules.active:
+            return
+        alert_sound = getattr(self, "alert_sound", None)
+        if alert_sound is not None and alert_sound.isPlaying():
+            alert_sound.stop()
     
     def trigger_sound_alert(self):
+        from PySide6.QtMultimedia import QSoundEffect
         self.alert_sound = QSoundEffect()
         sound_path = Path(__file__).parent / "alert.wav"
         self.alert_sound.setSource(QUrl.fromLocalFile(str(sound_path.resolve())))
@@ -386,6 +711,11 @@ class MainWindow(QMainWindow):
         return
                 
     def closeEvent(self, event):
+        if not self.interactive:
+            # unattended runs end through app.quit(), nobody is there to answer
+            self.shutdown()
+            event.accept()
+            return
         reply = QMessageBox.question(
             self,
             "Exit",
@@ -395,11 +725,30 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             # save current config to file
             self.config_mgr.save_config(self.config_mgr.user_config_path)
-            self.logger.flush()
+            self.shutdown()
             event.accept()
         else:
             event.ignore()
         
+    def shutdown(self):
+        """Stop the worker threads and flush the log; the window is unusable afterwards."""
+        with self._mqtt_lock:
+            if getattr(self, "_shut_down", False):
+                return
+            self._shut_down = True
+            # a connect still in progress is closed by _connect_mqtt itself
+            disconnect = self.mqtt_client is not None and self._mqtt_connect_done
+        if disconnect:
+            try:
+                self.mqtt_client.disconnect()
+            except Exception as e:
+                print(f"[❌] MQTT Disconnect Error: {e}")
+        self.ingest_worker.stop()
+        self.render_scheduler.stop()
+        self.ui.stop()
+        self.tile_cache.stop()
+        self.logger.close()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
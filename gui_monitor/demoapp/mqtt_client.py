@@ -1,28 +1,64 @@
 import os
 import json
-import time
 
-from threading import Timer
 from dotenv import load_dotenv
-from awscrt import mqtt
-from awsiot import mqtt_connection_builder
+
+# awscrt/awsiot are only imported for the "aws" transport, they take a while to load
+from mqtt_transport import TRANSPORTS, InProcessBroker, InProcessConnection, local_connection, topic_device_id
+from device_presence import PresenceMonitor
+from reconnect import CONNECTED, ReconnectManager
 
 load_dotenv()
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# topic the simulated devices (loadgen.py) publish on when not talking to AWS
+LOCAL_TOPIC = "sensors/+/data"
+
+CONNECT_TIMEOUT = 30  # seconds
+
 class MQTTClient:
-    def __init__(self, on_message_callback, status_callback=None, device_status_callback=None):
+    def __init__(self, on_message_callback, status_callback=None, device_status_callback=None, transport=None,
+                 reconnect=None, device_presence_callback=None, device_timeout=5.0):
+        """
+        transport: "aws" (default), "local" or "inprocess", see mqtt_transport.
+        Falls back to the MQTT_TRANSPORT environment variable.
+        reconnect: ReconnectManager settings (base_delay, max_delay, failure_threshold,
+        cooldown, buffer_size).
+        device_presence_callback(device_id, online, online_count) is called when a device
+        starts or stops reporting for device_timeout seconds; device_status_callback only
+        hears when the first device comes online and when the last one goes quiet.
+        """
         self.on_message_callback = self._wrap_callback(on_message_callback)
         self.status_callback = status_callback
         self.device_status_callback = device_status_callback
-        self.client_id = os.getenv("CLIENT_ID")
-        self.topic = os.getenv("TOPIC")
-        self.last_message_time = time.time()
-        self.timeout_seconds = 5
-        self.device_status_timer = None
-
-        self.mqtt_connection = mqtt_connection_builder.mtls_from_path(
+        self.transport = transport or os.getenv("MQTT_TRANSPORT", "aws")
+        if self.transport not in TRANSPORTS:
+            raise ValueError(f"Unknown MQTT transport: {self.transport}")
+        self.client_id = os.getenv("CLIENT_ID", "gui-monitor")
+        self.topic = os.getenv("TOPIC") if self.transport == "aws" else os.getenv("TOPIC", LOCAL_TOPIC)
+        self.device_presence_callback = device_presence_callback
+        self.presence = PresenceMonitor(device_timeout, self._on_presence_change)
+        self._topic_devices = {}  # topic -> device id, topics repeat for every message
+        self.reconnector = ReconnectManager(
+            self._reconnect, on_message_callback, on_status=status_callback,
+            on_offline=self._report_offline, **(reconnect or {}))
+        self.mqtt_connection = self._build_connection()
+
+    def _build_connection(self):
+        if self.transport == "inprocess":
+            return InProcessConnection(
+                InProcessBroker.default(), self.client_id,
+                on_connection_interrupted=self._on_connection_interrupted,
+                on_connection_resumed=self._on_connection_resumed)
+        if self.transport == "local":
+            return local_connection(
+                os.getenv("MQTT_HOST", "localhost"), int(os.getenv("MQTT_PORT", "1883")), self.client_id,
+                on_connection_interrupted=self._on_connection_interrupted,
+                on_connection_resumed=self._on_connection_resumed)
+
+        from awsiot import mqtt_connection_builder
+        return mqtt_connection_builder.mtls_from_path(
             endpoint=os.getenv("AWS_ENDPOINT"),
             cert_filepath=self.get_env_path("CERT_PATH"),
             pri_key_filepath=self.get_env_path("KEY_PATH"),
@@ -35,32 +71,60 @@ class MQTTClient:
         )
 
     def connect_and_subscribe(self):
-        print("Connecting to AWS IoT...")
+        print("Connecting to AWS IoT..." if self.transport == "aws" else f"Connecting ({self.transport} broker)...")
         connect_future = self.mqtt_connection.connect()
-        connect_future.result()
+        connect_future.result(timeout=CONNECT_TIMEOUT)
         print("✅ Connected!")
         if self.status_callback:
             self.status_callback("MQTT Status: Connected")
 
+        try:
+            self._subscribe()
+        except Exception as e:
+            print(f"❌ Subscribe Failed: {e}")
+
+        self._start_device_monitor()
+
+    def _subscribe(self):
+        if self.transport == "inprocess":
+            qos = 1  # AT_LEAST_ONCE
+        else:
+            from awscrt import mqtt
+            qos = mqtt.QoS.AT_LEAST_ONCE
         print(f"Subscribing to topic: {self.topic}")
         subscribe_future, _ = self.mqtt_connection.subscribe(
             topic=self.topic,
-            qos=mqtt.QoS.AT_LEAST_ONCE,
+            qos=qos,
             callback=self.on_message_callback,
         )
+        subscribe_future.result(timeout=15)
+        print("✅ Subscribed!")
 
+    def _reconnect(self):
+        """One reconnect attempt, on the ReconnectManager thread."""
         try:
-            subscribe_future.result(timeout=15)
-            print("✅ Subscribed!")
-        except Exception as e:
-            print(f"❌ Subscribe Failed: {e}")
-
-        self._start_device_monitor()
+            # also stops the SDK's own reconnect loop, the manager is in charge now
+            self.mqtt_connection.disconnect().result(timeout=5)
+        except Exception:
+            pass  # already down
+        self.mqtt_connection.connect().result(timeout=CONNECT_TIMEOUT)
+        self._subscribe()
+
+    def connection_failed(self, error):
+        """The first connect failed: keep retrying in the background like after an outage."""
+        self.reconnector.connection_lost(error)
+
+    def publish(self, topic, payload, qos=1):
+        if self.reconnector.state != CONNECTED:
+            raise ConnectionError(f"not connected ({self.reconnector.state})")
+        future, _ = self.mqtt_connection.publish(topic=topic, payload=payload, qos=qos)
+        return future
 
     def disconnect(self):
         print("Disconnecting...")
-        self.mqtt_connection.disconnect().result()
+        self.reconnector.stop()
         self._cancel_device_monitor()
+        self.mqtt_connection.disconnect().result(timeout=5)
 
     def get_env_path(self, var_name):
         val = os.getenv(var_name)
@@ -70,51 +134,41 @@ class MQTTClient:
         return abs_path
 
     def _on_connection_interrupted(self, connection, error, **kwargs):
+        # CRT event loop thread: hand the outage over and return at once
         print(f"[⚠️] Connection interrupted: {error}")
         if self.status_callback:
             self.status_callback("MQTT Status: Disconnected")
         if self.device_status_callback:
             self.device_status_callback("Device Status: Unknown")
-
-        print("[🔄] Attempting to reconnect...")
-        try:
-            reconnect_future = self.mqtt_connection.reconnect()
-            reconnect_future.result(timeout=10)
-            print("✅ Reconnected successfully")
-            if self.status_callback:
-                self.status_callback("MQTT Status: Reconnected")
-        except Exception as e:
-            print(f"[❌] Reconnection failed: {e}")
-            if self.status_callback:
-                self.status_callback("MQTT Status: Reconnect Failed")
-            if self.device_status_callback:
-                self.device_status_callback("Device Status: Offline")
+        self.reconnector.connection_lost(error)
 
     def _on_connection_resumed(self, connection, return_code, session_present, **kwargs):
         print("[🔁] Connection resumed")
-        if self.status_callback:
-            self.status_callback("MQTT Status: Reconnected")
+        self.reconnector.connection_resumed()
+
+    def _report_offline(self):
+        if self.device_status_callback:
+            self.device_status_callback("Device Status: Offline")
+
+    def _on_presence_change(self, device_id, online, online_count):
+        if self.device_presence_callback:
+            self.device_presence_callback(device_id, online, online_count)
+        if self.device_status_callback and online_count == (1 if online else 0):
+            self.device_status_callback("Device Status: Online" if online else "Device Status: Offline")
 
     def _wrap_callback(self, original_callback):
         def wrapper(topic, payload, **kwargs):
-            self.last_message_time = time.time()
-            if self.device_status_callback:
-                self.device_status_callback("Device Status: Online")
+            device_id = self._topic_devices.get(topic)
+            if device_id is None:
+                device_id = self._topic_devices[topic] = topic_device_id(self.topic, topic)
+            self.presence.seen(device_id)
+            if self.reconnector.offer(topic, payload, kwargs):
+                return None  # delivered once the connection is restored
             return original_callback(topic, payload, **kwargs)
         return wrapper
 
     def _start_device_monitor(self):
-        def monitor():
-            time_since_last = time.time() - self.last_message_time
-            if time_since_last > self.timeout_seconds:
-                if self.device_status_callback:
-                    self.device_status_callback("Device Status: Offline")
-            self.device_status_timer = Timer(1.0, monitor)
-            self.device_status_timer.start()
-
-        monitor()
+        self.presence.start()
 
     def _cancel_device_monitor(self):
-        if self.device_status_timer:
-            self.device_status_timer.cancel()
-            self.device_status_timer = None
+        self.presence.stop()
@@ -0,0 +1,153 @@
+"""
+Transports MQTTClient can run on besides AWS IoT:
+
+    aws        AWS IoT Core over mTLS, configured from .env (default)
+    local      plain MQTT to a broker such as mosquitto on MQTT_HOST:MQTT_PORT
+    inprocess  InProcessBroker, a broker stand-in living in this process
+
+All of them hand out objects with the awscrt mqtt.Connection interface
+(connect/subscribe/publish/disconnect/reconnect returning futures), so the
+rest of the client does not care which one is in use.
+"""
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+TRANSPORTS = ("aws", "local", "inprocess")
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter matching with the + and # wildcards."""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[i]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def topic_device_id(topic_filter, topic):
+    """
+    Device ID of a message: the topic levels matched by + in the filter
+    (sensors/+/data -> "board-1" for sensors/board-1/data), or the first
+    topic level when the filter has no single-level wildcard or does not
+    match the topic.
+    """
+    topic_parts = topic.split("/")
+    if topic_filter and "+" in topic_filter and topic_matches(topic_filter, topic):
+        filter_parts = topic_filter.split("/")
+        return "/".join(topic_parts[i] for i, part in enumerate(filter_parts) if part == "+")
+    return topic_parts[0]
+
+
+def _done(result=None):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class InProcessBroker:
+    """
+    Just enough of an MQTT broker for tests and load generation without a
+    network: messages are queued and delivered to matching subscribers on the
+    broker's own thread, the way the CRT event loop delivers real messages.
+    """
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def __init__(self, max_pending=100000):
+        self._subscriptions = []  # (topic_filter, qos, callback, connection)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(maxsize=max_pending)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="InProcessBroker", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, connection, topic_filter, qos, callback):
+        with self._lock:
+            self._subscriptions.append((topic_filter, qos, callback, connection))
+
+    def unsubscribe_all(self, connection):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s[3] is not connection]
+
+    def publish(self, topic, payload, qos=0):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        try:
+            self._pending.put_nowait((topic, bytes(payload), qos))
+            self.published += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            topic, payload, qos = self._pending.get()
+            with self._lock:
+                targets = [s for s in self._subscriptions if topic_matches(s[0], topic)]
+            for _, sub_qos, callback, _ in targets:
+                try:
+                    callback(topic=topic, payload=payload, dup=False, qos=min(qos, sub_qos), retain=False)
+                    self.delivered += 1
+                except Exception as e:
+                    print(f"[Broker] Subscriber callback failed on {topic}: {e}")
+
+
+class InProcessConnection:
+    """awscrt mqtt.Connection look-alike bound to an InProcessBroker."""
+    def __init__(self, broker, client_id, on_connection_interrupted=None, on_connection_resumed=None):
+        self.broker = broker
+        self.client_id = client_id
+        self.on_connection_interrupted = on_connection_interrupted
+        self.on_connection_resumed = on_connection_resumed
+        self._packet_ids = itertools.count(1)
+
+    def connect(self):
+        return _done({"session_present": False})
+
+    def reconnect(self):
+        return _done({"session_present": False})
+
+    def disconnect(self):
+        self.broker.unsubscribe_all(self)
+        return _done({})
+
+    def subscribe(self, topic, qos, callback=None):
+        packet_id = next(self._packet_ids)
+        if callback is not None:
+            self.broker.subscribe(self, topic, int(qos), callback)
+        return _done({"packet_id": packet_id, "topic": topic, "qos": qos}), packet_id
+
+    def publish(self, topic, payload, qos, retain=False):
+        packet_id = next(self._packet_ids)
+        self.broker.publish(topic, payload, int(qos))
+        return _done({"packet_id": packet_id}), packet_id
+
+
+def local_connection(host, port, client_id, on_connection_interrupted=None, on_connection_resumed=None):
+    """Plain TCP connection (no TLS) to a broker such as mosquitto."""
+    from awscrt import mqtt
+    return mqtt.Connection(
+        client=mqtt.Client(bootstrap=None, tls_ctx=None),
+        host_name=host,
+        port=port,
+        client_id=client_id,
+        clean_session=True,
+        keep_alive_secs=30,
+        on_connection_interrupted=on_connection_interrupted,
+        on_connection_resumed=on_connection_resumed,
+    )
@@ -0,0 +1,178 @@
+"""
+Sensor payload decoding.
+
+The board publishes one JSON object per frame:
+
+    {"frmNo": 12, "ts": 1751328000, "gyro_x": 0.12, "gyro_y": -0.03, "gyro_z": 0.98,
+     "temperature": 35.2, "humidity": 0.48, "light": 250.0}
+
+or a JSON array of such objects to batch several frames into one message.
+In binary mode it sends the raw SensorData_t struct from sensorDataRing.h
+(little-endian, 32 bytes), or several of them back to back. Everything is
+checked against SCHEMA and turned into the same sample dicts, carrying the
+frame number and device timestamp along. JSON goes through msgspec when it
+is installed, else orjson, else the standard library.
+"""
+import json
+import struct
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATS = ("auto", "json", "binary")
+BACKENDS = ("msgspec", "orjson", "json")
+
+# payload key, type, default when missing
+SCHEMA = (
+    ("frmNo", int, None),
+    ("ts", float, None),  # epoch seconds on the device
+    ("gyro_x", float, 0.0),
+    ("gyro_y", float, 0.0),
+    ("gyro_z", float, 0.0),
+    ("temperature", float, None),
+    ("humidity", float, None),
+    ("light", float, None),
+)
+
+# typedef struct { uint32_t frameNo; uint32_t timestamp; float temperature;
+#                  float gyro_x_vel, gyro_y_vel, gyro_z_vel; float lum_value; float humidity; } SensorData_t;
+SENSOR_DATA = struct.Struct("<IIffffff")
+
+_JSON_STARTS = (b"{", b"[", "{", "[")
+
+
+def default_backend():
+    if msgspec is not None:
+        return "msgspec"
+    if orjson is not None:
+        return "orjson"
+    return "json"
+
+
+def make_sample(topic, gyro_x, gyro_y, gyro_z, temp, humid, light, frame_no=None, device_ts=None):
+    sample = {
+        "topic": topic,
+        "frame_no": frame_no,
+        "device_ts": device_ts,
+        "gyro_x": gyro_x,
+        "gyro_y": gyro_y,
+        "gyro_z": gyro_z,
+        "temperature": None,
+        "humidity": None,
+        "light": light,
+    }
+    # device reports temperature with a +10 offset and humidity as a fraction
+    if temp is not None and humid is not None:
+        sample["temperature"] = temp - 10
+        sample["humidity"] = humid * 100.0
+    return sample
+
+
+def _field(data, key, kind, default):
+    value = data.get(key, default)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number, got {value!r}")
+    return kind(value)
+
+
+if msgspec is not None:
+    SensorPayload = msgspec.defstruct(
+        "SensorPayload", [(key, kind | None, default) for key, kind, default in SCHEMA])
+    _MSGSPEC_DECODER = msgspec.json.Decoder(SensorPayload | list[SensorPayload])
+
+
+class PayloadDecoder:
+    """
+    Decodes raw MQTT payloads into lists of sample dicts, one per frame.
+    With payload_format "auto" a payload that does not start like JSON, or
+    fails to parse as JSON, is read as SensorData_t frames when its length
+    is a multiple of the struct size.
+    """
+    def __init__(self, payload_format="auto", backend=None):
+        if payload_format not in FORMATS:
+            raise ValueError(f"Unknown payload format: {payload_format}")
+        backend = backend or default_backend()
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        if (backend == "msgspec" and msgspec is None) or (backend == "orjson" and orjson is None):
+            raise RuntimeError(f"{backend} is not installed")
+        self.payload_format = payload_format
+        self.backend = backend
+        self._json_decoder = getattr(self, f"_decode_{backend}")
+
+    def decode(self, topic, payload):
+        if self.payload_format == "binary":
+            return self.decode_binary(topic, payload)
+        if self.payload_format == "json" or payload[:1] in _JSON_STARTS:
+            try:
+                return self._json_decoder(topic, payload)
+            except Exception:
+                # a binary frame can start with '{' or '[' by chance (frame number 123 or 91)
+                if self.payload_format == "json" or not self._fits_binary(payload):
+                    raise
+        return self.decode_binary(topic, payload)
+
+    @staticmethod
+    def _fits_binary(payload):
+        return not isinstance(payload, str) and len(payload) and len(payload) % SENSOR_DATA.size == 0
+
+    def decode_binary(self, topic, payload):
+        if isinstance(payload, str):
+            raise ValueError("binary payload expected, got text")
+        view = memoryview(payload)
+        if not view.nbytes or view.nbytes % SENSOR_DATA.size:
+            raise ValueError(f"SensorData_t payload must be a multiple of {SENSOR_DATA.size} bytes, "
+                             f"got {view.nbytes}")
+        return [make_sample(topic, gyro_x, gyro_y, gyro_z, temp, humid, light, frame_no, ts)
+                for frame_no, ts, temp, gyro_x, gyro_y, gyro_z, light, humid in SENSOR_DATA.iter_unpack(view)]
+
+    def _decode_msgspec(self, topic, payload):
+        data = _MSGSPEC_DECODER.decode(payload)
+        if not isinstance(data, list):
+            data = (data,)
+        return [make_sample(topic, d.gyro_x, d.gyro_y, d.gyro_z, d.temperature, d.humidity, d.light, d.frmNo, d.ts)
+                for d in data]
+
+    def _decode_orjson(self, topic, payload):
+        if isinstance(payload, memoryview):
+            payload = bytes(payload)
+        return self._from_json(topic, orjson.loads(payload))
+
+    def _decode_json(self, topic, payload):
+        if isinstance(payload, memoryview):
+            payload = bytes(payload)
+        return self._from_json(topic, json.loads(payload))
+
+    def _from_json(self, topic, data):
+        if isinstance(data, list):
+            return [self._from_mapping(topic, item) for item in data]
+        return [self._from_mapping(topic, data)]
+
+    @staticmethod
+    def _from_mapping(topic, data):
+        if not isinstance(data, dict):
+            raise ValueError(f"sample must be a JSON object, got {type(data).__name__}")
+        return make_sample(
+            topic,
+            _field(data, "gyro_x", float, 0.0),
+            _field(data, "gyro_y", float, 0.0),
+            _field(data, "gyro_z", float, 0.0),
+            _field(data, "temperature", float, None),
+            _field(data, "humidity", float, None),
+            _field(data, "light", float, None),
+            _field(data, "frmNo", int, None),
+            _field(data, "ts", float, None))
+
+
+def encode_binary(frame_no, timestamp, temperature, gyro_x, gyro_y, gyro_z, light, humidity):
+    """Pack a SensorData_t the way the board would, for replay and load generation."""
+    return SENSOR_DATA.pack(frame_no, timestamp, temperature, gyro_x, gyro_y, gyro_z, light, humidity)
@@ -0,0 +1,223 @@
+"""
+Reconnection policy for MQTTClient.
+
+The CRT calls on_connection_interrupted on its event loop thread, which
+must not block, so the callback only hands the outage to a
+ReconnectManager. The manager's own thread retries with jittered
+exponential backoff and stops trying for a cooldown period after too many
+failures in a row (circuit breaker). Messages that arrive while the
+connection is being restored, such as the session backlog the broker
+replays on resume, are held back and delivered in order once it is up.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+PAUSED = "paused"  # circuit breaker open, no attempts until the cooldown ends
+STOPPED = "stopped"
+
+
+class Backoff:
+    """
+    Exponential backoff with "equal jitter": attempt n waits between half
+    and all of min(max_delay, base_delay * 2**n), so clients that lost the
+    broker together do not all come back in the same second.
+    """
+    def __init__(self, base_delay=1.0, max_delay=60.0, rng=None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt):
+        cap = min(self.max_delay, self.base_delay * 2 ** min(attempt, 32))
+        return cap / 2 + self._rng.uniform(0, cap / 2)
+
+
+class ReconnectManager:
+    """
+    reconnect: callable that re-establishes the connection and subscriptions,
+    raising on failure; it runs on the manager's thread.
+    deliver: the message callback buffered messages are flushed to.
+    on_status: receives "MQTT Status: ..." texts.
+    """
+    def __init__(self, reconnect, deliver, on_status=None, on_offline=None, base_delay=1.0, max_delay=60.0,
+                 failure_threshold=5, cooldown=120.0, buffer_size=10000):
+        self.reconnect = reconnect
+        self.deliver = deliver
+        self.on_status = on_status
+        self.on_offline = on_offline
+        self.backoff = Backoff(base_delay, max_delay)
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = cooldown
+        self.state = CONNECTED
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()     # an outage to handle, or stop()
+        self._resumed = threading.Event()  # the SDK got the connection back by itself
+        self._buffer = deque()
+        self._buffer_size = max(0, int(buffer_size))
+        self._down_since = None
+
+        # metrics
+        self.outages = 0
+        self.reconnects = 0
+        self.attempts = 0
+        self.failures = 0
+        self.breaker_trips = 0
+        self.downtime = 0.0        # seconds, finished outages only
+        self.last_recovery = None  # seconds from interruption to recovery, last outage
+        self.max_recovery = 0.0
+        self.buffered = 0
+        self.buffer_dropped = 0
+
+        self._thread = threading.Thread(target=self._run, name="MQTTReconnect", daemon=True)
+        self._thread.start()
+
+    # CRT / connect thread side, never blocks
+
+    def connection_lost(self, error=None):
+        with self._lock:
+            if self.state == STOPPED:
+                return
+            if self._down_since is None:
+                self._down_since = time.monotonic()
+                self.outages += 1
+            if self.state == CONNECTED:
+                self.state = RECONNECTING
+            self._resumed.clear()
+        self._wake.set()
+
+    def connection_resumed(self):
+        self._resumed.set()
+
+    def offer(self, topic, payload, kwargs):
+        """
+        Hold a message back while the connection is being restored, or while
+        held messages are still being flushed so order is kept. Returns
+        False when it should be delivered right away.
+        """
+        with self._lock:
+            if self.state == CONNECTED and not self._buffer:
+                return False
+            if len(self._buffer) >= self._buffer_size:
+                if not self._buffer_size:
+                    return False
+                self._buffer.popleft()
+                self.buffer_dropped += 1
+            self._buffer.append((topic, payload, kwargs))
+            self.buffered += 1
+            return True
+
+    def stop(self):
+        with self._lock:
+            self.state = STOPPED
+        self._wake.set()
+        self._resumed.set()
+
+    def stats(self):
+        with self._lock:
+            ongoing = time.monotonic() - self._down_since if self._down_since is not None else 0.0
+            return {
+                "state": self.state,
+                "outages": self.outages,
+                "reconnects": self.reconnects,
+                "attempts": self.attempts,
+                "failures": self.failures,
+                "breaker_trips": self.breaker_trips,
+                "downtime": self.downtime + ongoing,
+                "last_recovery": self.last_recovery,
+                "max_recovery": self.max_recovery,
+                "buffered": self.buffered,
+                "buffer_depth": len(self._buffer),
+                "buffer_dropped": self.buffer_dropped,
+            }
+
+    # manager thread
+
+    def _status(self, text):
+        if self.on_status:
+            self.on_status(text)
+
+    def _stopped(self):
+        return self.state == STOPPED
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped():
+                return
+            if self.state != CONNECTED:
+                self._recover()
+
+    def _recover(self):
+        attempt = 0
+        failures_in_row = 0
+        while not self._stopped():
+            if failures_in_row >= self.failure_threshold:
+                self.breaker_trips += 1
+                with self._lock:
+                    if self.state == STOPPED:
+                        return
+                    self.state = PAUSED
+                print(f"[MQTT] {failures_in_row} reconnects failed, pausing for {self.cooldown:.0f} s")
+                self._status(f"MQTT Status: Reconnect paused, retry in {self.cooldown:.0f} s")
+                if self.on_offline:
+                    self.on_offline()
+                # half-open afterwards: one attempt decides whether the breaker closes again
+                if self._resumed.wait(self.cooldown):
+                    break
+                failures_in_row = self.failure_threshold - 1
+                with self._lock:
+                    if self.state == STOPPED:
+                        return
+                    self.state = RECONNECTING
+
+            delay = self.backoff.delay(attempt)
+            self._status(f"MQTT Status: Reconnecting in {delay:.1f} s")
+            if self._resumed.wait(delay):
+                break
+            if self._stopped():
+                return
+            self.attempts += 1
+            try:
+                self.reconnect()
+                break
+            except Exception as e:
+                self.failures += 1
+                failures_in_row += 1
+                attempt += 1
+                print(f"[❌] Reconnection attempt {self.attempts} failed: {e}")
+        if self._stopped():
+            return
+        self._recovered()
+
+    def _recovered(self):
+        with self._lock:
+            took = time.monotonic() - self._down_since if self._down_since is not None else 0.0
+            self._down_since = None
+            self.downtime += took
+            self.last_recovery = took
+            self.max_recovery = max(self.max_recovery, took)
+            self.reconnects += 1
+        print(f"✅ Reconnected after {took:.1f} s")
+        self._status(f"MQTT Status: Connected (recovered in {took:.1f} s)")
+
+        # deliver what arrived meanwhile; the state only flips once the buffer
+        # is empty, so newer messages queue up behind the held ones
+        while True:
+            with self._lock:
+                if self.state == STOPPED:
+                    return
+                if not self._buffer:
+                    if self._down_since is None:
+                        self.state = CONNECTED
+                    return
+                topic, payload, kwargs = self._buffer.popleft()
+            try:
+                self.deliver(topic, payload, **kwargs)
+            except Exception as e:
+                print(f"[❌] Delivering buffered message on {topic} failed: {e}")
@@ -0,0 +1,52 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class RenderScheduler(QObject):
+    """
+    Drives chart redraws from a single frame timer. Plots buffer incoming
+    samples and mark themselves dirty; once per frame every dirty plot whose
+    chart is on screen flushes its buffer into the QLineSeries. Plots on
+    hidden tabs stay dirty and catch up on the first frame after they are shown.
+    """
+    frame_done = Signal(int)  # plots flushed in the frame that just ended
+
+    def __init__(self, fps=30, parent=None):
+        super().__init__(parent)
+        self._plots = []
+        self.frames = 0
+        self.flushes = 0
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._on_frame)
+        self.set_fps(fps)
+
+    def register(self, plot):
+        if plot not in self._plots:
+            self._plots.append(plot)
+
+    def unregister(self, plot):
+        if plot in self._plots:
+            self._plots.remove(plot)
+
+    def set_fps(self, fps):
+        self.fps = max(1, min(int(fps), 120))
+        self.timer.start(int(1000 / self.fps))
+
+    def stop(self):
+        self.timer.stop()
+
+    def flush_all(self):
+        """Flush every dirty plot regardless of visibility."""
+        for plot in self._plots:
+            if plot.dirty:
+                plot.flush()
+                self.flushes += 1
+
+    def _on_frame(self):
+        self.frames += 1
+        flushed = 0
+        for plot in self._plots:
+            if plot.dirty and plot.chart_view.isVisible():
+                plot.flush()
+                flushed += 1
+        self.flushes += flushed
+        self.frame_done.emit(flushed)
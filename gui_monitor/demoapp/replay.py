@@ -0,0 +1,276 @@
+"""
+Replay recorded sensor data through the full GUI pipeline, without the
+board or AWS IoT.
+
+    python replay.py logs/log_2025-07-01.csv                 # real time
+    python replay.py logs/log_2025-07-01.slog --speed 20     # 20x
+    python replay.py capture.jsonl --speed max --headless    # benchmark
+
+Inputs:
+  * sensor logs written by SensorLogger (.csv / .slog, also .gz / .zst);
+    the per-sensor rows are regrouped into one device payload per frame
+  * captured MQTT traffic, one message per line, either JSON
+    {"t": <epoch s>, "topic": "...", "payload": "<raw payload>"} or a bare
+    device payload object (timed by its "ts" field or --rate), or
+    `mosquitto_sub -v` output ("<topic> <payload>")
+
+Every payload is handed to MainWindow._on_mqtt_message from a separate
+thread, exactly like the CRT callback does, so queueing, decoding,
+thresholds, logging and rendering all run as in a live session. At the
+end the achieved throughput, ingest drops, decode errors and rendered
+frames are reported.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from log_query import iter_segment_rows
+
+DEFAULT_TOPIC = "replay/sensors/data"
+# first sensor logged for each frame, see MainWindow._on_sample_batch
+FRAME_SENSOR = "Gyroscope"
+
+
+def _device_payload(frame):
+    """Rebuild the device JSON from logged values (undoing the decode conversions)."""
+    payload = {}
+    gyro = frame.get("Gyroscope")
+    if gyro:
+        payload.update(gyro_x=gyro.get("X", 0.0), gyro_y=gyro.get("Y", 0.0), gyro_z=gyro.get("Z", 0.0))
+    th = frame.get("Temperature & Humidity")
+    if th and "Temperature" in th and "Humidity" in th:
+        payload.update(temperature=th["Temperature"] + 10, humidity=th["Humidity"] / 100.0)
+    light = frame.get("Light")
+    if light and "L" in light:
+        payload["light"] = light["L"]
+    return json.dumps(payload).encode()
+
+
+def _device_topic(device, default):
+    return f"sensors/{device}/data" if device else default
+
+
+def _spread(events):
+    """CSV logs stamp whole seconds; spread the frames of one second evenly across it."""
+    group = []
+    for event in events:
+        if group and event[0] != group[0][0]:
+            yield from _spread_group(group)
+            group = []
+        group.append(event)
+    yield from _spread_group(group)
+
+
+def _spread_group(group):
+    n = len(group)
+    for i, (t, topic, payload) in enumerate(group):
+        yield t + i / n, topic, payload
+
+
+def read_log(path, topic=DEFAULT_TOPIC):
+    """
+    Yield (t, topic, payload) for every frame of a SensorLogger segment.
+    Rows tagged with a device go out on sensors/<device>/data, untagged
+    ones on `topic`.
+    """
+    def frames():
+        open_frames = {}  # device -> [frame, frame_t, last_sensor]
+        for t, sensor, field, value, device in iter_segment_rows(path):
+            state = open_frames.get(device)
+            if state is None:
+                state = open_frames[device] = [{}, None, None]
+            frame, frame_t, last_sensor = state
+            # a frame ends where a field repeats or the next gyro sample begins
+            if frame and (field in frame.get(sensor, ()) or
+                          (sensor == FRAME_SENSOR and last_sensor != FRAME_SENSOR)):
+                yield frame_t, _device_topic(device, topic), _device_payload(frame)
+                frame = state[0] = {}
+                state[1] = None
+            if state[1] is None:
+                state[1] = t
+            frame.setdefault(sensor, {})[field] = value
+            state[2] = sensor
+        for device, (frame, frame_t, _) in open_frames.items():
+            if frame:
+                yield frame_t, _device_topic(device, topic), _device_payload(frame)
+
+    if ".slog" in os.path.basename(path):
+        return frames()
+    return _spread(frames())
+
+
+def read_capture(path, topic=DEFAULT_TOPIC, rate=10.0):
+    """Yield (t, topic, payload) from a captured MQTT message file."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        lines = [json.dumps(item) for item in json.loads(text)]
+    else:
+        lines = text.splitlines()
+
+    n = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        msg_topic = topic
+        if not line.startswith("{"):
+            # mosquitto_sub -v: "<topic> <payload>"
+            msg_topic, _, line = line.partition(" ")
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # keep malformed payloads, the pipeline has to cope with them too
+            yield n / rate, msg_topic, line.encode()
+            n += 1
+            continue
+        if isinstance(record, dict) and "payload" in record:
+            payload = record["payload"]
+            if not isinstance(payload, str):
+                payload = json.dumps(payload)
+            yield float(record.get("t", n / rate)), record.get("topic", msg_topic), payload.encode()
+        else:
+            t = record.get("ts", n / rate) if isinstance(record, dict) else n / rate
+            yield float(t), msg_topic, line.encode()
+        n += 1
+
+
+def read_source(path, topic=DEFAULT_TOPIC, rate=10.0):
+    name = os.path.basename(path)
+    if ".csv" in name or ".slog" in name:
+        return read_log(path, topic)
+    return read_capture(path, topic, rate)
+
+
+class ReplayDriver(threading.Thread):
+    """
+    Publishes (t, topic, payload) events into `deliver(topic, payload)` from
+    its own thread. speed=1 keeps the recorded timing, speed=N compresses it
+    N times, speed=0 sends as fast as the pipeline accepts.
+    """
+    def __init__(self, events, deliver, speed=1.0):
+        super().__init__(name="ReplayDriver", daemon=True)
+        self.events = events
+        self.deliver = deliver
+        self.speed = speed
+        self.sent = 0
+        self.max_lag = 0.0  # worst delay behind the schedule, seconds
+        self.started_at = None
+        self.finished_at = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        t0 = None
+        for t, topic, payload in self.events:
+            if self._stop_event.is_set():
+                break
+            if self.speed > 0:
+                if t0 is None:
+                    t0 = t
+                due = self.started_at + (t - t0) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    if self._stop_event.wait(delay):
+                        break
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            self.deliver(topic, payload)
+            self.sent += 1
+        self.finished_at = time.perf_counter()
+
+
+def _chain(sources):
+    for source in sources:
+        yield from source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="sensor log segments or captured MQTT message files")
+    parser.add_argument("--speed", default="1",
+                        help="replay speed factor, or 'max' to send as fast as possible (default: 1)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="messages per second for captures without timestamps (default: 10)")
+    parser.add_argument("--topic", default=DEFAULT_TOPIC, help="topic for sources that do not record one")
+    parser.add_argument("--log-dir", default="replay_logs",
+                        help="where the replayed samples are logged, kept apart from the live logs")
+    parser.add_argument("--headless", action="store_true", help="run on the offscreen Qt platform")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    if args.headless:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+    from main import MainWindow
+
+    app = QApplication(sys.argv)
+    window = MainWindow(connect_mqtt=False, interactive=not args.headless, log_dir=args.log_dir)
+    window.update_mqtt_status("MQTT Status: Replay")
+    window.show()
+
+    events = _chain(read_source(path, args.topic, args.rate) for path in args.files)
+    driver = ReplayDriver(events, window._on_mqtt_message, speed=speed)
+    frames_before = window.render_scheduler.frames
+    report = {}
+
+    def check_done():
+        if driver.is_alive() or window.ingest_queue.depth():
+            return
+        # frames are counted until the queue drains, so rate them over that span, not the send time
+        drained_at = time.perf_counter()
+        # let the last batch reach the charts before measuring
+        window.render_scheduler.flush_all()
+        elapsed = driver.finished_at - driver.started_at
+        render_elapsed = drained_at - driver.started_at
+        stats = window.ingest_queue.stats()
+        frames = window.render_scheduler.frames - frames_before
+        report.update({
+            "messages": driver.sent,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_msg_s": round(driver.sent / elapsed, 1) if elapsed > 0 else None,
+            "decoded": window.ingest_worker.decoded,
+            "dropped": stats["dropped"],
+            "decode_errors": window.ingest_worker.decode_errors,
+            "queue_peak": stats["high_watermark"],
+            "max_lag_s": round(driver.max_lag, 3),
+            "render_frames": frames,
+            "render_s": round(render_elapsed, 3),
+            "render_fps": round(frames / render_elapsed, 1) if render_elapsed > 0 else None,
+            "target_fps": window.render_scheduler.fps,
+        })
+        poll.stop()
+        app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check_done)
+    poll.start(100)
+    driver.start()
+    try:
+        app.exec()
+    finally:
+        driver.stop()
+        window.shutdown()
+
+    if args.json:
+        print(json.dumps(report))
+    elif report:
+        print(f"Replayed {report['messages']} messages in {report['elapsed_s']:.2f} s "
+              f"({report['throughput_msg_s']} msg/s), max lag {report['max_lag_s']:.3f} s")
+        print(f"Decoded {report['decoded']} samples, dropped {report['dropped']}, "
+              f"decode errors {report['decode_errors']}, queue peak {report['queue_peak']}")
+        print(f"Rendered {report['render_frames']} frames in {report['render_s']:.2f} s "
+              f"({report['render_fps']} fps, target {report['target_fps']})")
+
+
+if __name__ == "__main__":
+    main()
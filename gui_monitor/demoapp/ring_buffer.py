@@ -0,0 +1,73 @@
+from array import array
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of timestamped samples. Each column (the timestamp
+    plus one per value) lives in its own array('d'), so append is O(1) and
+    reading a column back in order is two C-level slice copies. The arrays
+    grow by doubling up to `capacity`, so a buffer that only ever sees a few
+    samples (a quiet device) stays small.
+    """
+    INITIAL_SLOTS = 256
+
+    def __init__(self, capacity, columns=1):
+        self.capacity = max(1, int(capacity))
+        self.num_columns = columns
+        self._allocated = min(self.capacity, self.INITIAL_SLOTS)
+        self._times = array("d", bytes(8 * self._allocated))
+        self._values = [array("d", bytes(8 * self._allocated)) for _ in range(columns)]
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        grown = min(self.capacity, self._allocated * 2)
+        padding = bytes(8 * (grown - self._allocated))
+        for arr in (self._times, *self._values):
+            arr.frombytes(padding)
+        self._allocated = grown
+
+    def nbytes(self):
+        return 8 * self._allocated * (1 + self.num_columns)
+
+    def append(self, timestamp, *values):
+        if self._size < self.capacity:
+            # _start stays 0 until the buffer is full, so growing never has to unwrap
+            if self._size == self._allocated:
+                self._grow()
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            # full: overwrite the oldest slot
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._times[index] = timestamp
+        for column, value in zip(self._values, values):
+            column[index] = value
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def _ordered(self, arr):
+        end = self._start + self._size
+        if end <= self.capacity:
+            return arr[self._start:end]
+        return arr[self._start:] + arr[:end - self.capacity]
+
+    def timestamps(self):
+        return self._ordered(self._times)
+
+    def column(self, index=0):
+        return self._ordered(self._values[index])
+
+    def first_timestamp(self):
+        return self._times[self._start] if self._size else None
+
+    def last_timestamp(self):
+        if not self._size:
+            return None
+        return self._times[(self._start + self._size - 1) % self.capacity]
@@ -0,0 +1,333 @@
+"""
+Alert rules over the fields of a device.
+
+A rule is a threshold expression over any of the sample fields, e.g.
+"Z > 2 and T > 40", so one rule can combine sensors. It covers every
+device whose ID matches its device patterns instead of being copied per
+device, and keeps its breach/recovery hysteresis per device.
+
+Rules are indexed by the sample keys they read, directly or through a
+window function. A sample only re-evaluates the rules that read one of
+the keys it carries, and the rules that apply to a device are looked up
+once per device and set of keys present, so the work per sample follows
+the number of affected rules, not the number of rules.
+"""
+from fnmatch import fnmatchcase
+from itertools import count
+
+import numpy as np
+
+from devices import FIELD_VARS
+from threshold_expr import apply_hysteresis, compile_threshold, compile_threshold_batch
+
+NAN = float("nan")
+SAMPLE_KEYS = tuple(FIELD_VARS.values())
+
+
+class Rule:
+    """
+    One compiled rule. devices holds glob patterns of the device IDs it
+    applies to, every device when empty. states maps a device ID to its
+    [breach_count, recovery_count, active].
+    """
+    __slots__ = ("name", "text", "devices", "enabled", "breach_required", "recovery_required",
+                 "predicate", "batch_predicate", "variables", "windows", "keys", "order", "states")
+
+    _order = count()
+
+    def __init__(self, name, text, allowed_vars=FIELD_VARS, devices=(), enabled=True,
+                 breach_required=3, recovery_required=3):
+        self.name = name
+        self.text = text
+        self.devices = tuple(devices)
+        self.enabled = enabled
+        self.breach_required = breach_required
+        self.recovery_required = recovery_required
+        self.predicate = compile_threshold(text, allowed_vars)
+        self.batch_predicate = compile_threshold_batch(text, allowed_vars)
+        # variable -> sample key, window name -> (function, sample key, seconds)
+        self.variables = {var: FIELD_VARS[var] for var in self.predicate.variables}
+        self.windows = {name: (func, FIELD_VARS[var], secs)
+                        for name, (func, var, secs) in self.predicate.windows.items()}
+        self.keys = frozenset(self.variables.values()) | {ref[1] for ref in self.windows.values()}
+        self.order = next(Rule._order)
+        self.states = {}
+
+
+class RuleEngine:
+    """
+    Evaluates the enabled rules against each device's samples and calls
+    on_trigger(rule, device_id) / on_clear(rule, device_id) when a rule's
+    alert starts or ends on a device. A single sample is checked with the
+    scalar predicates, a burst of at least `batch_min` samples with the
+    vectorized ones plus apply_hysteresis, raising and clearing alerts at
+    the same samples. Shorter bursts are stepped through one sample at a
+    time: below about 30 samples the per-rule NumPy overhead costs more
+    than it saves (see benchmarks/bench_rules.py).
+
+    Variables a sample does not carry keep the device's last value, NaN
+    before the first one, so "Z > 2 and T > 40" compares gyro samples with
+    the latest temperature.
+    """
+    def __init__(self, on_trigger=None, on_clear=None, batch_min=32):
+        self.rules = {}       # name -> Rule
+        self.on_trigger = on_trigger
+        self.on_clear = on_clear
+        self.batch_min = batch_min
+        self.active = 0       # (rule, device) pairs currently in alert
+        self.evaluations = 0  # rule evaluations, a batch counting once per rule
+        self._by_key = {}     # sample key -> {name: Rule} of the enabled rules reading it
+        self._ref_counts = {} # window ref -> enabled rules using it
+        self._affected = {}   # device ID -> {keys present: [Rule]}
+        self._matches = {}    # device ID -> {device patterns: whether the ID matches}
+        self._latest = {}     # device ID -> {variable: last value}
+        self._devices = {}    # device ID -> Device, to keep Device.alerts in step
+        self._refs = None
+
+    def set_rule(self, name, text, **options):
+        """Compile and add a rule, replacing one of the same name. Raises ThresholdError."""
+        rule = Rule(name, text, **options)
+        self.remove_rule(name)
+        self.rules[name] = rule
+        if rule.enabled:
+            self._index(rule)
+        return rule
+
+    def remove_rule(self, name):
+        rule = self.rules.pop(name, None)
+        if rule is not None and rule.enabled:
+            self._drop_states(rule)
+            self._unindex(rule)
+
+    def enable(self, name, enabled=True):
+        rule = self.rules.get(name)
+        if rule is None or rule.enabled == enabled:
+            return
+        rule.enabled = enabled
+        if enabled:
+            self._index(rule)
+        else:
+            self._drop_states(rule)
+            self._unindex(rule)
+
+    def window_refs(self):
+        """Streaming statistics the enabled rules need, as (function, sample key, seconds)."""
+        if self._refs is None:
+            self._refs = frozenset(self._ref_counts)
+        return self._refs
+
+    def forget_device(self, device_id):
+        self._affected.pop(device_id, None)
+        self._matches.pop(device_id, None)
+        self._latest.pop(device_id, None)
+        self._devices.pop(device_id, None)
+        for rule in self.rules.values():
+            state = rule.states.pop(device_id, None)
+            if state is not None and state[2]:
+                self.active -= 1
+
+    def process(self, device, samples):
+        """
+        Add samples to device.stats and evaluate the rules they affect.
+        Statistics go first, so rules see windows that include the samples
+        they check.
+        """
+        self._devices[device.device_id] = device
+        if len(samples) >= max(2, self.batch_min):
+            self._process_batch(device, samples)
+        else:
+            for sample in samples:
+                self._process_sample(device, sample)
+
+    def _process_sample(self, device, sample):
+        device.stats.update((sample,))
+        latest = self._latest_values(device.device_id)
+        present = []
+        for var, key in FIELD_VARS.items():
+            value = sample[key]
+            if value is not None:
+                latest[var] = value
+                present.append(key)
+        rules = self._rules_for(device.device_id, frozenset(present))
+        if not rules:
+            return
+        values = dict(latest)
+        for rule in rules:
+            for name, ref in rule.windows.items():
+                if name not in values:
+                    values[name] = device.stats.value(*ref)
+        self.evaluations += len(rules)
+        for rule in rules:
+            try:
+                breached = rule.predicate(values)
+            except Exception as e:
+                print(f"[ALERT] Evaluation error in {rule.name}:", e)
+                continue
+            self._step(rule, device, breached)
+
+    def _process_batch(self, device, samples):
+        n = len(samples)
+        positions = {}  # sample key -> indices of the samples carrying it
+        for key in SAMPLE_KEYS:
+            carried = np.fromiter((s[key] is not None for s in samples), bool, n)
+            if carried.any():
+                positions[key] = carried.nonzero()[0]
+        rules = self._rules_for(device.device_id, frozenset(positions))
+        refs = {ref for rule in rules for ref in rule.windows.values()}
+        before = {ref: device.stats.value(*ref) for ref in refs}
+        windows = device.stats.update(samples, collect=refs)
+
+        latest = self._latest_values(device.device_id)
+        columns = {}
+        for var, key in FIELD_VARS.items():
+            at = positions.get(key)
+            if at is None:
+                continue
+            values = np.fromiter((samples[i][key] for i in at), float, len(at))
+            columns[var] = _hold(at, values, n, latest[var])
+            latest[var] = float(values[-1])
+        if not rules:
+            return
+
+        held = {}  # window ref -> value after every sample of the batch
+        rows = {}  # rule keys -> indices of the samples that affect such a rule
+        self.evaluations += len(rules)
+        for rule in rules:
+            index = rows.get(rule.keys)
+            if index is None:
+                index = rows[rule.keys] = (np.unique(np.concatenate([positions[k] for k in rule.keys
+                                                                     if k in positions])))
+            arrays = {var: columns[var][index] if var in columns else np.full(len(index), latest[var])
+                      for var in rule.variables}
+            for name, ref in rule.windows.items():
+                column = held.get(ref)
+                if column is None:
+                    at = positions.get(ref[1])
+                    column = held[ref] = (_hold(at, windows[ref], n, before[ref]) if at is not None
+                                          else np.full(n, before[ref]))
+                arrays[name] = column[index]
+            try:
+                mask = rule.batch_predicate(arrays)
+            except Exception as e:
+                print(f"[ALERT] Evaluation error in {rule.name}:", e)
+                continue
+            state = self._state(rule, device.device_id)
+            was_active = state[2]
+            state[0], state[1], state[2], events = apply_hysteresis(
+                mask, state[0], state[1], state[2], rule.breach_required, rule.recovery_required)
+            if state[2] != was_active:
+                self._count_active(rule, device, state[2])
+            for _, event in events:
+                callback = self.on_trigger if event == "trigger" else self.on_clear
+                if callback is not None:
+                    callback(rule, device.device_id)
+
+    def _step(self, rule, device, breached):
+        state = self._state(rule, device.device_id)
+        if breached:
+            state[0] += 1
+            state[1] = 0
+            if state[0] >= rule.breach_required and not state[2]:
+                state[2] = True
+                self._count_active(rule, device, True)
+                if self.on_trigger is not None:
+                    self.on_trigger(rule, device.device_id)
+        else:
+            state[0] = 0
+            if state[2]:
+                state[1] += 1
+                if state[1] >= rule.recovery_required:
+                    state[2] = False
+                    self._count_active(rule, device, False)
+                    if self.on_clear is not None:
+                        self.on_clear(rule, device.device_id)
+
+    def _state(self, rule, device_id):
+        state = rule.states.get(device_id)
+        if state is None:
+            state = rule.states[device_id] = [0, 0, False]
+        return state
+
+    def _count_active(self, rule, device, active):
+        if active:
+            self.active += 1
+            device.alerts.add(rule.name)
+        else:
+            self.active -= 1
+            device.alerts.discard(rule.name)
+
+    def _drop_states(self, rule):
+        # a rule that goes away takes its alerts with it
+        for device_id, state in rule.states.items():
+            if not state[2]:
+                continue
+            device = self._devices.get(device_id)
+            if device is not None:
+                self._count_active(rule, device, False)
+            else:
+                self.active -= 1
+            if self.on_clear is not None:
+                self.on_clear(rule, device_id)
+        rule.states.clear()
+
+    def _latest_values(self, device_id):
+        latest = self._latest.get(device_id)
+        if latest is None:
+            latest = self._latest[device_id] = dict.fromkeys(FIELD_VARS, NAN)
+        return latest
+
+    def _rules_for(self, device_id, present):
+        """Enabled rules reading any of the keys in `present` that apply to the device, in the order added."""
+        cache = self._affected.get(device_id)
+        if cache is None:
+            cache = self._affected[device_id] = {}
+        rules = cache.get(present)
+        if rules is None:
+            candidates = {rule for key in present for rule in self._by_key.get(key, {}).values()}
+            matches = self._matches.get(device_id)
+            if matches is None:
+                matches = self._matches[device_id] = {}
+            rules = []
+            for rule in candidates:
+                # rules tend to share patterns, each is matched once per device
+                match = matches.get(rule.devices)
+                if match is None:
+                    match = matches[rule.devices] = (not rule.devices or any(fnmatchcase(device_id, pattern)
+                                                                             for pattern in rule.devices))
+                if match:
+                    rules.append(rule)
+            rules.sort(key=lambda rule: rule.order)
+            cache[present] = rules
+        return rules
+
+    def _index(self, rule):
+        for key in rule.keys:
+            self._by_key.setdefault(key, {})[rule.name] = rule
+        for ref in rule.windows.values():
+            self._ref_counts[ref] = self._ref_counts.get(ref, 0) + 1
+        self._refs = None
+        self._affected.clear()
+
+    def _unindex(self, rule):
+        for key in rule.keys:
+            del self._by_key[key][rule.name]
+        for ref in rule.windows.values():
+            left = self._ref_counts[ref] - 1
+            if left:
+                self._ref_counts[ref] = left
+            else:
+                del self._ref_counts[ref]
+        self._refs = None
+        self._affected.clear()
+
+
+def _hold(positions, values, length, before):
+    """
+    Spread values taken at the sorted `positions` over `length` samples,
+    each held until the next position; samples before the first one get
+    `before`.
+    """
+    if len(positions) == length:
+        return values
+    at = np.searchsorted(positions, np.arange(length), side="right") - 1
+    return np.where(at >= 0, values[np.maximum(at, 0)], before)
@@ -1,17 +1,33 @@
-import re
+import time
 
 from PySide6.QtWidgets import (
-    QWidget, QLineEdit, QCheckBox, QGridLayout, QVBoxLayout, QHBoxLayout, QLabel
+    QWidget, QLineEdit, QCheckBox, QGridLayout, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+    QMessageBox, QPushButton
 )
 
-from PySide6.QtCore import Qt
-from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
-from PySide6.QtGui import QColor
+from PySide6.QtCore import Qt, QTimer
 from collections import deque
 
-from time_series_plot import TimeSeriesPlot
-from time_series_plot_dual import TimeSeriesPlotDualAxis
-from time_series_multi_plot_timestamp import TimeSeriesMultiPlotTimestamp
+# QtCharts (and the plot modules built on it) are imported when a chart is first shown
+from threshold_expr import compile_threshold, ThresholdError
+from chart_history import ChartHistory
+from sensor_log_format import SENSOR_IDS
+from devices import SENSOR_KEYS
+
+# selectable chart windows, label -> seconds
+TIME_WINDOWS = {
+    "1 min": 60,
+    "10 min": 600,
+    "1 hour": 3600,
+    "24 hours": 86400,
+}
+
+# raw samples kept per plot for re-bucketing after a resize (1 hour at 10 Hz)
+PLOT_BUFFER_POINTS = 36000
+
+
+def _device_id(device):
+    return device.device_id if device is not None else ""
 
 
 class SensorTab(QWidget):
@@ -20,37 +36,46 @@ class SensorTab(QWidget):
         self.sensor_name = sensor_name
         self.main_window = main_window
         self.labels = {}
-        
+        self.stats_labels = {}  # sample key -> streaming statistics of the open device
+        self.device = None  # Device shown in the chart, None until a board reports in
+        self.plot = None
+        self.history = None
+
         layout = QVBoxLayout()
-        if sensor_name == "Gyroscope":
-            # self._init_chart()
-            # layout.addWidget(self.chart_view)
-            # self.gyro_plot = TimeSeriesPlot(title="Gyroscope", y_label="°/s", y_range=(-5, 5))
-            # layout.addWidget(self.gyro_plot.chart_view)
-    
-            self.gyro_plot = TimeSeriesMultiPlotTimestamp(
-            title="Gyroscope", y_label="°/s", y_range=(-5, 5)
-            )
-            layout.addWidget(self.gyro_plot.chart_view)
-        
-        if sensor_name == "Temperature & Humidity":
-            # self._init_temp_humidity_chart()
-            # layout.addWidget(self.temp_chart_view)
-            self.temp_humid_plot = TimeSeriesPlotDualAxis()
-            layout.addWidget(self.temp_humid_plot.chart_view)
-                                
-        if sensor_name == "Light":
-            # self._init_light_chart()
-            # layout.addWidget(self.light_chart_view)
-            self.light_plot = TimeSeriesPlot(title="Light", y_label="Lux", y_range=(0, 500), max_points=100, color="red")
-            layout.addWidget(self.light_plot.chart_view)
+        # the chart is built the first time the tab is shown and rebuilt whenever another device is opened
+        self.chart_layout = QVBoxLayout()
+        layout.addLayout(self.chart_layout)
+
+        window_layout = QHBoxLayout()
+        self.window_combo = QComboBox()
+        self.window_combo.addItems(list(TIME_WINDOWS))
+        self.window_combo.setToolTip("Time span shown in the chart")
+        self.window_combo.currentTextChanged.connect(self.set_time_window)
+        self.live_button = QPushButton("Live")
+        self.live_button.setToolTip("Scroll to zoom and drag to pan through logged history; "
+                                    "click here or double-click the chart to follow live data again")
+        self.live_button.setEnabled(False)
+        window_layout.addStretch()
+        window_layout.addWidget(self.live_button)
+        window_layout.addWidget(QLabel("Time Window:"))
+        window_layout.addWidget(self.window_combo)
+        layout.addLayout(window_layout)
+
+        self.live_button.clicked.connect(self._go_live)
+        if getattr(main_window, "tile_cache", None) is not None:
+            main_window.history_tile_loaded.connect(self._on_history_tile_loaded)
             
         grid = QGridLayout()
-        for i, field in enumerate(fields):
+        for i, (field, key) in enumerate(zip(fields, SENSOR_KEYS.get(sensor_name, ()))):
             label = QLabel(f"{field}: --")
             label.setAlignment(Qt.AlignCenter)
             self.labels[field] = label
-            grid.addWidget(label, i // 2, i % 2)
+            grid.addWidget(label, i // 2 * 2, i % 2)
+            stats_label = QLabel("")
+            stats_label.setAlignment(Qt.AlignCenter)
+            stats_label.setStyleSheet("color: gray;")
+            self.stats_labels[key] = stats_label
+            grid.addWidget(stats_label, i // 2 * 2 + 1, i % 2)
         layout.addLayout(grid)
 
         # control_layout = QHBoxLayout()
@@ -62,6 +87,8 @@ class SensorTab(QWidget):
         
         threshold_layout = QHBoxLayout()
         self.threshold_valid = False
+        # threshold_input compiled into a RuleEngine rule named after the sensor, dropped when the text changes
+        self.rule = None
         self.threshold_input = QLineEdit()
         if sensor_name == "Gyroscope":
             self.threshold_input.setPlaceholderText("X > 1.0 or Y > 1.5 or Z > 2.0")
@@ -72,19 +99,19 @@ class SensorTab(QWidget):
         
         self.alert_enabled_checkbox = QCheckBox("Enable Alerts")
         self.alert_enabled_checkbox.setChecked(False)
+        self.alerts_enabled = False
+        self.alert_enabled_checkbox.toggled.connect(self._on_alerts_toggled)
                            
         # self.set_threshold_button = QPushButton("Set Alarm Threshold")
         # self.set_threshold_button.clicked.connect(self.validate_threshold)
         # self.threshold_input.editingFinished.connect(self.validate_threshold)
         
         self.threshold_input.editingFinished.connect(self.validate_threshold)
+        self.threshold_input.textChanged.connect(self._invalidate_threshold)
         
-        #count variables for alerting
-        self.threshold_breach_count = 0
+        #count variables for alerting, the counts are kept per device by the rule
         self.breach_required = 3  # trigger warning if breached 3 or more
-        self.alert_active = False
         #count variables for cancel alerting
-        self.recovery_count = 0
         self.recovery_required = 3
 
         if sensor_name == "Temperature & Humidity":
@@ -95,14 +122,119 @@ class SensorTab(QWidget):
             self.threshold_input.setToolTip("Enter a numeric light threshold value (e.g., L>300). Use 'L' for light.")
         else:
             self.threshold_input.setToolTip("Enter a numeric threshold value. Alarm will be triggered when sensor data exceeds this value.")
+        self.threshold_input.setToolTip(
+            self.threshold_input.toolTip() + "\nWindow statistics: mean/avg, rms, stddev, min, max, p50, p95, p99, "
+            "rate (change per second), sps (samples/s) and ewma, e.g. avg(T, 30s) > 30 or rate(H, 1m) > 0.1")
                     
         threshold_layout.addWidget(self.threshold_input)
         threshold_layout.addWidget(self.alert_enabled_checkbox)
         layout.addLayout(threshold_layout)
 
         self.setLayout(layout)
+
+    def _build_plot(self, buffer=None):
+        """Create this sensor's chart, drawing from `buffer` (a device's ring buffer) when given."""
+        from time_series_plot import TimeSeriesPlot
+        from time_series_plot_dual import TimeSeriesPlotDualAxis
+        from time_series_multi_plot_timestamp import TimeSeriesMultiPlotTimestamp
+
+        scheduler = self.main_window.render_scheduler if self.main_window is not None else None
+        if self.sensor_name == "Gyroscope":
+            # self._init_chart()
+            # layout.addWidget(self.chart_view)
+            # self.gyro_plot = TimeSeriesPlot(title="Gyroscope", y_label="°/s", y_range=(-5, 5))
+            # layout.addWidget(self.gyro_plot.chart_view)
+    
+            self.gyro_plot = TimeSeriesMultiPlotTimestamp(
+            title="Gyroscope", y_label="°/s", y_range=(-5, 5),
+            max_points=PLOT_BUFFER_POINTS, scheduler=scheduler, buffer=buffer
+            )
+            self.plot = self.gyro_plot
+        
+        if self.sensor_name == "Temperature & Humidity":
+            # self._init_temp_humidity_chart()
+            # layout.addWidget(self.temp_chart_view)
+            self.temp_humid_plot = TimeSeriesPlotDualAxis(max_points=PLOT_BUFFER_POINTS, scheduler=scheduler,
+                                                          buffer=buffer)
+            self.plot = self.temp_humid_plot
+                                
+        if self.sensor_name == "Light":
+            # self._init_light_chart()
+            # layout.addWidget(self.light_chart_view)
+            self.light_plot = TimeSeriesPlot(title="Light", y_label="Lux", y_range=(0, 500),
+                                             max_points=PLOT_BUFFER_POINTS, color="red", scheduler=scheduler,
+                                             buffer=buffer)
+            self.plot = self.light_plot
+
+        if self.plot is not None:
+            self.chart_layout.addWidget(self.plot.chart_view)
+
+    def _attach_history(self):
+        # history browsing from the log files, only when the main window provides a tile cache
+        if self.plot is None or getattr(self.main_window, "tile_cache", None) is None:
+            return
+        device_id = self.device.device_id if self.device is not None else ""
+        self.history = ChartHistory(self.plot, self.sensor_name, SENSOR_IDS[self.sensor_name][1],
+                                    self.main_window.tile_cache, device=device_id, parent=self)
+        self.history.mode_changed.connect(self.live_button.setEnabled)
+
+    def _go_live(self):
+        if self.history is not None:
+            self.history.go_live()
+
+    def _on_history_tile_loaded(self, key):
+        if self.history is not None:
+            self.history.on_tile_loaded(key)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.plot is None:
+            # let the window paint first, the chart follows on the next event loop pass
+            QTimer.singleShot(0, self._show_chart)
+
+    def _show_chart(self):
+        if self.plot is not None:
+            return
+        self._build_plot(self.device.buffers[self.sensor_name] if self.device is not None else None)
+        self._attach_history()
+        self.plot.set_window(TIME_WINDOWS.get(self.window_combo.currentText(), 60))
+
+    def open_device(self, device):
+        """
+        Show `device` in this tab. The chart is built on top of the device's
+        own ring buffer, so only the open device pays for QChart objects
+        while every device keeps collecting samples. A tab that was never
+        shown builds no chart at all until it is.
+        """
+        if device is self.device:
+            return
+        self.device = device
+        for field, label in self.labels.items():
+            label.setText(f"{field}: --")
+        if self.plot is None:
+            return
+        if self.history is not None:
+            self.history.deleteLater()
+            self.history = None
+            self.live_button.setEnabled(False)
+        self.chart_layout.removeWidget(self.plot.chart_view)
+        self.plot.close()
+        self.plot = None
+        self._show_chart()
+
+    def _append(self, device, timestamp_ms, *values):
+        if device is None and self.plot is None:
+            self._show_chart()
+        if self.plot is not None and (device is None or device is self.device):
+            self.plot.append(*values, timestamp_ms=timestamp_ms)
+        else:
+            # closed device or chart not built yet: only the buffer is updated
+            if timestamp_ms is None:
+                timestamp_ms = time.time() * 1000
+            device.buffers[self.sensor_name].append(timestamp_ms, *values)
     
     def _init_chart(self):
+        from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
         self.chart = QChart()
         self.series_x = QLineSeries(name="X Axis")
         self.series_y = QLineSeries(name="Y Axis")
@@ -151,12 +283,9 @@ class SensorTab(QWidget):
         self.series_y.setColor(Qt.green)
         self.series_z.setColor(Qt.blue)
 
-    def update_gyro_chart(self, x, y, z):
-        self.main_window.logger.log("Gyroscope", "X", x)
-        self.main_window.logger.log("Gyroscope", "Y", y)
-        self.main_window.logger.log("Gyroscope", "Z", z)
-        if hasattr(self, "gyro_plot"):
-            self.gyro_plot.append(x, y, z)  # or self.gyro_plot.append([x, y, z])
+    def update_gyro_chart(self, x, y, z, device=None, timestamp_ms=None):
+        self.main_window.logger.log_sample("Gyroscope", {"X": x, "Y": y, "Z": z}, _device_id(device), timestamp_ms)
+        self._append(device, timestamp_ms, x, y, z)  # or self.gyro_plot.append([x, y, z])
             
 
         # self.sample_index += 1
@@ -180,8 +309,7 @@ class SensorTab(QWidget):
         #self.chart_view.repaint()
         #self.chart.update()
         
-        # check if warning threshold met
-        self.check_threshold(X=x, Y=y, Z=z)
+        # the threshold is checked by main_window.rules, for every device
         # if self.threshold_valid and self.threshold_input.text():                        
         #     try:
         #         local_vars = {
@@ -195,6 +323,7 @@ class SensorTab(QWidget):
         #         print("Gyro threshold evaluation error:", e)
 
     def _init_temp_humidity_chart(self):
+        from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
         self.temp_chart = QChart()
         self.temp_chart.setTitle("Temperature & Humidity Realtime Data")
 
@@ -243,12 +372,12 @@ class SensorTab(QWidget):
         self.humid_data = deque(maxlen=50)
         self.temp_sample_index = 0
     
-    def update_temp_humid_chart(self, temp, humid):        
+    def update_temp_humid_chart(self, temp, humid, device=None, timestamp_ms=None):
         
-        self.main_window.logger.log("Temperature & Humidity", "Temperature", temp)
-        self.main_window.logger.log("Temperature & Humidity", "Humidity", humid)
+        self.main_window.logger.log_sample("Temperature & Humidity", {"Temperature": temp, "Humidity": humid},
+                                           _device_id(device), timestamp_ms)
         
-        self.temp_humid_plot.append(temp, humid)
+        self._append(device, timestamp_ms, temp, humid)
 
         # self.temp_sample_index += 1                
         # self.temp_data.append(QPointF(self.temp_sample_index, temp))
@@ -260,8 +389,6 @@ class SensorTab(QWidget):
         # start = max(0, self.temp_sample_index - 50)
         # self.axis_x_temp.setRange(start, self.temp_sample_index)
         
-        self.check_threshold(T=temp, H=humid)
-        
         # if self.threshold_valid and self.threshold_input.text():                        
         #     try:
         #         local_vars = {"T": temp, "H": humid}
@@ -271,6 +398,7 @@ class SensorTab(QWidget):
         #         print("Evaluation error:", e)
     
     def _init_light_chart(self):
+        from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
         self.light_chart = QChart()
         self.light_chart.setTitle("Light Intensity Realtime Data")
 
@@ -300,10 +428,9 @@ class SensorTab(QWidget):
         self.light_data = deque(maxlen=50)
         self.light_index = 0
         
-    def update_light_chart(self, lux_value):
-        self.main_window.logger.log("Light", "L", lux_value)
-        if hasattr(self, "light_plot"):
-            self.light_plot.append(lux_value)
+    def update_light_chart(self, lux_value, device=None, timestamp_ms=None):
+        self.main_window.logger.log_sample("Light", {"L": lux_value}, _device_id(device), timestamp_ms)
+        self._append(device, timestamp_ms, lux_value)
                 
         # self.light_index += 1
         
@@ -316,8 +443,6 @@ class SensorTab(QWidget):
         # start = max(0, self.light_index - 50 + 1)
         # self.axis_x_light.setRange(start, self.light_index)
         
-        # warning threshold check        
-        self.check_threshold(L=lux_value)
         # if self.threshold_valid and self.threshold_input.text():                        
         #     try:
         #         local_vars = {
@@ -395,87 +520,50 @@ class SensorTab(QWidget):
     #     else:
     #         QMessageBox.warning(self, "Invalid Format", "Please enter a valid threshold format, e.g. T > 50 and H < 80")
 
+    def allowed_threshold_vars(self):
+        if self.sensor_name == "Temperature & Humidity":
+            return {"T", "H"}
+        elif self.sensor_name == "Gyroscope":
+            return {"X", "Y", "Z"}
+        elif self.sensor_name == "Light":
+            return {"L"}
+        return {"A", "B", "C"} # later extended branch
+
     def validate_threshold(self):
         text = self.threshold_input.text().strip()
         if not text:
             QMessageBox.warning(self, "Input Error", "Threshold expression cannot be empty.")
             return
 
-        if self.sensor_name == "Temperature & Humidity":
-            allowed_vars = {"T", "H"}
-        elif self.sensor_name == "Gyroscope":
-            allowed_vars = {"X", "Y", "Z"}
-        elif self.sensor_name == "Light":
-            allowed_vars = {"L"}
-        else:
-            allowed_vars = {"A", "B", "C"} # later extended branch
+        # compiled once into a rule, the engine evaluates it against every device; a rule
+        # still in place has this text (editing drops it) and keeps its alert state
+        rules = getattr(self.main_window, "rules", None)
+        try:
+            if rules is None:
+                compile_threshold(text, self.allowed_threshold_vars())
+            elif self.rule is None:
+                self.rule = rules.set_rule(self.sensor_name, text, allowed_vars=self.allowed_threshold_vars(),
+                                           breach_required=self.breach_required,
+                                           recovery_required=self.recovery_required)
+        except ThresholdError as e:
+            self._invalidate_threshold()
+            QMessageBox.warning(self, "Invalid Threshold", str(e))
+            return
 
-        # def tokenize_expression(expr):
-        #     token_pattern = r"[A-Za-z]+|>=|<=|==|!=|>|<|\d+(?:\.\d+)?|\(|\)|and|or"
-        #     return re.findall(token_pattern, expr)
-        
-        def tokenize_expression(expr):
-            # supports expressions that do not contain spaces
-            token_pattern = r"(>=|<=|==|!=|>|<)|([A-Za-z]+)|(\d+(?:\.\d+)?)|(\()|(\))|(and|or)"
-            # Flatten all groups and filter out empty entries
-            raw_tokens = re.findall(token_pattern, expr)
-            tokens = [item for group in raw_tokens for item in group if item]
-            return tokens
-
-        tokens = tokenize_expression(text)
-
-        valid = True
-        for token in tokens:
-            token = token.strip()
-            if token in {"and", "or", "(", ")"}:
-                continue
-            elif re.fullmatch(r"[A-Za-z]+", token):
-                if token not in allowed_vars:
-                    valid = False
-                    QMessageBox.warning(self, "Invalid Variable", f"Variable '{token}' is not allowed in this sensor.")
-                    break
-            elif re.fullmatch(r"[><=!]=?", token):
-                continue
-            elif re.fullmatch(r"\d+(\.\d+)?", token):
-                continue
-            else:
-                valid = False
-                QMessageBox.warning(self, "Invalid Token", f"Token '{token}' is invalid.")
-                break
-        
-        self.threshold_valid = valid
+        self.threshold_valid = True
+        self.alert_enabled_checkbox.setChecked(True)
+
+    def _invalidate_threshold(self, _text=None):
+        if self.rule is not None:
+            self.main_window.rules.remove_rule(self.rule.name)
+            self.rule = None
+        self.threshold_valid = False
+
+    def _on_alerts_toggled(self, checked):
+        self.alerts_enabled = checked
+        if self.rule is not None:
+            self.main_window.rules.enable(self.rule.name, checked)
 
-        if valid:
-            # QMessageBox.information(self, "Threshold Set", "Threshold format is valid.")
-            self.alert_enabled_checkbox.setChecked(True)
-            
-    def check_threshold(self, **sensor_vars):
-        if self.alert_enabled_checkbox.isChecked() and self.threshold_valid:
-            try:
-                expr = self.threshold_input.text().strip()
-                if not expr:
-                    return
-                if eval(expr, {}, sensor_vars):
-                    self.threshold_breach_count += 1
-                    self.recovery_count = 0
-                    if self.threshold_breach_count >= self.breach_required and not self.alert_active:
-                        if self.main_window:
-                            self.alert_active = True
-                            self.main_window.trigger_alert(f"{self.sensor_name} exceeds threshold!")
-                else:
-                    self.threshold_breach_count = 0
-                    if self.alert_active:
-                        self.recovery_count += 1
-                        if self.recovery_count >= self.recovery_required:
-                            self.alert_active = False
-                            self.main_window.clear_alert()
-                            print(f"{self.sensor_name} recovered. Alert cleared.")
-                                                    
-            except Exception as e:
-                print(f"[ALERT] Evaluation error in {self.sensor_name}:", e)
-        else:
-            return  
-                  
     def apply_tab_config(self, config):
         """
         Apply alarm settings from config dict.
@@ -489,9 +577,17 @@ class SensorTab(QWidget):
         threshold_expr = config.get("threshold", "")
         if hasattr(self, 'threshold_input') and isinstance(self.threshold_input, QLineEdit):
             self.threshold_input.setText(str(threshold_expr))
-    
+        self.window_combo.setCurrentText(config.get("window", "1 min"))
+
+    def set_time_window(self, label):
+        if self.plot is not None and label in TIME_WINDOWS:
+            if self.history is not None:
+                self.history.go_live()
+            self.plot.set_window(TIME_WINDOWS[label])
+
     def get_tab_config(self):
         return {
             "threshold": self.threshold_input.text().strip(),
-            "enabled": self.alert_enabled_checkbox.isChecked()
+            "enabled": self.alert_enabled_checkbox.isChecked(),
+            "window": self.window_combo.currentText()
         }
@@ -0,0 +1,183 @@
+"""
+Binary columnar sensor log (.slog).
+
+The file is a sequence of fixed 24-byte slots, so it can be memory-mapped
+and indexed directly. Slot 0 of every block of BLOCK_SLOTS slots is a header,
+the rest are sample records:
+
+    header  <4sHHqQ  magic, version, record size, created epoch ns, block number
+    record  <qHH3f   epoch ns, sensor id, field count | device slot << 4,
+                     up to three float32 values
+
+One record holds one complete sample (all axes of the gyro, temperature and
+humidity together), mirroring SensorData_t on the A7 side. Files are only
+ever appended to; a torn trailing record is dropped on the next open.
+
+Device IDs are stored once per segment in a <segment>.devices sidecar that
+maps slot numbers to IDs; slot 0 marks a sample without a device.
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+
+MAGIC = b"SLG1"
+VERSION = 2  # 2: device slot in the upper bits of the field count
+RECORD = struct.Struct("<qHH3f")
+HEADER = struct.Struct("<4sHHqQ")
+SLOT_SIZE = RECORD.size
+BLOCK_SLOTS = 4096  # one header + 4095 records, 96 KiB per block (page aligned)
+COUNT_BITS = 4
+MAX_DEVICE_SLOT = 0xFFFF >> COUNT_BITS
+DEVICES_SUFFIX = ".devices"
+
+# sensor id -> (sensor name, field names in record order)
+SENSORS = {
+    1: ("Gyroscope", ("X", "Y", "Z")),
+    2: ("Temperature & Humidity", ("Temperature", "Humidity")),
+    3: ("Light", ("L",)),
+}
+SENSOR_IDS = {name: (sensor_id, fields) for sensor_id, (name, fields) in SENSORS.items()}
+
+# rows from before multi-device support have no device column
+CSV_HEADER = "timestamp,sensor,field,value,device\n"
+CSV_HEADER_NO_DEVICE = "timestamp,sensor,field,value\n"
+CSV_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+assert HEADER.size == SLOT_SIZE
+
+
+def pack_record(timestamp_ns, sensor_name, values, device_slot=0):
+    """Pack one sample; `values` maps field name -> float, missing fields are stored as NaN."""
+    sensor_id, fields = SENSOR_IDS[sensor_name]
+    packed = [float(values.get(f, math.nan)) for f in fields]
+    packed += [math.nan] * (3 - len(packed))
+    return RECORD.pack(timestamp_ns, sensor_id, len(fields) | device_slot << COUNT_BITS, *packed)
+
+
+def split_count(count_field):
+    """(field count, device slot) of a record's count field."""
+    return count_field & ((1 << COUNT_BITS) - 1), count_field >> COUNT_BITS
+
+
+def load_devices(path):
+    """Slot -> device ID map of a segment, empty when it has no sidecar."""
+    try:
+        with open(path + DEVICES_SUFFIX, "r", encoding="utf-8") as f:
+            return {int(slot): device for slot, device in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_devices(path, devices):
+    tmp = path + DEVICES_SUFFIX + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({str(slot): device for slot, device in devices.items()}, f)
+    os.replace(tmp, path + DEVICES_SUFFIX)
+
+
+def pack_header(block_number, created_ns=None):
+    if created_ns is None:
+        created_ns = time.time_ns()
+    return HEADER.pack(MAGIC, VERSION, SLOT_SIZE, created_ns, block_number)
+
+
+def append_records(f, records):
+    """
+    Append packed records to a file opened in "r+b"/"a+b" mode, inserting a
+    header at every block boundary. Returns the number of bytes written.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if size % SLOT_SIZE:
+        # torn write from a previous crash, drop the partial slot
+        size -= size % SLOT_SIZE
+        f.truncate(size)
+        f.seek(size)
+
+    slot = size // SLOT_SIZE
+    chunks = []
+    for record in records:
+        if slot % BLOCK_SLOTS == 0:
+            chunks.append(pack_header(slot // BLOCK_SLOTS))
+            slot += 1
+        chunks.append(record)
+        slot += 1
+    data = b"".join(chunks)
+    f.write(data)
+    return len(data)
+
+
+def record_offset(index):
+    """Byte offset of the index-th sample record, skipping the block headers."""
+    slot = index + index // (BLOCK_SLOTS - 1) + 1
+    return slot * SLOT_SIZE
+
+
+def record_count(file_size):
+    slots = file_size // SLOT_SIZE
+    blocks = -(-slots // BLOCK_SLOTS)
+    return slots - blocks
+
+
+def iter_records(path):
+    """Yield (timestamp_ns, sensor_name, {field: value}, device) for every record in a .slog file."""
+    devices = load_devices(path)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        size -= size % SLOT_SIZE
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            block_bytes = BLOCK_SLOTS * SLOT_SIZE
+            for block_start in range(0, size, block_bytes):
+                # copy one block at a time so no buffer export outlives the mapping
+                block = mm[block_start:min(block_start + block_bytes, size)]
+                if block[:4] != MAGIC:
+                    raise ValueError(f"Corrupt sensor log {path}: bad header at byte {block_start}")
+                for ts, sensor_id, count, *values in RECORD.iter_unpack(block[SLOT_SIZE:]):
+                    name, fields = SENSORS[sensor_id]
+                    count, slot = split_count(count)
+                    yield ts, name, dict(zip(fields[:count], values)), devices.get(slot, "")
+
+
+def convert_to_csv(src_path, dst_path, device=True):
+    """
+    Write a .slog file out in the CSV layout SensorLogger writes,
+    timestamp,sensor,field,value,device (device empty for untagged samples).
+    device=False leaves the device column out, giving the
+    timestamp,sensor,field,value layout of logs from before multi-device
+    support. Returns the row count.
+    """
+    rows = 0
+    last_second = None
+    stamp = ""
+    with open(dst_path, "w", newline="", encoding="utf-8") as out:
+        out.write(CSV_HEADER if device else CSV_HEADER_NO_DEVICE)
+        for ts, sensor, values, tag in iter_records(src_path):
+            end = f",{tag}\n" if device else "\n"
+            second = ts // 1_000_000_000
+            if second != last_second:
+                stamp = datetime.fromtimestamp(second).strftime(CSV_TIME_FORMAT)
+                last_second = second
+            for field, value in values.items():
+                if not math.isnan(value):
+                    out.write(f"{stamp},{sensor},{field},{value:.7g}{end}")
+                    rows += 1
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a binary sensor log (.slog) to CSV.")
+    parser.add_argument("src", help="input .slog file")
+    parser.add_argument("dst", nargs="?", help="output .csv file (default: next to the input)")
+    parser.add_argument("--no-device", action="store_true",
+                        help="leave out the device column (timestamp,sensor,field,value)")
+    args = parser.parse_args()
+    dst = args.dst or os.path.splitext(args.src)[0] + ".csv"
+    count = convert_to_csv(args.src, dst, device=not args.no_device)
+    print(f"✅ Wrote {count} rows to {dst}")
@@ -0,0 +1,369 @@
+"""
+Streaming statistics per sensor field.
+
+Every field of a device keeps a WindowStats per window length in use, and
+an Ewma per time constant in use. Both are updated in O(1) amortized time
+per sample: each sample enters a window once and leaves it once. Memory
+is bounded by the samples inside the windows, capped at max_samples per
+window, plus a DDSketch whose size depends on the range of values, not
+on how many were seen.
+
+A statistic is addressed as (function, sample key, seconds), the form
+threshold expressions compile their window functions to; references to
+the same field and window share one WindowStats.
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+# function -> how it reads a WindowStats, or an Ewma for "ewma"
+WINDOW_FUNCTIONS = {
+    "mean": lambda w: w.mean(),
+    "avg": lambda w: w.mean(),
+    "rms": lambda w: w.rms(),
+    "stddev": lambda w: w.stddev(),
+    "min": lambda w: w.min(),
+    "max": lambda w: w.max(),
+    "p50": lambda w: w.quantile(0.50),
+    "p95": lambda w: w.quantile(0.95),
+    "p99": lambda w: w.quantile(0.99),
+    "sps": lambda w: w.samples_per_sec(),
+    "rate": lambda w: w.slope(),
+}
+FUNCTIONS = tuple(WINDOW_FUNCTIONS) + ("ewma",)
+
+NAN = float("nan")
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative error bounded by relative_accuracy
+    (Masson, Rim, Lee: "DDSketch", VLDB 2019). Values are counted in
+    logarithmic buckets; a bucket index only depends on the value, so a
+    value can be taken out again when it leaves a window. Values closer to
+    zero than min_value count as zero.
+    """
+    __slots__ = ("_log_gamma", "_gamma", "min_value", "_pos", "_neg", "_zero", "count")
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.min_value = min_value
+        self._pos = {}
+        self._neg = {}
+        self._zero = 0
+        self.count = 0
+
+    def _store(self, value):
+        if value > self.min_value:
+            return self._pos, math.ceil(math.log(value) / self._log_gamma)
+        if value < -self.min_value:
+            return self._neg, math.ceil(math.log(-value) / self._log_gamma)
+        return None, 0
+
+    def add(self, value):
+        bins, key = self._store(value)
+        if bins is None:
+            self._zero += 1
+        else:
+            bins[key] = bins.get(key, 0) + 1
+        self.count += 1
+
+    def remove(self, value):
+        bins, key = self._store(value)
+        if bins is None:
+            self._zero -= 1
+        else:
+            left = bins[key] - 1
+            if left:
+                bins[key] = left
+            else:
+                del bins[key]
+        self.count -= 1
+
+    def quantile(self, q):
+        if not self.count:
+            return NAN
+        rank = q * (self.count - 1)
+        seen = 0
+        # most negative first: the largest magnitude bucket of the negative store
+        for key in sorted(self._neg, reverse=True):
+            seen += self._neg[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._pos):
+            seen += self._pos[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self._pos)) if self._pos else 0.0
+
+    def _value(self, key):
+        # midpoint of the bucket (gamma^(key-1), gamma^key] in relative terms
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def bins(self):
+        return len(self._pos) + len(self._neg) + 1
+
+
+class WindowStats:
+    """
+    Statistics over the samples of the last `span` seconds: Welford mean and
+    variance with removal, min and max from monotonic deques, a DDSketch
+    for quantiles, the sample rate, and the least-squares slope of value
+    over time kept the same way as the variance (co-moment of time and
+    value), so rate() is as cheap as mean() and does not hinge on the two
+    samples at the window's ends.
+
+    Times enter the sums relative to an origin inside the window, not as
+    epoch seconds, and the sums are recomputed from the window's samples
+    every few turnovers of the window, so the rounding of the running
+    updates cannot pile up over a long session.
+    """
+    __slots__ = ("span", "max_samples", "_samples", "_first_seq", "_next_seq", "_min", "_max",
+                 "sketch", "n", "_mean", "_m2", "_mean_t", "_m2_t", "_c_tx", "_started", "_origin",
+                 "_removed")
+
+    def __init__(self, span, relative_accuracy=0.01, max_samples=100000):
+        self.span = span
+        self.max_samples = max_samples
+        self._samples = deque()  # (time, value), oldest first
+        self._first_seq = 0      # sequence number of _samples[0]
+        self._next_seq = 0
+        self._min = deque()      # (seq, value), values increasing
+        self._max = deque()      # (seq, value), values decreasing
+        self.sketch = DDSketch(relative_accuracy)
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._mean_t = 0.0
+        self._m2_t = 0.0
+        self._c_tx = 0.0
+        self._started = None
+        self._origin = None  # time the sums measure from
+        self._removed = 0    # samples dropped since the sums were last recomputed
+
+    def add(self, t, x):
+        if self._started is None:
+            self._started = t
+        if self._origin is None:
+            self._origin = t
+        seq = self._next_seq
+        self._next_seq += 1
+        self._samples.append((t, x))
+        self.n += 1
+        delta = x - self._mean
+        self._mean += delta / self.n
+        self._m2 += delta * (x - self._mean)
+        s = t - self._origin
+        delta_t = s - self._mean_t
+        self._mean_t += delta_t / self.n
+        self._m2_t += delta_t * (s - self._mean_t)
+        self._c_tx += delta_t * (x - self._mean)
+
+        low = self._min
+        while low and low[-1][1] >= x:
+            low.pop()
+        low.append((seq, x))
+        high = self._max
+        while high and high[-1][1] <= x:
+            high.pop()
+        high.append((seq, x))
+        self.sketch.add(x)
+
+        cutoff = t - self.span
+        samples = self._samples
+        while samples and (samples[0][0] <= cutoff or self.n > self.max_samples):
+            self._drop_oldest()
+        if self._removed > 4 * self.n + 256:
+            self._recompute()
+
+    def _drop_oldest(self):
+        t, x = self._samples.popleft()
+        seq = self._first_seq
+        self._first_seq += 1
+        if self._min[0][0] == seq:
+            self._min.popleft()
+        if self._max[0][0] == seq:
+            self._max.popleft()
+        self.sketch.remove(x)
+        self.n -= 1
+        self._removed += 1
+        if self.n:
+            # Welford's updates run backwards
+            delta = x - self._mean
+            self._mean -= delta / self.n
+            self._m2 = max(0.0, self._m2 - delta * (x - self._mean))
+            s = t - self._origin
+            delta_t = s - self._mean_t
+            self._mean_t -= delta_t / self.n
+            self._m2_t = max(0.0, self._m2_t - delta_t * (s - self._mean_t))
+            self._c_tx -= delta_t * (x - self._mean)
+        else:
+            self._mean = self._m2 = 0.0
+            self._mean_t = self._m2_t = self._c_tx = 0.0
+            self._origin = None
+            self._removed = 0
+
+    def _recompute(self):
+        """Rebuild the sums from the samples in the window, measuring time from the oldest one."""
+        data = np.array(self._samples, dtype=float)
+        self._origin = float(data[0, 0])
+        t = data[:, 0] - self._origin
+        x = data[:, 1]
+        self._mean = float(x.mean())
+        dx = x - self._mean
+        self._m2 = float(dx @ dx)
+        self._mean_t = float(t.mean())
+        dt = t - self._mean_t
+        self._m2_t = float(dt @ dt)
+        self._c_tx = float(dt @ dx)
+        self._removed = 0
+
+    def mean(self):
+        return self._mean if self.n else NAN
+
+    def variance(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else NAN
+
+    def stddev(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else NAN
+
+    def rms(self):
+        # mean of squares = mean^2 + population variance
+        return math.sqrt(self._mean * self._mean + self._m2 / self.n) if self.n else NAN
+
+    def slope(self):
+        """Change of the value per second, least-squares fit over the window."""
+        return self._c_tx / self._m2_t if self.n > 1 and self._m2_t > 0 else NAN
+
+    def min(self):
+        return self._min[0][1] if self._min else NAN
+
+    def max(self):
+        return self._max[0][1] if self._max else NAN
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def samples_per_sec(self):
+        if not self.n:
+            return 0.0
+        elapsed = min(self.span, self._samples[-1][0] - self._started)
+        return self.n / elapsed if elapsed > 0 else NAN
+
+    def nbytes(self):
+        # deque entries and tuples, roughly; the sketch is a couple of dicts of small ints
+        return (len(self._samples) + len(self._min) + len(self._max)) * 72 + self.sketch.bins() * 100
+
+
+class Ewma:
+    """Exponentially weighted moving average with a time constant, for irregular sample spacing."""
+    __slots__ = ("tau", "value", "_last_t")
+
+    def __init__(self, tau):
+        self.tau = tau
+        self.value = NAN
+        self._last_t = None
+
+    def add(self, t, x):
+        if self._last_t is None:
+            self.value = x
+        else:
+            alpha = 1.0 - math.exp(-max(0.0, t - self._last_t) / self.tau) if self.tau > 0 else 1.0
+            self.value += alpha * (x - self.value)
+        self._last_t = t
+
+
+class FieldStats:
+    """The windows and averages kept for one field of one device."""
+    __slots__ = ("windows", "ewmas", "relative_accuracy", "max_samples")
+
+    def __init__(self, relative_accuracy=0.01, max_samples=100000):
+        self.windows = {}  # seconds -> WindowStats
+        self.ewmas = {}    # seconds -> Ewma
+        self.relative_accuracy = relative_accuracy
+        self.max_samples = max_samples
+
+    def add(self, t, x):
+        for window in self.windows.values():
+            window.add(t, x)
+        for ewma in self.ewmas.values():
+            ewma.add(t, x)
+
+    def value(self, func, secs):
+        if func == "ewma":
+            ewma = self.ewmas.get(secs)
+            return ewma.value if ewma is not None else NAN
+        window = self.windows.get(secs)
+        return WINDOW_FUNCTIONS[func](window) if window is not None else NAN
+
+    def configure(self, window_secs, ewma_secs):
+        """Keep exactly these windows and averages, new ones start empty."""
+        for secs in set(self.windows) - window_secs:
+            del self.windows[secs]
+        for secs in window_secs - set(self.windows):
+            self.windows[secs] = WindowStats(secs, self.relative_accuracy, self.max_samples)
+        for secs in set(self.ewmas) - ewma_secs:
+            del self.ewmas[secs]
+        for secs in ewma_secs - set(self.ewmas):
+            self.ewmas[secs] = Ewma(secs)
+
+
+class DeviceStats:
+    """
+    FieldStats for each sample key of a device. configure() decides which
+    windows exist, update() feeds a batch of samples through them.
+    """
+    def __init__(self, keys, relative_accuracy=0.01, max_samples=100000):
+        self.fields = {key: FieldStats(relative_accuracy, max_samples) for key in keys}
+        self._refs = None
+
+    def configure(self, refs):
+        """refs: (function, key, seconds) statistics that have to be available."""
+        refs = frozenset(refs)
+        if refs == self._refs:
+            return
+        self._refs = refs
+        for key, field in self.fields.items():
+            field.configure({secs for func, k, secs in refs if k == key and func != "ewma"},
+                            {secs for func, k, secs in refs if k == key and func == "ewma"})
+
+    def update(self, samples, collect=()):
+        """
+        Add samples (dicts with "time_ms" and the field keys) in order. For
+        every (function, key, seconds) in `collect`, returns the value after
+        each sample that carried the key, as a NumPy array, so a block of
+        samples can be checked against window functions exactly as one
+        sample at a time would be.
+        """
+        out = {}
+        for key, field in self.fields.items():
+            refs = [ref for ref in collect if ref[1] == key]
+            if not refs:
+                for sample in samples:
+                    x = sample[key]
+                    if x is not None:
+                        field.add(sample["time_ms"] / 1000.0, x)
+                continue
+            values = {ref: [] for ref in refs}
+            for sample in samples:
+                x = sample[key]
+                if x is None:
+                    continue
+                field.add(sample["time_ms"] / 1000.0, x)
+                for ref in refs:
+                    values[ref].append(field.value(ref[0], ref[2]))
+            for ref, series in values.items():
+                out[ref] = np.array(series, dtype=float)
+        return out
+
+    def value(self, func, key, secs):
+        field = self.fields.get(key)
+        return field.value(func, secs) if field is not None else NAN
+
+    def nbytes(self):
+        return sum(window.nbytes() for field in self.fields.values() for window in field.windows.values())
@@ -0,0 +1,29 @@
+import math
+
+import numpy as np
+import pytest
+
+from stream_stats import WindowStats
+
+
+def test_slope_matches_polyfit_over_a_long_run():
+    # a 1 s window at 100 Hz on epoch timestamps, close to three hours of samples
+    window = WindowStats(1.0)
+    t0 = 1.7e9
+    for i in range(1, 1_000_001):
+        window.add(t0 + i / 100, math.sin(i / 50.0) + 0.001 * i)
+        if i % 100_000 == 0:
+            t = np.array([s[0] for s in window._samples]) - t0
+            x = np.array([s[1] for s in window._samples])
+            assert window.slope() == pytest.approx(np.polyfit(t, x, 1)[0], rel=1e-9)
+            assert window.mean() == pytest.approx(x.mean(), rel=1e-12)
+            assert window.stddev() == pytest.approx(x.std(ddof=1), rel=1e-9)
+
+
+def test_sums_restart_when_the_window_empties():
+    window = WindowStats(1.0)
+    for t, x in ((1.7e9, 1.0), (1.7e9 + 0.5, 2.0), (1.7e9 + 10, 5.0), (1.7e9 + 10.5, 4.0)):
+        window.add(t, x)
+    assert window.n == 2
+    assert window.slope() == pytest.approx(-2.0)
+    assert window.mean() == pytest.approx(4.5)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from threshold_expr import apply_hysteresis, compile_threshold, compile_threshold_batch
+
+VALUES = {
+    "X": np.array([2.0, 0.0, -3.0, 5.0, 0.0, np.nan, 1.5, -0.0]),
+    "Y": np.array([0.0, 0.0, 0.0, 2.0, -1.0, 0.0, -0.0, 0.0]),
+    "Z": np.array([1.0, 4.0, -2.0, 0.5, 0.0, 3.0, 2.0, 1.0]),
+}
+
+
+def scalar_mask(text):
+    predicate = compile_threshold(text, "XYZ")
+    n = len(VALUES["X"])
+    return np.array([predicate({k: float(v[i]) for k, v in VALUES.items()}) for i in range(n)])
+
+
+@pytest.mark.parametrize("text", [
+    "X / Y > 1",
+    "X / Y < 1",
+    "X / Y != X / Y",
+    "not X / Y <= 0",
+    "(X + Z) / (Y - Y) > 0 or Z > 3",
+    "Z / 0 > 1",
+    "0 / 0 == 0",
+    "X > 1 and 1 < 2",
+    "1 > 2 or Z > 1",
+    "not 1 > 2 and X < Z",
+    "X < Y < Z",
+])
+def test_scalar_and_batch_masks_agree(text):
+    batch = compile_threshold_batch(text, "XYZ")(VALUES)
+    np.testing.assert_array_equal(batch, scalar_mask(text))
+
+
+def test_hysteresis_over_batch_matches_per_sample_steps():
+    mask = compile_threshold_batch("X / Y > 1 or Z > 3", "XYZ")(VALUES)
+    steps = scalar_mask("X / Y > 1 or Z > 3")
+    breach = recovery = 0
+    active = False
+    events = []
+    for i, breached in enumerate(steps):
+        if breached:
+            breach, recovery = breach + 1, 0
+            if breach >= 2 and not active:
+                active = True
+                events.append((i, "trigger"))
+        else:
+            breach = 0
+            if active:
+                recovery += 1
+                if recovery >= 2:
+                    active = False
+                    events.append((i, "clear"))
+    assert apply_hysteresis(mask, 0, 0, False, 2, 2) == (breach, recovery, active, events)
@@ -0,0 +1,248 @@
+import ast
+import math
+import operator
+import re
+from functools import reduce
+
+import numpy as np
+
+from stream_stats import FUNCTIONS
+
+
+class ThresholdError(ValueError):
+    """Raised when a threshold expression is malformed or uses something that is not allowed."""
+
+
+_COMPARE_OPS = {
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+
+def _divide(a, b):
+    """
+    Division as NumPy does it, so both predicate forms agree on every
+    sample: x / 0 is +-inf and 0 / 0 is NaN instead of ZeroDivisionError.
+    """
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != 0 and a == a:
+            return math.copysign(math.inf, a) * math.copysign(1.0, b)
+        return math.nan
+
+
+def _divide_arrays(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.true_divide(a, b)
+
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: _divide,
+}
+_VECTOR_BINARY_OPS = {**_BINARY_OPS, ast.Div: _divide_arrays}
+
+# window lengths such as 500ms, 10s, 1.5m, 1h; rewritten to seconds before parsing
+_DURATION = re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(ms|s|m|h)\b")
+_UNIT_SECS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def compile_threshold(text, allowed_vars):
+    """
+    Compile a threshold expression such as "T > 50 and H > 80" into a
+    predicate `predicate(values) -> bool`, where values maps variable names
+    to floats. The expression is parsed once; only comparisons, and/or/not,
+    + - * /, numbers, the given variables and window functions such as
+    mean(X, 10s) are accepted, so nothing in the text can reach Python
+    builtins the way eval() could.
+
+    predicate.windows maps the name each window function is looked up under
+    in `values` to its (function, variable, seconds); the caller supplies
+    those values from stream_stats. predicate.variables is the set of
+    variables the expression reads directly.
+    """
+    windows = {}
+    variables = set()
+    body = _build(_parse(text), set(allowed_vars), vector=False, windows=windows, variables=variables)
+
+    def predicate(values):
+        return bool(body(values))
+    predicate.windows = windows
+    predicate.variables = variables
+    return predicate
+
+
+def compile_threshold_batch(text, allowed_vars):
+    """
+    Vectorized form of compile_threshold: the returned function takes a dict
+    of equally long NumPy arrays and returns a boolean mask with one entry
+    per sample, computed in a single pass over the block.
+    """
+    windows = {}
+    variables = set()
+    predicate = _build(_parse(text), set(allowed_vars), vector=True, windows=windows, variables=variables)
+
+    def mask(arrays):
+        length = len(next(iter(arrays.values()))) if arrays else 0
+        return np.broadcast_to(np.asarray(predicate(arrays), dtype=bool), (length,))
+    mask.windows = windows
+    mask.variables = variables
+    return mask
+
+
+def window_name(func, var, secs):
+    """Key a window function's value is looked up under, e.g. "mean(X,10s)"."""
+    return f"{func}({var},{secs:g}s)"
+
+
+def apply_hysteresis(mask, breach_count, recovery_count, active,
+                     breach_required, recovery_required, can_activate=True):
+    """
+    Run the breach/recovery counters of an alert rule over a boolean mask with
+    run-length logic instead of one step per sample. Returns the final
+    (breach_count, recovery_count, active) plus a list of (index, event)
+    transitions, event being "trigger" or "clear", exactly as the
+    per-sample path would have produced them.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    events = []
+    if mask.size == 0:
+        return breach_count, recovery_count, active, events
+
+    edges = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    starts = [0] + edges.tolist()
+    ends = edges.tolist() + [mask.size]
+    breached = bool(mask[0])
+    for start, end in zip(starts, ends):
+        length = end - start
+        if breached:
+            if not active and can_activate and breach_count + length >= breach_required:
+                events.append((start + max(0, breach_required - breach_count - 1), "trigger"))
+                active = True
+            breach_count += length
+            recovery_count = 0
+        else:
+            breach_count = 0
+            if active:
+                needed = max(1, recovery_required - recovery_count)
+                if length >= needed:
+                    events.append((start + needed - 1, "clear"))
+                    recovery_count += needed
+                    active = False
+                else:
+                    recovery_count += length
+        breached = not breached
+    return breach_count, recovery_count, active, events
+
+
+def _parse(text):
+    text = (text or "").strip()
+    if not text:
+        raise ThresholdError("Threshold expression cannot be empty.")
+    text = _DURATION.sub(lambda m: repr(float(m.group(1)) * _UNIT_SECS[m.group(2)]), text)
+    try:
+        return ast.parse(text, mode="eval").body
+    except SyntaxError as e:
+        raise ThresholdError(f"Invalid expression near '{e.text.strip() if e.text else text}'.") from None
+
+
+def _build(node, allowed_vars, vector, windows, variables):
+    if isinstance(node, ast.BoolOp):
+        parts = [_build(v, allowed_vars, vector, windows, variables) for v in node.values]
+        if vector:
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            # an operand can be a plain bool, e.g. a comparison of two constants
+            return lambda values: reduce(combine, [p(values) for p in parts])
+        if isinstance(node.op, ast.And):
+            return lambda values: all(p(values) for p in parts)
+        return lambda values: any(p(values) for p in parts)
+
+    if isinstance(node, ast.Compare):
+        left = _build(node.left, allowed_vars, vector, windows, variables)
+        ops = []
+        for op, right in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE_OPS:
+                raise ThresholdError(f"Operator '{type(op).__name__}' is not allowed.")
+            ops.append((_COMPARE_OPS[type(op)], _build(right, allowed_vars, vector, windows, variables)))
+        if len(ops) == 1:
+            fn, right = ops[0]
+            return lambda values: fn(left(values), right(values))
+
+        if vector:
+            def chained_vector(values):
+                lhs = left(values)
+                result = True
+                for fn, right in ops:
+                    rhs = right(values)
+                    result = np.logical_and(result, fn(lhs, rhs))
+                    lhs = rhs
+                return result
+            return chained_vector
+
+        def chained(values):
+            lhs = left(values)
+            for fn, right in ops:
+                rhs = right(values)
+                if not fn(lhs, rhs):
+                    return False
+                lhs = rhs
+            return True
+        return chained
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _build(node.operand, allowed_vars, vector, windows, variables)
+        if isinstance(node.op, ast.Not):
+            if vector:
+                return lambda values: np.logical_not(operand(values))
+            return lambda values: not operand(values)
+        if isinstance(node.op, ast.USub):
+            return lambda values: -operand(values)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        fn = (_VECTOR_BINARY_OPS if vector else _BINARY_OPS)[type(node.op)]
+        left = _build(node.left, allowed_vars, vector, windows, variables)
+        right = _build(node.right, allowed_vars, vector, windows, variables)
+        return lambda values: fn(left(values), right(values))
+
+    if isinstance(node, ast.Call):
+        ref = _window_call(node, allowed_vars)
+        name = window_name(*ref)
+        windows[name] = ref
+        return lambda values: values[name]
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name not in allowed_vars:
+            raise ThresholdError(f"Variable '{name}' is not allowed in this sensor.")
+        variables.add(name)
+        return lambda values: values[name]
+
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        constant = node.value
+        return lambda values: constant
+
+    raise ThresholdError(f"Token '{ast.unparse(node)}' is invalid.")
+
+
+def _window_call(node, allowed_vars):
+    """(function, variable, seconds) of a call such as mean(X, 10s)."""
+    func = node.func.id if isinstance(node.func, ast.Name) else ast.unparse(node.func)
+    if func not in FUNCTIONS:
+        raise ThresholdError(f"Function '{func}' is not allowed, use one of: {', '.join(FUNCTIONS)}.")
+    if node.keywords or len(node.args) != 2:
+        raise ThresholdError(f"{func}() takes a variable and a window, e.g. {func}(X, 10s).")
+    var, span = node.args
+    if not isinstance(var, ast.Name) or var.id not in allowed_vars:
+        raise ThresholdError(f"First argument of {func}() must be one of: {', '.join(sorted(allowed_vars))}.")
+    if not (isinstance(span, ast.Constant) and type(span.value) in (int, float) and span.value > 0):
+        raise ThresholdError(f"Window of {func}() must be a positive duration such as 10s or 1m.")
+    return func, var.id, float(span.value)
@@ -0,0 +1,143 @@
+import itertools
+import queue
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from log_query import ROLLUP_LEVELS
+
+# seconds per bucket at each resolution level, finest first
+LEVELS = (1, 60, 3600)
+# buckets per tile: a tile spans 10 min, 10 h or 25 days depending on the level
+TILE_BUCKETS = 600
+# tiles that reach into the last few seconds are still filling up, reload them after this
+OPEN_TILE_TTL = 5.0
+
+
+def pick_level(span_secs, pixels):
+    """Finest level that needs no more than one bucket per pixel for the given span."""
+    wanted = span_secs / max(1, pixels)
+    for level in LEVELS:
+        if level >= wanted:
+            return level
+    return LEVELS[-1]
+
+
+def tile_span(level):
+    return level * TILE_BUCKETS
+
+
+def tiles_for_range(level, start, end):
+    """Tile indices of one level covering [start, end] (epoch seconds)."""
+    span = tile_span(level)
+    return range(int(start // span), int(end // span) + 1)
+
+
+class Tile:
+    """min/max/mean of one sensor field per bucket, stored as flat arrays."""
+    __slots__ = ("key", "times", "mins", "maxs", "means", "loaded_at", "complete")
+
+    def __init__(self, key, rows, complete):
+        self.key = key
+        self.times = array("d", (r[0] for r in rows))
+        self.mins = array("d", (r[1] for r in rows))
+        self.maxs = array("d", (r[2] for r in rows))
+        self.means = array("d", (r[3] for r in rows))
+        self.loaded_at = time.monotonic()
+        self.complete = complete
+
+    def nbytes(self):
+        return 4 * 8 * len(self.times) + 128
+
+    def expired(self):
+        return not self.complete and time.monotonic() - self.loaded_at > OPEN_TILE_TTL
+
+
+class TileCache:
+    """
+    LRU cache of multi-resolution history tiles with a memory cap. Missing
+    tiles are loaded from a LogStore on a background thread; `on_loaded(key)`
+    is called from that thread once a requested tile is available.
+    Keys are (device, sensor, field, level, tile_index).
+    """
+    def __init__(self, store, max_bytes=64 * 1024 * 1024, on_loaded=None):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.on_loaded = on_loaded
+        self._tiles = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._requests = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._in_flight = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._loader = threading.Thread(target=self._run, name="HistoryTileLoader", daemon=True)
+        self._loader.start()
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None and not tile.expired():
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return tile
+        self.misses += 1
+        return None
+
+    def request(self, keys, urgent=True):
+        """Queue tiles for loading; urgent ones (currently visible) go ahead of prefetches."""
+        for key in keys:
+            with self._lock:
+                tile = self._tiles.get(key)
+                if (tile is not None and not tile.expired()) or key in self._in_flight:
+                    continue
+                self._in_flight.add(key)
+            self._requests.put((0 if urgent else 1, next(self._order), key))
+
+    def memory_used(self):
+        return self._bytes
+
+    def stop(self):
+        self._requests.put((-1, next(self._order), None))
+
+    def _run(self):
+        while True:
+            _, _, key = self._requests.get()
+            if key is None:
+                return
+            try:
+                tile = self._load(key)
+            except Exception as e:
+                print(f"[History] Failed to load tile {key}: {e}")
+                tile = None
+            with self._lock:
+                self._in_flight.discard(key)
+                if tile is not None:
+                    self._insert(key, tile)
+            if tile is not None and self.on_loaded:
+                self.on_loaded(key)
+
+    def _load(self, key):
+        device, sensor, field, level, index = key
+        start = index * tile_span(level)
+        end = start + tile_span(level)
+        if level in ROLLUP_LEVELS:
+            # precomputed while indexing, a coarse tile never re-reads raw rows
+            rows = self.store.query_rollup(sensor, field, start, end, level, device=device or None)
+        else:
+            rows = self.store.query(sensor, field, start, end, buckets=TILE_BUCKETS, device=device or None)
+        return Tile(key, rows, complete=end < time.time() - OPEN_TILE_TTL)
+
+    def _insert(self, key, tile):
+        old = self._tiles.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes()
+        self._tiles[key] = tile
+        self._bytes += tile.nbytes()
+        while self._bytes > self.max_bytes and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self._bytes -= evicted.nbytes()
+            self.evictions += 1
@@ -0,0 +1,111 @@
+import time
+
+from PySide6.QtCore import QDateTime, QPointF, Qt
+from PySide6.QtCharts import QChart, QChartView, QDateTimeAxis
+
+from ring_buffer import RingBuffer
+from decimation import MinMaxDecimator, plot_pixels, rebuild_decimators
+
+
+def _time_format(span_secs):
+    return "HH:mm:ss" if span_secs <= 3600 else "MM-dd HH:mm"
+
+
+class TimeSeriesPlotBase:
+    """
+    What the time series plots share: a RingBuffer of samples with one
+    column per series, a MinMaxDecimator per series, the scrolling time
+    axis, render scheduler registration, and the switch between live
+    drawing and history from ChartHistory.
+
+    A subclass adds its value axes and a QLineSeries per buffer column
+    through _add_series(), in column order, calls _finish_chart(), and
+    turns its append() arguments into one _append() call.
+    """
+    def __init__(self, title, columns, max_points=60, scheduler=None, window_secs=60, buffer=None):
+        # timestamp -> one value per series, a device's buffer can be passed in and shared
+        self.data_points = buffer if buffer is not None else RingBuffer(max_points, columns=columns)
+        self.max_points = max_points
+        self.dirty = False
+        self.scheduler = scheduler
+        self.window_secs = window_secs
+        self.decimators = [MinMaxDecimator(window_secs * 1000, 1) for _ in range(columns)]
+        self._decimated_for = None  # (window_secs, pixels) the buckets were built for
+        self.live = True  # False while the user browses history
+        self.series_list = []
+
+        self.chart = QChart()
+        self.chart.setTitle(title)
+
+        # X axis: time
+        self.time_axis = QDateTimeAxis()
+        self.time_axis.setFormat("HH:mm:ss")
+        self.time_axis.setTitleText("Time")
+        self.chart.addAxis(self.time_axis, Qt.AlignBottom)
+
+    def _add_series(self, series, value_axis):
+        self.chart.addSeries(series)
+        series.attachAxis(self.time_axis)
+        series.attachAxis(value_axis)
+        self.series_list.append(series)
+
+    def _finish_chart(self):
+        self.chart_view = QChartView(self.chart)
+        if self.scheduler is not None:
+            self.scheduler.register(self)
+
+    def _append(self, timestamp_ms, values):
+        now = time.time() * 1000 if timestamp_ms is None else timestamp_ms
+        self.data_points.append(now, *values)
+        for decimator, value in zip(self.decimators, values):
+            decimator.add(now, value)
+        self.dirty = True
+        if self.scheduler is None:
+            self.flush()
+
+    def set_window(self, window_secs):
+        self.window_secs = window_secs
+        self.time_axis.setFormat(_time_format(window_secs))
+        self.dirty = True
+
+    def _sync_decimators(self):
+        key = (self.window_secs, plot_pixels(self.chart, self.chart_view))
+        if key == self._decimated_for:
+            return
+        rebuild_decimators(self.decimators, self.window_secs * 1000, key[1], self.data_points,
+                           from_raw=self._decimated_for is None)
+        self._decimated_for = key
+
+    def close(self):
+        """Detach from the render scheduler and release the chart widgets."""
+        if self.scheduler is not None:
+            self.scheduler.unregister(self)
+        self.chart_view.deleteLater()
+
+    def set_live(self, live):
+        """Follow incoming samples again, or stop redrawing them while history is shown."""
+        self.live = live
+        if live:
+            self.set_window(self.window_secs)
+
+    def show_history(self, points, start_ms, end_ms):
+        """Draw history points (one list of (ms, value) per series) over [start_ms, end_ms]."""
+        for series, series_points in zip(self.series_list, points):
+            series.replace([QPointF(t, v) for t, v in series_points])
+        self.time_axis.setFormat(_time_format((end_ms - start_ms) / 1000))
+        self.time_axis.setRange(QDateTime.fromMSecsSinceEpoch(int(start_ms)), QDateTime.fromMSecsSinceEpoch(int(end_ms)))
+
+    def flush(self):
+        self.dirty = False
+        if not self.live or not len(self.data_points):
+            return
+
+        # one Python->Qt call per series and frame with at most ~4 points per pixel
+        self._sync_decimators()
+        for series, decimator in zip(self.series_list, self.decimators):
+            series.replace([QPointF(t, v) for t, v in decimator.points()])
+
+        # Only display the selected time window
+        current_time = QDateTime.currentDateTime()
+        start_time = current_time.addSecs(-self.window_secs)
+        self.time_axis.setRange(start_time, current_time)
@@ -0,0 +1,87 @@
+from PySide6.QtCore import QObject, QTimer
+
+# status label look per state, built once instead of on every update
+STATUS_STYLES = {
+    "ok": ("✅ ", "color: white; background-color: #32CD32; padding: 3px;"),
+    "pending": ("⏳ ", "color: black; background-color: #FFD700; padding: 3px;"),
+    "error": ("❌ ", "color: white; background-color: #FF6347; padding: 3px;"),
+}
+
+
+def mqtt_state(status_text):
+    if "Connected" in status_text:
+        return "ok"
+    if "Connecting" in status_text or "Reconnect" in status_text:
+        return "pending"
+    return "error"
+
+
+def device_state(status_text):
+    if "Online" in status_text:
+        return "ok"
+    if "Offline" in status_text:
+        return "error"
+    return "pending"
+
+
+class UiState(QObject):
+    """
+    Latest value for every label the data path feeds, applied to the widgets
+    at most max_hz times a second. set() only records the value, so a burst
+    of messages costs a dict store each; on refresh a label is touched only
+    if its text or style actually changed.
+
+    bind(key, label, fmt) attaches a label to a key, fmt turns the value into
+    the label text (None leaves the label alone). bind_status() does the same
+    for a status label whose style follows the state function.
+    """
+    def __init__(self, max_hz=4, parent=None):
+        super().__init__(parent)
+        self._bindings = {}  # key -> [(label, fmt, state_fn)]
+        self._values = {}
+        self._dirty = set()
+        self._styles = {}    # label -> state currently applied
+        self.refreshes = 0
+        self.label_updates = 0
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.set_rate(max_hz)
+
+    def set_rate(self, max_hz):
+        self.max_hz = max(1, min(int(max_hz), 30))
+        self.timer.start(int(1000 / self.max_hz))
+
+    def stop(self):
+        self.timer.stop()
+
+    def bind(self, key, label, fmt=str):
+        self._bindings.setdefault(key, []).append((label, fmt, None))
+
+    def bind_status(self, key, label, state_fn):
+        self._bindings.setdefault(key, []).append((label, str, state_fn))
+
+    def set(self, key, value):
+        self._values[key] = value
+        self._dirty.add(key)
+
+    def refresh(self):
+        if not self._dirty:
+            return
+        self.refreshes += 1
+        dirty, self._dirty = self._dirty, set()
+        for key in dirty:
+            value = self._values[key]
+            for label, fmt, state_fn in self._bindings.get(key, ()):
+                text = fmt(value)
+                if text is None:
+                    continue
+                if state_fn is not None:
+                    state = state_fn(text)
+                    prefix, style = STATUS_STYLES[state]
+                    text = prefix + text
+                    if self._styles.get(label) != state:
+                        self._styles[label] = state
+                        label.setStyleSheet(style)
+                if label.text() != text:
+                    label.setText(text)
+                    self.label_updates += 1